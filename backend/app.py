@@ -1,11 +1,15 @@
 import os
 from flask import Flask
 from flask_cors import CORS
+from utils import compress_response
+import metrics
 
 # 导入功能模块蓝图 (Blueprints)，体现面向模块化(Modularity)的设计思想
 from routes.upload_routes import upload_bp
 from routes.process_routes import process_bp
 from routes.analysis_routes import analysis_bp
+from routes.job_routes import job_bp
+from routes.metrics_routes import metrics_bp
 
 app = Flask(__name__)
 
@@ -23,8 +27,21 @@ if not os.path.exists('uploads'):
 app.register_blueprint(upload_bp)
 app.register_blueprint(process_bp)
 app.register_blueprint(analysis_bp)
+app.register_blueprint(job_bp)
+app.register_blueprint(metrics_bp)
+
+# 【可观测性】：请求级耗时 / 内存 / 响应体积埋点 (须先于压缩钩子注册，以统计压缩后的传输字节数)
+metrics.init_app(app)
+
+# 【传输层优化】：大体积 JSON / Arrow 响应按客户端能力自动进行 brotli / gzip 压缩
+app.after_request(compress_response)
 
 if __name__ == '__main__':
     # 启动 Flask WSGI 服务器
-    # 注：生产环境部署或打包成执行文件时，需将 debug 设为 False，以防止多进程冲突与性能开销
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # 注：生产环境部署请使用 python wsgi.py (gunicorn / waitress 多进程服务)，
+    # 或设置 SERVE_MODE=production 由本入口转交；开发服务器仅供本地调试
+    if os.environ.get('SERVE_MODE') == 'production':
+        from wsgi import serve
+        serve()
+    else:
+        app.run(debug=True, port=5000)
\ No newline at end of file
@@ -15,4 +15,129 @@ def allowed_file(filename):
     :param filename: 上传的原始文件名
     :return: bool 是否允许上传
     """
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
\ No newline at end of file
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+# 【性能优化：解析结果内存缓存预算】
+# 进程级 DataFrame LRU 缓存的内存上限 (字节)，超出后按最近最少使用原则淘汰，可通过环境变量覆盖
+DF_CACHE_MAX_BYTES = int(os.environ.get('DF_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# 【性能优化：列式旁路缓存目录】
+# 每个数据目录下的隐藏子目录，存放首次解析后生成的 Arrow/Feather 列式副本
+CACHE_DIRNAME = '.cache'
+
+# 【大文件流式计算阈值】
+# 超过该体积的 CSV 自动切换为分块流式统计，避免一次性物化整张表撑爆工作进程内存
+STREAM_THRESHOLD_BYTES = int(os.environ.get('STREAM_THRESHOLD_BYTES', 256 * 1024 * 1024))
+# 流式读取时每个数据块的行数
+STREAM_CHUNK_ROWS = int(os.environ.get('STREAM_CHUNK_ROWS', 100000))
+
+# 【派生结果缓存容量】
+# 按文件版本缓存的统计核结果、索引等派生对象的最大条目数与内存预算 (字节)；
+# 选项索引、雷达索引等携带整列位置数组，须与解析缓存一样按字节数约束
+DERIVED_CACHE_ENTRIES = int(os.environ.get('DERIVED_CACHE_ENTRIES', 4096))
+DERIVED_CACHE_MAX_BYTES = int(os.environ.get('DERIVED_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+
+# 【异步数据画像】
+# 上传完成后在后台线程池中构建列画像的并发度，以及每列保留的高频取值个数
+PROFILE_WORKERS = int(os.environ.get('PROFILE_WORKERS', 2))
+PROFILE_TOP_K = 10
+
+# 【后台任务子系统】
+# 机器学习等重计算任务的进程池规模，以及已完成任务结果的保留时长 (秒) 与保留上限。
+# JOB_WORKERS 为整机预算：多进程部署 (wsgi.py) 下由各 Web 工作进程均分，每个进程至少保留 1 个任务进程
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 3600))
+JOB_MAX_RETAINED = int(os.environ.get('JOB_MAX_RETAINED', 200))
+
+# 【模型注册表】
+# 已训练模型的进程内 LRU 容量与磁盘持久化上限 (超出后按最近最少使用淘汰)
+MODEL_MEMORY_ENTRIES = int(os.environ.get('MODEL_MEMORY_ENTRIES', 4))
+MODEL_DISK_MAX = int(os.environ.get('MODEL_DISK_MAX', 32))
+
+# 【并行增量训练引擎】
+# 训练并行度 (随机森林 / 梯度提升线程数、置换重要性并行数)，以及热启动 (warm_start) 逐级训练时的汇报节点。
+# 0 表示自适应：任务开始训练时按正在运行的训练任务数均分 CPU 核心，单个任务独占全部核心。
+# 权衡：已在运行的任务不会让出核心，并发高峰时仍可能短暂超额订阅；需要硬性上限时显式设置 ML_N_JOBS
+ML_N_JOBS = int(os.environ.get('ML_N_JOBS', 0))
+ML_TREE_STAGES = [10, 25, 50, 100]
+# 训练集超过该行数时自动限制单棵树的抽样规模与最大深度，保证训练时长有界
+ML_LARGE_ROWS = int(os.environ.get('ML_LARGE_ROWS', 200000))
+ML_LARGE_MAX_DEPTH = int(os.environ.get('ML_LARGE_MAX_DEPTH', 24))
+
+# 【直方图梯度提升引擎】
+# engine=auto 时，训练集超过该行数自动切换为 HistGradientBoosting；置换重要性的评估抽样行数上限
+ML_HGB_ROWS = int(os.environ.get('ML_HGB_ROWS', 100000))
+ML_PERMUTATION_SAMPLE = int(os.environ.get('ML_PERMUTATION_SAMPLE', 5000))
+
+# 【窗口化数据访问】
+# 数据编辑器单次拉取的默认行数与上限，防止一次性下发整张大表
+WINDOW_DEFAULT_LIMIT = 200
+WINDOW_MAX_LIMIT = 2000
+
+# 【响应压缩】
+# 超过该字节数的 JSON / Arrow 响应体将按客户端声明的 Accept-Encoding 进行 brotli 或 gzip 压缩
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 32 * 1024))
+
+# 【增量保存：变更日志压实周期】
+# 追加式变更日志累计达到该批次数后，自动将补丁合并回源文件并清空日志
+PATCH_COMPACT_EVERY = int(os.environ.get('PATCH_COMPACT_EVERY', 50))
+
+# 【分块续传上传】
+# 前端切片大小 (字节)、首块到达后即时下发的预览行数、后台入库线程池并发度，
+# 以及会话闲置多久 (秒) 后视为过期并回收其临时文件
+UPLOAD_CHUNK_BYTES = int(os.environ.get('UPLOAD_CHUNK_BYTES', 8 * 1024 * 1024))
+UPLOAD_PREVIEW_ROWS = int(os.environ.get('UPLOAD_PREVIEW_ROWS', 50))
+UPLOAD_INGEST_WORKERS = int(os.environ.get('UPLOAD_INGEST_WORKERS', 2))
+UPLOAD_SESSION_TTL_SECONDS = int(os.environ.get('UPLOAD_SESSION_TTL_SECONDS', 24 * 3600))
+# 后台入库超过该时长 (秒) 仍未结束的会话视为工作进程崩溃遗留，按过期会话回收
+UPLOAD_INGEST_TIMEOUT_SECONDS = int(os.environ.get('UPLOAD_INGEST_TIMEOUT_SECONDS', 3600))
+
+# 【隐私脱敏：内容探针采样】
+# 每列抽样检测的非空值个数，以及判定为敏感列所需的模式命中比例
+MASK_SAMPLE_ROWS = int(os.environ.get('MASK_SAMPLE_ROWS', 1000))
+MASK_MATCH_RATIO = float(os.environ.get('MASK_MATCH_RATIO', 0.8))
+
+# 【生产部署：多进程 WSGI 服务】
+# 监听地址、工作进程数 (gunicorn) 与每进程线程数；默认进程数取 CPU 核数，可通过环境变量覆盖
+SERVE_HOST = os.environ.get('SERVE_HOST', '0.0.0.0')
+SERVE_PORT = int(os.environ.get('SERVE_PORT', 5000))
+SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', os.cpu_count() or 2))
+SERVE_THREADS = int(os.environ.get('SERVE_THREADS', 4))
+SERVE_TIMEOUT = int(os.environ.get('SERVE_TIMEOUT', 300))
+
+# 【可观测性：请求级性能埋点】
+# 是否默认为每个响应附加 Server-Timing 头 (未开启时客户端可通过请求头 X-Server-Timing: 1 单次开启)
+SERVER_TIMING_DEFAULT = os.environ.get('SERVER_TIMING_DEFAULT', '0') == '1'
+# 接口耗时直方图的分桶上界 (秒)
+METRICS_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# 【可视化降采样】
+# 关联分析散点图的默认点数预算与客户端可申请的上限；原始点对超过密度阈值时改为二维网格密度聚合
+SCATTER_MAX_POINTS = int(os.environ.get('SCATTER_MAX_POINTS', 5000))
+SCATTER_POINT_LIMIT = int(os.environ.get('SCATTER_POINT_LIMIT', 50000))
+SCATTER_DENSITY_THRESHOLD = int(os.environ.get('SCATTER_DENSITY_THRESHOLD', 200000))
+# 预测模块的真实/预测散点预算与推理折线 (LTTB) 的默认点数
+PREDICT_SCATTER_POINTS = int(os.environ.get('PREDICT_SCATTER_POINTS', 100))
+PREDICT_SERIES_POINTS = int(os.environ.get('PREDICT_SERIES_POINTS', 50))
+
+# 【雷达图批量对比】
+# 单次批量雷达请求允许对比的实体数上限
+RADAR_BATCH_MAX = int(os.environ.get('RADAR_BATCH_MAX', 50))
+
+# 【候选值检索】
+# /api/get_options 单页默认返回的唯一值个数与单页上限
+OPTIONS_DEFAULT_LIMIT = int(os.environ.get('OPTIONS_DEFAULT_LIMIT', 1000))
+OPTIONS_MAX_LIMIT = int(os.environ.get('OPTIONS_MAX_LIMIT', 10000))
+
+# 【多组差异检验】
+# 单因素方差分析 / Kruskal-Wallis 检验允许的分组数上限，防止误选高基数列
+ANOVA_MAX_GROUPS = int(os.environ.get('ANOVA_MAX_GROUPS', 50))
+
+# 【正态性检验分档】
+# 有效样本不超过 SHAPIRO_MAX 时对整列用 Shapiro-Wilk (其 p 值在 5000 样本以上不可靠)，不超过 SUBSAMPLE_MAX 时
+# 对固定种子的 SHAPIRO_MAX 点子样本做 Shapiro-Wilk，不超过 ANDERSON_MAX 时用基于概率尺度直方图的 Anderson-Darling，
+# 更大规模改用基于矩累加器的 D'Agostino K²；WORKERS 为逐列并行检验的线程数
+NORMALITY_SHAPIRO_MAX = int(os.environ.get('NORMALITY_SHAPIRO_MAX', 5000))
+NORMALITY_SUBSAMPLE_MAX = int(os.environ.get('NORMALITY_SUBSAMPLE_MAX', 50000))
+NORMALITY_ANDERSON_MAX = int(os.environ.get('NORMALITY_ANDERSON_MAX', 200000))
+NORMALITY_WORKERS = int(os.environ.get('NORMALITY_WORKERS', 4))
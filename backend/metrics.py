@@ -0,0 +1,178 @@
+# metrics.py
+"""
+【可观测性：请求级性能埋点】
+为每个请求记录总耗时、各阶段耗时 (parse 数据解析 / serialize 序列化与压缩 / compute 其余计算)、
+请求前后进程当前常驻内存 (RSS) 增量与响应体字节数，汇总为 Prometheus 文本格式供 /metrics 抓取，
+并可按需在响应中附加 Server-Timing 头，直接在浏览器开发者工具中查看耗时拆分。
+
+注：指标为进程内聚合。多进程 WSGI 部署下每个工作进程各自计数，抓取端需按实例汇总。
+"""
+import os
+import time
+import threading
+import functools
+from collections import defaultdict
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from config import SERVER_TIMING_DEFAULT, METRICS_LATENCY_BUCKETS
+
+# 【平台相关：当前 RSS 采样】/proc/self/statm 第二个字段为常驻页数，仅 Linux 可用，其他平台不采集内存指标。
+# 不使用 getrusage 的 ru_maxrss：它是进程生命周期内的峰值，进程预热后几乎不再增长，逐请求增量恒为 0
+_STATM = '/proc/self/statm'
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+PHASES = ('parse', 'compute', 'serialize')
+
+_lock = threading.Lock()
+_requests = defaultdict(int)                    # (route, method, status) -> 次数
+_latency_buckets = defaultdict(lambda: [0] * len(METRICS_LATENCY_BUCKETS))
+_latency_sum = defaultdict(float)               # (route, method) -> 累计秒数
+_latency_count = defaultdict(int)
+_phase_seconds = defaultdict(float)             # (route, phase) -> 累计秒数
+_response_bytes = defaultdict(int)              # route -> 累计字节
+_rss_delta_max = defaultdict(int)               # route -> 单次请求前后 RSS 增量的最大值 (字节)
+
+
+def _current_rss():
+    """进程当前常驻内存字节数，平台不支持时返回 None"""
+    try:
+        with open(_STATM) as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def phase(name):
+    """
+    阶段计时装饰器：被装饰函数的耗时累加到当前请求的对应阶段。
+    嵌套调用只计最外层，请求上下文之外 (后台线程、任务进程) 调用时不做任何处理。
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not has_request_context() or 'metrics_start' not in g:
+                return fn(*args, **kwargs)
+            depth = g.metrics_depth
+            depth[name] += 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                depth[name] -= 1
+                if depth[name] == 0:
+                    g.metrics_phases[name] += time.perf_counter() - start
+        return wrapper
+    return decorator
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """将 jsonify 的 JSON 编码耗时计入 serialize 阶段"""
+
+    @phase('serialize')
+    def dumps(self, obj, **kwargs):
+        return super().dumps(obj, **kwargs)
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_rss = _current_rss()
+    g.metrics_phases = defaultdict(float)
+    g.metrics_depth = defaultdict(int)
+
+
+def _after_request(response):
+    if 'metrics_start' not in g:
+        return response
+    total = time.perf_counter() - g.metrics_start
+    phases = dict(g.metrics_phases)
+    phases['compute'] = max(0.0, total - phases.get('parse', 0.0) - phases.get('serialize', 0.0))
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method = request.method
+    size = 0 if response.direct_passthrough else len(response.get_data())
+    # 请求结束时仍驻留的内存增量；请求内部已释放的瞬时峰值不计入
+    rss_after = _current_rss()
+    rss_delta = None if rss_after is None or g.metrics_rss is None else max(0, rss_after - g.metrics_rss)
+
+    with _lock:
+        _requests[(route, method, response.status_code)] += 1
+        buckets = _latency_buckets[(route, method)]
+        for i, bound in enumerate(METRICS_LATENCY_BUCKETS):
+            if total <= bound:
+                buckets[i] += 1
+        _latency_sum[(route, method)] += total
+        _latency_count[(route, method)] += 1
+        for name in PHASES:
+            _phase_seconds[(route, name)] += phases.get(name, 0.0)
+        _response_bytes[route] += size
+        if rss_delta is not None:
+            _rss_delta_max[route] = max(_rss_delta_max[route], rss_delta)
+
+    if SERVER_TIMING_DEFAULT or request.headers.get('X-Server-Timing') == '1':
+        entries = [f"{name};dur={phases.get(name, 0.0) * 1000:.1f}" for name in PHASES]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        response.headers['Server-Timing'] = ", ".join(entries)
+        # 跨域前端须经此授权才能在开发者工具中读取 Server-Timing
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+
+def init_app(app):
+    """
+    挂载埋点钩子。须在其他 after_request 钩子 (如响应压缩) 之前调用：
+    Flask 按注册的逆序执行 after_request，先注册的埋点最后执行，从而统计到压缩后的真实传输字节数。
+    """
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus(extra_gauges=None, extra_counters=None):
+    """
+    导出 Prometheus 文本格式 (exposition format 0.0.4) 的指标快照。
+
+    :param extra_gauges: 额外的仪表盘指标 {指标名: (说明, 数值)}，如解析缓存水位
+    :param extra_counters: 额外的单调递增计数器 {指标名: (说明, 数值)}，指标名须以 _total 结尾
+    """
+    lines = []
+    with _lock:
+        lines += ["# HELP dataanalyzer_requests_total 按路由、方法与状态码统计的请求次数",
+                  "# TYPE dataanalyzer_requests_total counter"]
+        for (route, method, status), count in sorted(_requests.items()):
+            lines.append(f"dataanalyzer_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+        lines += ["# HELP dataanalyzer_request_duration_seconds 接口总耗时分布",
+                  "# TYPE dataanalyzer_request_duration_seconds histogram"]
+        for (route, method), buckets in sorted(_latency_buckets.items()):
+            for bound, count in zip(METRICS_LATENCY_BUCKETS, buckets):
+                lines.append(f"dataanalyzer_request_duration_seconds_bucket"
+                             f"{_labels(route=route, method=method, le=bound)} {count}")
+            count = _latency_count[(route, method)]
+            lines.append(f"dataanalyzer_request_duration_seconds_bucket"
+                         f"{_labels(route=route, method=method, le='+Inf')} {count}")
+            lines.append(f"dataanalyzer_request_duration_seconds_sum{_labels(route=route, method=method)} "
+                         f"{_latency_sum[(route, method)]:.6f}")
+            lines.append(f"dataanalyzer_request_duration_seconds_count{_labels(route=route, method=method)} {count}")
+
+        lines += ["# HELP dataanalyzer_request_phase_seconds_total 各阶段 (parse/compute/serialize) 累计耗时",
+                  "# TYPE dataanalyzer_request_phase_seconds_total counter"]
+        for (route, name), seconds in sorted(_phase_seconds.items()):
+            lines.append(f"dataanalyzer_request_phase_seconds_total{_labels(route=route, phase=name)} {seconds:.6f}")
+
+        lines += ["# HELP dataanalyzer_response_bytes_total 累计响应体字节数 (压缩后)",
+                  "# TYPE dataanalyzer_response_bytes_total counter"]
+        for route, size in sorted(_response_bytes.items()):
+            lines.append(f"dataanalyzer_response_bytes_total{_labels(route=route)} {size}")
+
+        lines += ["# HELP dataanalyzer_request_rss_delta_bytes 单次请求前后进程当前 RSS 增量的最大值",
+                  "# TYPE dataanalyzer_request_rss_delta_bytes gauge"]
+        for route, delta in sorted(_rss_delta_max.items()):
+            lines.append(f"dataanalyzer_request_rss_delta_bytes{_labels(route=route)} {delta}")
+
+    for kind, metrics in (('gauge', extra_gauges), ('counter', extra_counters)):
+        for name, (help_text, value) in (metrics or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -3,10 +3,11 @@ from flask import Blueprint
 
 # 【面向服务架构 (SOA) 设计】
 # 将底层的算法“服务提供者 (Services)”引入，保持控制器 (Controller) 层的轻量化
-from services.service_stats import do_descriptive, do_advanced, do_ttest
-from services.service_visualize import do_get_options, do_distribution, do_categorical, do_radar
-from services.service_ml import do_summary, do_predict, do_predict_new
+from services.service_stats import do_descriptive, do_advanced, do_ttest, do_anova
+from services.service_visualize import do_get_options, do_distribution, do_categorical, do_radar, do_radar_batch
+from services.service_ml import do_summary, do_predict, do_predict_new, do_predict_score
 from services.service_security import do_mask
+from services.service_profile import do_profile_status, do_profile
 
 # 注册数据分析相关的蓝图路由
 analysis_bp = Blueprint('analysis', __name__)
@@ -47,11 +48,21 @@ def ttest_analysis():
     """执行独立样本 t 检验 (Welch's t-test)"""
     return do_ttest()
 
+@analysis_bp.route('/api/analyze/anova', methods=['POST'])
+def anova_analysis():
+    """执行多组差异检验（单因素方差分析 / Kruskal-Wallis）"""
+    return do_anova()
+
 @analysis_bp.route('/api/visualize/radar', methods=['POST'])
 def visualize_radar():
     """提取个体多维特征向量（服务于雷达图多维对比）"""
     return do_radar()
 
+@analysis_bp.route('/api/visualize/radar/batch', methods=['POST'])
+def visualize_radar_batch():
+    """批量提取多个个体的多维特征向量（一次索引寻址完成多实体对比）"""
+    return do_radar_batch()
+
 # ==========================================
 # 模块三：智能化与机器学习算法 API
 # ==========================================
@@ -70,10 +81,28 @@ def predict_new_data():
     """执行未知数据推理预测，并基于惩罚机制生成专家级诊断报告"""
     return do_predict_new()
 
+@analysis_bp.route('/api/predict/score', methods=['POST'])
+def predict_score_data():
+    """复用已训练模型为新上传的数据批量打分，无需重新训练"""
+    return do_predict_score()
+
 # ==========================================
 # 模块四：企业级数据安全 API
 # ==========================================
 @analysis_bp.route('/api/mask', methods=['POST'])
 def mask_data():
     """执行敏感特征脱敏与不可逆隐私遮蔽"""
-    return do_mask()
\ No newline at end of file
+    return do_mask()
+
+# ==========================================
+# 模块五：异步数据画像 API
+# ==========================================
+@analysis_bp.route('/api/profile/status', methods=['POST'])
+def profile_status():
+    """查询上传后后台数据画像的就绪状态"""
+    return do_profile_status()
+
+@analysis_bp.route('/api/profile', methods=['POST'])
+def profile_data():
+    """下发文件的列画像 (类型、缺失、基数、矩、分位数、高频值、相关矩阵)"""
+    return do_profile()
\ No newline at end of file
@@ -0,0 +1,23 @@
+# routes/job_routes.py
+from flask import Blueprint, jsonify
+from services.service_jobs import get_job, cancel_job
+
+# 注册后台任务查询相关的蓝图路由
+job_bp = Blueprint('jobs', __name__)
+
+
+@job_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """轮询后台任务的状态、进度与最终结果"""
+    info = get_job(job_id)
+    if info is None:
+        return jsonify({"status": "error", "message": "任务不存在或结果已过期回收"}), 404
+    return jsonify({"status": "success", "data": info})
+
+
+@job_bp.route('/api/jobs/<job_id>', methods=['DELETE'])
+def job_cancel(job_id):
+    """取消排队中或运行中的后台任务"""
+    if not cancel_job(job_id):
+        return jsonify({"status": "error", "message": "任务不存在或结果已过期回收"}), 404
+    return jsonify({"status": "success", "message": "已提交取消指令"})
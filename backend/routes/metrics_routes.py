@@ -0,0 +1,27 @@
+# routes/metrics_routes.py
+from flask import Blueprint, Response
+from metrics import render_prometheus
+from utils import get_df_cache_stats
+
+# 注册可观测性相关的蓝图路由
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """【可观测性探针】以 Prometheus 文本格式导出各接口耗时、阶段拆分、内存增量、响应体积与解析缓存水位"""
+    cache = get_df_cache_stats()
+    gauges = {
+        "dataanalyzer_df_cache_bytes": ("解析缓存当前占用字节数", cache["bytes"]),
+        "dataanalyzer_df_cache_entries": ("解析缓存条目数", cache["entries"]),
+        "dataanalyzer_derived_cache_bytes": ("派生结果缓存当前估算占用字节数", cache["derived_bytes"]),
+        "dataanalyzer_derived_cache_entries": ("派生结果缓存条目数", cache["derived_entries"]),
+    }
+    # 命中 / 未命中 / 淘汰次数只增不减，按 counter 导出以便抓取端使用 rate() 计算速率
+    counters = {
+        "dataanalyzer_df_cache_hits_total": ("解析缓存累计命中次数", cache["hits"]),
+        "dataanalyzer_df_cache_misses_total": ("解析缓存累计未命中次数", cache["misses"]),
+        "dataanalyzer_df_cache_evictions_total": ("解析缓存累计淘汰次数", cache["evictions"]),
+        "dataanalyzer_derived_cache_evictions_total": ("派生结果缓存累计淘汰次数", cache["derived_evictions"]),
+    }
+    return Response(render_prometheus(gauges, counters), mimetype='text/plain; version=0.0.4')
@@ -1,13 +1,20 @@
 import os
+import json
 import traceback
+import numpy as np
 import pandas as pd
 from flask import Blueprint, request, jsonify, make_response
-from config import UPLOAD_FOLDER
-from utils import read_df
+from config import (UPLOAD_FOLDER, WINDOW_DEFAULT_LIMIT, WINDOW_MAX_LIMIT, PATCH_COMPACT_EVERY,
+                    STREAM_THRESHOLD_BYTES)
+from utils import (HAS_ARROW, read_df, invalidate_df_cache, get_derived, negotiate_format, column_arrays,
+                   arrow_response, file_signature, version_stamp, apply_patch_ops, append_changelog, compact_changelog,
+                   prime_df_cache, cache_path, FileLock)
+from services.service_clean import OUTPUT_FORMATS, resolve_strategy, clean_frame, clean_streaming, write_frame
 
 process_bp = Blueprint('process', __name__)
 
 
+
 @process_bp.route('/api/preview', methods=['POST'])
 def preview_data():
     """
@@ -19,6 +26,12 @@ def preview_data():
         df = read_df(os.path.join(UPLOAD_FOLDER, filename))
         # 提取快照并将空值转换为空字符串，确保 JSON 序列化安全
         preview_df = df.head(15).fillna("").astype(str)
+        fmt = negotiate_format()
+        if fmt == 'arrow':
+            return arrow_response(preview_df)
+        if fmt == 'columnar':
+            return jsonify({"status": "success", "format": fmt,
+                            "data": {"columns": preview_df.columns.tolist(), "arrays": column_arrays(preview_df)}})
         return jsonify({"status": "success",
                         "data": {"columns": preview_df.columns.tolist(), "rows": preview_df.to_dict(orient='records')}})
     except Exception as e:
@@ -31,61 +44,46 @@ def clean_data():
     """
     【核心预处理算法：智能缺失值插补与异常值裁剪引擎】
     利用统计学规律全自动洗除噪声数据，并生成清洗战报。
+    可选参数 strategy 指定插补 (mean/median/mode/ffill/none) 与异常值 (sigma/iqr/mad/winsorize/none) 策略，
+    dry_run 为真时仅返回战报、不落盘。
     """
     try:
-        filename = request.json.get('filename')
-        df = read_df(os.path.join(UPLOAD_FOLDER, filename))
-        numeric_cols = df.select_dtypes(include=['number']).columns
-
-        # 初始化战报探针容器
-        total_rows = len(df)
-        missing_info = {}
-        outliers_info = {}
-        total_missing = 0
-        total_outliers = 0
-
-        if len(numeric_cols) > 0:
-            # 1. 缺失值插补 (Mean Imputation 均值填充法)
-            for col in numeric_cols:
-                null_count = int(df[col].isnull().sum())
-                if null_count > 0:
-                    missing_info[col] = null_count
-                    total_missing += null_count
-            df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
-
-            # 2. 异常值裁剪 (基于 3σ 拉依达准则 Pauta Criterion)
-            for col in numeric_cols:
-                mean = df[col].mean()
-                std = df[col].std()
-                if pd.isna(std):
-                    std = 0
-                lower_bound = mean - 3 * std
-                upper_bound = mean + 3 * std
-
-                # 统计越界记录数
-                outlier_count = int(((df[col] < lower_bound) | (df[col] > upper_bound)).sum())
-                if outlier_count > 0:
-                    outliers_info[col] = outlier_count
-                    total_outliers += outlier_count
-
-                # 裁剪：将超出 3σ 范围的极值拉回至边界，避免过度破坏数据分布
-                df[col] = df[col].clip(lower=lower_bound, upper=upper_bound)
-
-        # 固化清洗后的数据模型
-        cleaned_filename = f"cleaned_{filename.split('.')[0]}.csv"
-        df.to_csv(os.path.join(UPLOAD_FOLDER, cleaned_filename), index=False, encoding='utf-8-sig')
+        data = request.json
+        filename = data.get('filename')
+        output_format = data.get('output_format', 'csv')
+        dry_run = bool(data.get('dry_run', False))
+        if output_format not in OUTPUT_FORMATS or (output_format == 'parquet' and not HAS_ARROW):
+            return jsonify({"status": "error", "message": f"不支持的输出格式: {output_format}"}), 400
+        try:
+            strategy = resolve_strategy(data.get('strategy'))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        cleaned_filename = f"cleaned_{filename.split('.')[0]}.{output_format}"
+        cleaned_path = os.path.join(UPLOAD_FOLDER, cleaned_filename)
+
+        # 超大 CSV 自动切换为两遍流式清洗，内存占用与文件规模无关
+        stream = data.get('stream')
+        if stream is None:
+            stream = filepath.lower().endswith('.csv') and os.path.getsize(filepath) > STREAM_THRESHOLD_BYTES
+        if stream and filepath.lower().endswith('.csv'):
+            try:
+                report = clean_streaming(filepath, cleaned_path, output_format, strategy, dry_run)
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+        else:
+            df, report = clean_frame(read_df(filepath), strategy, dry_run)
+            if not dry_run:
+                # 固化清洗后的数据模型
+                write_frame(df, cleaned_path, output_format)
+        if not dry_run:
+            invalidate_df_cache(cleaned_path)
 
         return jsonify({
             "status": "success",
-            "message": "清洗完成",
-            "data": {
-                "cleaned_filename": cleaned_filename,
-                "total_rows": total_rows,
-                "total_missing": total_missing,
-                "missing_details": missing_info,
-                "total_outliers": total_outliers,
-                "outliers_details": outliers_info
-            }
+            "message": "清洗预演完成" if dry_run else "清洗完成",
+            "data": {"cleaned_filename": None if dry_run else cleaned_filename, "dry_run": dry_run, **report}
         })
     except Exception as e:
         traceback.print_exc()
@@ -162,9 +160,12 @@ def save_data():
             old_in_out = os.path.join(OUTPUT_FOLDER, old_filename)
             if os.path.exists(old_in_up): os.remove(old_in_up)
             if os.path.exists(old_in_out): os.remove(old_in_out)
+            invalidate_df_cache(old_in_up)
+            invalidate_df_cache(old_in_out)
 
         # 4. 执行磁盘持久化写入 (UTF-8-SIG 解决 Excel 解析中文乱码)
         df.to_csv(file_path, index=False, encoding='utf-8-sig')
+        invalidate_df_cache(file_path)
 
         res = jsonify({"status": "success", "message": msg})
         res.headers.add("Access-Control-Allow-Origin", "*")
@@ -204,15 +205,26 @@ def get_full_data():
         if not os.path.exists(file_path):
             file_path = os.path.join(UPLOAD_FOLDER, filename)
 
-        # 加载全量数据并将缺失值NaN转为空字符串，防止前端 JSON 序列化崩溃
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        df = df.fillna("")
+        # 加载全量数据 (经由缓存层，尚未压实的增量补丁会一并回放)
+        version = version_stamp(file_signature(file_path))
+        df = read_df(file_path)
 
-        res = jsonify({
-            "status": "success",
-            "headers": df.columns.tolist(),
-            "rows": df.to_dict(orient='records')
-        })
+        # 按协商格式编码：Arrow 流原生保留缺失值；JSON 两种形态均需将 NaN 转为空字符串
+        fmt = negotiate_format()
+        if fmt == 'arrow':
+            res = arrow_response(df, {"version": version})
+        else:
+            df = df.fillna("")
+            if fmt == 'columnar':
+                res = jsonify({"status": "success", "format": fmt, "headers": df.columns.tolist(),
+                               "arrays": column_arrays(df), "version": version})
+            else:
+                res = jsonify({
+                    "status": "success",
+                    "headers": df.columns.tolist(),
+                    "rows": df.to_dict(orient='records'),
+                    "version": version
+                })
         res.headers.add("Access-Control-Allow-Origin", "*")
         return res
 
@@ -221,4 +233,226 @@ def get_full_data():
         traceback.print_exc()
         res = jsonify({"status": "error", "message": f"拉取数据失败: {str(e)}"})
         res.headers.add("Access-Control-Allow-Origin", "*")
-        return res, 500
\ No newline at end of file
+        return res, 500
+
+
+def _resolve_editor_path(filename):
+    """智能寻址降级机制：优先读隔离区 outputs，找不到则回退至源区 uploads"""
+    OUTPUT_FOLDER = os.path.join(os.path.dirname(UPLOAD_FOLDER), 'outputs')
+    file_path = os.path.join(OUTPUT_FOLDER, filename)
+    if not os.path.exists(file_path):
+        file_path = os.path.join(UPLOAD_FOLDER, filename)
+    return file_path
+
+
+def _window_int(data, key, default):
+    """解析窗口分页参数：缺省取默认值，null 或非整数视为非法参数"""
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"参数 {key} 必须为整数")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"参数 {key} 必须为整数: {value}")
+
+
+def _window_bool(data, key, default):
+    """解析窗口布尔参数：接受 JSON 布尔值与 "true" / "false" 字符串，避免 bool("false") 被判为真"""
+    value = data.get(key, default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError(f"参数 {key} 必须为布尔值")
+
+
+def _filter_mask(df, filters):
+    """将前端筛选条件编译为向量化布尔掩码 (contains 条件未指定列时跨全部列检索)"""
+    mask = np.ones(len(df), dtype=bool)
+    if not isinstance(filters, list) or not all(isinstance(f, dict) for f in filters):
+        raise ValueError("筛选条件格式非法")
+    for f in filters:
+        col, op, value = f.get('column'), f.get('op', 'contains'), f.get('value')
+        if col is None and op == 'contains':
+            cond = np.zeros(len(df), dtype=bool)
+            for name in df.columns:
+                hit = df[name].astype(str).str.contains(str(value), case=False, regex=False, na=False)
+                cond |= hit.to_numpy(dtype=bool)
+            mask &= cond
+            continue
+        if col not in df.columns:
+            raise ValueError(f"筛选列不存在: {col}")
+        series = df[col]
+        if op == 'contains':
+            cond = series.astype(str).str.contains(str(value), case=False, regex=False, na=False)
+        elif op == 'isnull':
+            cond = series.isna()
+        elif op == 'notnull':
+            cond = series.notna()
+        elif op in ('eq', 'ne', 'gt', 'ge', 'lt', 'le'):
+            # 数值列按数值比较，其余列按文本比较
+            if pd.api.types.is_numeric_dtype(series):
+                try:
+                    value = pd.to_numeric(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"筛选列 {col} 为数值列，筛选值必须为数字: {value}")
+            else:
+                series = series.astype(str)
+                value = str(value)
+            cond = getattr(series, op)(value).fillna(False)
+        else:
+            raise ValueError(f"不支持的筛选运算符: {op}")
+        mask &= cond.to_numpy(dtype=bool)
+    return mask
+
+
+def _row_order(df, sort_by, ascending, filters):
+    """计算筛选 + 排序后的行位置序列 (结果按文件版本缓存，翻页时无需重复排序)"""
+    positions = np.flatnonzero(_filter_mask(df, filters)) if filters else np.arange(len(df))
+    if sort_by:
+        if sort_by not in df.columns:
+            raise ValueError(f"排序列不存在: {sort_by}")
+        keys = df[sort_by].iloc[positions]
+        try:
+            ordered = keys.sort_values(ascending=ascending, kind='mergesort', na_position='last')
+        except TypeError:
+            # 混合类型列无法直接比较，降级为按文本排序
+            ordered = keys.astype(str).sort_values(ascending=ascending, kind='mergesort')
+        positions = df.index.get_indexer(ordered.index)
+    return positions
+
+
+@process_bp.route('/api/data/window', methods=['POST', 'OPTIONS'])
+def get_data_window():
+    """
+    【I/O引擎】：窗口化数据下发通道 (供数据编辑器虚拟滚动使用)
+    基于缓存的列式数据副本，在服务端完成筛选、排序与分页，仅下发可视区域内的行窗口及总数元信息。
+    """
+    if request.method == 'OPTIONS':
+        response = make_response()
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "Content-Type")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        return response
+
+    try:
+        data = request.json
+        filename = data.get('filename')
+        if not filename:
+            return jsonify({"status": "error", "message": "缺少文件名"}), 400
+
+        offset = max(0, _window_int(data, 'offset', 0))
+        limit = min(max(1, _window_int(data, 'limit', WINDOW_DEFAULT_LIMIT)), WINDOW_MAX_LIMIT)
+        sort_by = data.get('sort_by')
+        ascending = _window_bool(data, 'ascending', True)
+        filters = data.get('filters') or []
+
+        file_path = _resolve_editor_path(filename)
+        version = version_stamp(file_signature(file_path))
+        df = read_df(file_path)
+        order_key = ('window_order', sort_by, ascending, json.dumps(filters, sort_keys=True, ensure_ascii=False))
+        positions = get_derived(file_path, order_key, lambda: _row_order(df, sort_by, ascending, filters))
+
+        # 仅物化当前窗口的行
+        window = df.iloc[positions[offset:offset + limit]]
+        meta = {
+            "row_ids": positions[offset:offset + limit].tolist(),
+            "offset": offset,
+            "limit": limit,
+            "total": int(len(positions)),
+            "total_rows": int(len(df)),
+            "version": version
+        }
+
+        fmt = negotiate_format()
+        if fmt == 'arrow':
+            res = arrow_response(window, meta)
+        else:
+            # 将缺失值NaN转为空字符串，防止前端 JSON 序列化崩溃
+            window = window.astype(object).where(window.notna(), "")
+            if fmt == 'columnar':
+                res = jsonify({"status": "success", "format": fmt, "headers": df.columns.tolist(),
+                               "arrays": column_arrays(window), **meta})
+            else:
+                res = jsonify({"status": "success", "headers": df.columns.tolist(),
+                               "rows": window.to_dict(orient='records'), **meta})
+        res.headers.add("Access-Control-Allow-Origin", "*")
+        return res
+
+    except ValueError as e:
+        # 分页参数、筛选条件或排序列非法：属于请求参数错误
+        res = jsonify({"status": "error", "message": str(e)})
+        res.headers.add("Access-Control-Allow-Origin", "*")
+        return res, 400
+    except Exception as e:
+        traceback.print_exc()
+        res = jsonify({"status": "error", "message": f"拉取数据窗口失败: {str(e)}"})
+        res.headers.add("Access-Control-Allow-Origin", "*")
+        return res, 500
+
+@process_bp.route('/api/data/patch', methods=['POST', 'OPTIONS'])
+def patch_data():
+    """
+    【增量保存引擎】：数据编辑器的补丁式保存通道
+    前端仅提交单元格修改 / 插入行 / 删除行等增量操作，服务端在缓存副本上原地应用并追加写入变更日志，
+    不再整表重写 CSV；日志累计到阈值后自动压实回源文件。
+    必须携带拉取数据时获得的 base_version，与当前版本不符时返回 409，由前端重新拉取后再提交。
+    """
+    if request.method == 'OPTIONS':
+        response = make_response()
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "Content-Type")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        return response
+
+    try:
+        data = request.json
+        filename = data.get('filename')
+        ops = data.get('ops')
+        base_version = data.get('base_version')
+        if not filename or not isinstance(ops, list):
+            return jsonify({"status": "error", "message": "参数缺失，无法保存"}), 400
+        # 乐观并发控制不可绕过：缺少基准版本的补丁无法判断是否覆盖了他人的修改
+        if not base_version:
+            return jsonify({"status": "error", "message": "缺少基准版本号 base_version，请重新拉取数据后再保存"}), 400
+
+        file_path = _resolve_editor_path(filename)
+        if not os.path.exists(file_path):
+            return jsonify({"status": "error", "message": "未找到指定数据资产"}), 400
+        if not file_path.lower().endswith('.csv'):
+            return jsonify({"status": "error", "message": "增量保存仅支持 CSV 文件，请使用整表保存"}), 400
+
+        # 单文件写锁 (跨线程 + 跨工作进程)：补丁串行应用，保证版本号校验与日志追加的原子性
+        with FileLock(cache_path(file_path, '.lock')):
+            current = version_stamp(file_signature(file_path))
+            if base_version != current:
+                res = jsonify({"status": "conflict", "message": "数据已被其他操作修改，请刷新后重试",
+                               "version": current})
+                res.headers.add("Access-Control-Allow-Origin", "*")
+                return res, 409
+
+            # 先在内存副本上完整校验并应用，任何非法操作都不会落入日志
+            try:
+                df = apply_patch_ops(read_df(file_path), ops)
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+
+            compacted = False
+            if ops:
+                if append_changelog(file_path, ops) >= PATCH_COMPACT_EVERY:
+                    compact_changelog(file_path, df)
+                    compacted = True
+                else:
+                    prime_df_cache(file_path, df)
+
+            res = jsonify({"status": "success", "message": "增量保存成功！",
+                           "version": version_stamp(file_signature(file_path)),
+                           "row_count": int(len(df)), "compacted": compacted})
+        res.headers.add("Access-Control-Allow-Origin", "*")
+        return res
+
+    except Exception as e:
+        traceback.print_exc()
+        res = jsonify({"status": "error", "message": f"保存失败: {str(e)}"})
+        res.headers.add("Access-Control-Allow-Origin", "*")
+        return res, 500
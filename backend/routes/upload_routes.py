@@ -5,24 +5,20 @@ import pandas as pd
 import numpy as np
 from flask import Blueprint, request, jsonify
 from config import UPLOAD_FOLDER, allowed_file
-from utils import read_df
+from utils import read_df, invalidate_df_cache, get_df_cache_stats, get_parse_info
+from services.service_profile import schedule_profile
+from services.service_upload import (classify_columns, do_upload_init, do_upload_chunk,
+                                     do_upload_complete, do_upload_status)
 
 upload_bp = Blueprint('upload', __name__)
 
-def process_and_respond(df, safe_filename, original_name):
+def process_and_respond(df, safe_filename, original_name, parse_info=None):
     """
     【特征工程：智能字段属性推断与分类引擎】
     负责在数据入库前，对其包含的维度进行初步的业务属性探伤。
+    parse_info 为原始解析的编码、引擎与耗时，随响应一并回传供前端展示。
     """
-    columns = df.columns.tolist()
-
-    # 智能过滤：识别真正的连续型数值列。
-    # 采用正则/关键字匹配探测技术，强行剔除“学号”、“流水号”等伪数值列(标识符)，保证后续统计算法不被污染。
-    numeric_cols = [c for c in columns if pd.api.types.is_numeric_dtype(df[c]) and not any(
-        kw in str(c).lower() for kw in ['号', 'id', '编号', '代码', '索引'])]
-
-    # 特征挖掘：探测所有唯一值数量严格等于2的特征列，提名为二分类变量（为后续 T检验 储备靶点）
-    binary_cols = [c for c in columns if df[c].nunique() == 2]
+    columns, numeric_cols, binary_cols = classify_columns(df)
 
     return jsonify({
         "status": "success",
@@ -32,7 +28,8 @@ def process_and_respond(df, safe_filename, original_name):
             "columns": columns,
             "numeric_columns": numeric_cols,
             "binary_columns": binary_cols,
-            "row_count": len(df)
+            "row_count": len(df),
+            "parse_info": parse_info
         }
     })
 
@@ -55,13 +52,31 @@ def upload_file():
         file.save(filepath)
 
         try:
+            # 首次解析即完成入库：read_df 会同步固化列式旁路副本，后续请求不再重复解析原始文件
             df = read_df(filepath)
-            return process_and_respond(df, safe_filename, file.filename)
+            # 异步画像：后台线程池构建列画像，上传接口立即返回
+            schedule_profile(filepath)
+            return process_and_respond(df, safe_filename, file.filename, get_parse_info(filepath))
         except Exception as e:
             return jsonify({"status": "error", "message": f"文件解析异常: {str(e)}"}), 500
 
     return jsonify({"status": "error", "message": "系统不支持该文件格式"}), 400
 
+# ==========================================
+# 分块续传上传：首块到达即下发字段结构，全量入库在后台完成
+# ==========================================
+@upload_bp.route('/api/upload/init', methods=['POST'])
+def upload_init(): return do_upload_init()
+
+@upload_bp.route('/api/upload/chunk/<upload_id>', methods=['PUT', 'POST'])
+def upload_chunk(upload_id): return do_upload_chunk(upload_id)
+
+@upload_bp.route('/api/upload/complete/<upload_id>', methods=['POST'])
+def upload_complete(upload_id): return do_upload_complete(upload_id)
+
+@upload_bp.route('/api/upload/status/<upload_id>', methods=['GET'])
+def upload_status(upload_id): return do_upload_status(upload_id)
+
 @upload_bp.route('/api/upload_manual', methods=['POST'])
 def upload_manual():
     """处理前端 Web 内存级手工表格矩阵的解析与落地"""
@@ -101,7 +116,9 @@ def upload_manual():
                 pass
 
         safe_filename = f"manual_{int(time.time())}.csv"
-        df.to_csv(os.path.join(UPLOAD_FOLDER, safe_filename), index=False, encoding='utf-8-sig')
+        filepath = os.path.join(UPLOAD_FOLDER, safe_filename)
+        df.to_csv(filepath, index=False, encoding='utf-8-sig')
+        schedule_profile(filepath)
 
         return process_and_respond(df, safe_filename, "在线创建数据.csv")
     except Exception as e:
@@ -113,6 +130,12 @@ def cleanup_cache():
     try:
         shutil.rmtree(UPLOAD_FOLDER)
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        invalidate_df_cache()
         return jsonify({"status": "success", "message": "系统核心缓存已清空"})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@upload_bp.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """【可观测性探针】导出解析缓存的命中、未命中、淘汰计数与内存水位"""
+    return jsonify({"status": "success", "data": get_df_cache_stats()})
\ No newline at end of file
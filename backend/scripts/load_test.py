@@ -0,0 +1,137 @@
+"""
+【性能基准：并发压测】
+以多线程模拟多位分析员同时访问仪表盘，统计各接口的吞吐量与 p50 / p95 / p99 延迟，
+用于对比开发服务器与多进程 WSGI 部署 (wsgi.py) 的承载能力。仅依赖标准库。
+
+用法 (先启动服务，再在 backend 目录下执行):
+    python scripts/load_test.py --file sample.csv --concurrency 16 --duration 30
+    python scripts/load_test.py --filename upload_1700000000.csv --columns math eng
+"""
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+
+def _post(url, payload=None, body=None, headers=None):
+    data = body if body is not None else json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(url, data=data, headers=headers or {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        return resp.status, resp.read()
+
+
+def upload(base, path):
+    """以 multipart/form-data 上传测试文件，返回服务端的入库信息"""
+    boundary = uuid.uuid4().hex
+    with open(path, 'rb') as f:
+        content = f.read()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{os.path.basename(path)}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode()
+    _, raw = _post(f'{base}/api/upload', body=body,
+                   headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    return json.loads(raw)['data']
+
+
+def build_scenarios(filename, columns):
+    """仪表盘会话中最常见的只读请求组合"""
+    return [
+        ('/api/analyze/descriptive', {'filename': filename, 'columns': columns}),
+        ('/api/visualize/distribution', {'filename': filename, 'columns': columns}),
+        ('/api/analyze/advanced', {'filename': filename, 'columns': columns}),
+        ('/api/preview', {'filename': filename}),
+        ('/api/data/window', {'filename': filename, 'offset': 0, 'limit': 200}),
+        ('/api/analyze/summary', {'filename': filename}),
+    ]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def run(base, scenarios, concurrency, duration, total_requests):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    counter = iter(range(total_requests or 10 ** 12))
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            if next(counter, None) is None:
+                return
+            route, payload = rng.choice(scenarios)
+            start = time.perf_counter()
+            try:
+                status, _ = _post(base + route, payload)
+                ok = status < 400
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies[route].append(elapsed)
+                else:
+                    errors[route] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(latencies, errors, wall):
+    print(f"{'route':<32} {'ok':>6} {'err':>5} {'rps':>8} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    everything = []
+    for route in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies[route])
+        everything.extend(values)
+        print(f"{route:<32} {len(values):>6} {errors[route]:>5} {len(values) / wall:>8.1f} "
+              f"{percentile(values, 0.5) * 1000:>9.1f} {percentile(values, 0.95) * 1000:>9.1f} "
+              f"{percentile(values, 0.99) * 1000:>9.1f}")
+    everything.sort()
+    print(f"{'TOTAL':<32} {len(everything):>6} {sum(errors.values()):>5} {len(everything) / wall:>8.1f} "
+          f"{percentile(everything, 0.5) * 1000:>9.1f} {percentile(everything, 0.95) * 1000:>9.1f} "
+          f"{percentile(everything, 0.99) * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对数据分析后端进行并发压测，输出吞吐量与 p99 延迟")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--file', help="压测前先上传的本地数据文件")
+    parser.add_argument('--filename', help="服务端已存在的数据文件名 (与 --file 二选一)")
+    parser.add_argument('--columns', nargs='+', help="参与统计的数值列，缺省取上传识别出的全部数值列")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help="压测时长 (秒)")
+    parser.add_argument('--requests', type=int, default=0, help="请求总数上限，0 表示仅受时长限制")
+    args = parser.parse_args()
+
+    columns = args.columns
+    filename = args.filename
+    if args.file:
+        info = upload(args.url, args.file)
+        filename = info['filename']
+        columns = columns or info['numeric_columns']
+    if not filename or not columns:
+        parser.error("请通过 --file 上传数据，或同时指定 --filename 与 --columns")
+
+    print(f"[load] {args.url} file={filename} concurrency={args.concurrency} duration={args.duration}s")
+    latencies, errors, wall = run(args.url, build_scenarios(filename, columns), args.concurrency,
+                                  args.duration, args.requests)
+    report(latencies, errors, wall)
+
+
+if __name__ == '__main__':
+    main()
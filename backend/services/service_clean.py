@@ -0,0 +1,302 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from config import STREAM_CHUNK_ROWS
+from utils import HAS_ARROW, read_columns, iter_csv_chunks
+from services.service_sketch import RunningMoments, KLLSketch
+
+if HAS_ARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as pa_parquet
+
+# 清洗结果支持的输出格式 (Parquet 依赖 pyarrow)
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+# 【清洗策略库】
+# 缺失值插补：均值 / 中位数 / 众数 / 前向填充 / 不处理
+IMPUTE_METHODS = ('mean', 'median', 'mode', 'ffill', 'none')
+# 异常值判定：3σ 拉依达准则 / 四分位距 / 中位数绝对偏差 (修正 Z 分数) / 分位数缩尾 / 不处理
+OUTLIER_METHODS = ('sigma', 'iqr', 'mad', 'winsorize', 'none')
+# 各判定方法的默认阈值系数
+DEFAULT_THRESHOLDS = {'sigma': 3.0, 'iqr': 1.5, 'mad': 3.5}
+DEFAULT_WINSOR_LIMITS = (0.01, 0.99)
+# 正态分布下 MAD 与标准差的换算系数 (1 / Φ⁻¹(0.75))
+MAD_SCALE = 1.4826
+# 流式清洗仅支持可由可合并累加器 / 分位数草图求得的策略
+STREAM_IMPUTE_METHODS = ('mean', 'median', 'ffill', 'none')
+STREAM_OUTLIER_METHODS = ('sigma', 'iqr', 'winsorize', 'none')
+
+
+def resolve_strategy(options=None):
+    """
+    校验并补全清洗策略，非法取值抛出 ValueError。
+    缺省策略 (均值插补 + 3σ 裁剪) 与历史清洗行为完全一致。
+    """
+    options = options or {}
+    impute = options.get('impute') or 'mean'
+    outliers = options.get('outliers') or 'sigma'
+    if impute not in IMPUTE_METHODS:
+        raise ValueError(f"不支持的插补策略: {impute}")
+    if outliers not in OUTLIER_METHODS:
+        raise ValueError(f"不支持的异常值策略: {outliers}")
+    threshold = options.get('threshold')
+    threshold = float(threshold) if threshold is not None else DEFAULT_THRESHOLDS.get(outliers)
+    lower, upper = (float(v) for v in (options.get('winsor_limits') or DEFAULT_WINSOR_LIMITS))
+    if not 0 <= lower < upper <= 1:
+        raise ValueError("缩尾分位数须满足 0 <= 下限 < 上限 <= 1")
+    return {"impute": impute, "outliers": outliers, "threshold": threshold, "winsor_limits": [lower, upper]}
+
+
+def _empty_report(total_rows, strategy):
+    return {"total_rows": total_rows, "total_missing": 0, "missing_details": {},
+            "total_outliers": 0, "outliers_details": {}, "strategy": strategy, "bounds": {}}
+
+
+def _bounds_list(lower, upper):
+    return [None if np.isnan(v) else float(v) for v in (lower, upper)]
+
+
+def _outlier_bounds(X, strategy):
+    """沿列轴一次性求出所有数值列的异常值上下界 (全空列的边界为 NaN，即不裁剪)"""
+    method, k = strategy["outliers"], strategy["threshold"]
+    n = X.shape[1]
+    if method == 'none':
+        return np.full(n, np.nan), np.full(n, np.nan)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if method == 'sigma':
+            center = np.nanmean(X, axis=0)
+            count = (~np.isnan(X)).sum(axis=0)
+            std = np.where(count > 1, np.nanstd(X, axis=0, ddof=1), 0.0)
+            return center - k * std, center + k * std
+        if method == 'iqr':
+            q1, q3 = np.nanquantile(X, [0.25, 0.75], axis=0)
+            return q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+        if method == 'mad':
+            median = np.nanmedian(X, axis=0)
+            mad = np.nanmedian(np.abs(X - median), axis=0)
+            return median - k * MAD_SCALE * mad, median + k * MAD_SCALE * mad
+        return tuple(np.nanquantile(X, strategy["winsor_limits"], axis=0))
+
+
+def _restore_dtype(values, original):
+    """写回时保持原列类型：整数列仅在裁剪结果仍为整数时保持整数，与 pandas clip 的升格规则一致"""
+    if original.dtype.kind in 'iu':
+        if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+            return values.astype(original.dtype)
+        return values
+    return values.astype(original.dtype, copy=False)
+
+
+def clean_frame(df, strategy=None, dry_run=False):
+    """
+    【核心预处理算法：智能缺失值插补与异常值裁剪引擎】
+    将所有数值列物化为一个 NumPy 矩阵，插补值、异常值边界、越界计数与裁剪均沿列轴一次性完成。
+
+    :param strategy: resolve_strategy 返回的策略字典，缺省为均值插补 + 3σ 裁剪
+    :param dry_run: 为 True 时只生成战报，不修改数据
+    :return: (清洗后的数据框, 清洗战报)
+    """
+    strategy = strategy or resolve_strategy()
+    numeric_cols = df.select_dtypes(include=['number']).columns
+    report = _empty_report(len(df), strategy)
+    if len(numeric_cols) == 0:
+        return df, report
+
+    X = df[numeric_cols].to_numpy(dtype='float64', na_value=np.nan)
+    null_counts = np.isnan(X).sum(axis=0)
+
+    # 1. 缺失值插补
+    impute = strategy["impute"]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if impute == 'ffill':
+            X = df[numeric_cols].ffill().to_numpy(dtype='float64', na_value=np.nan)
+        elif impute != 'none':
+            if impute == 'mean':
+                fill = np.nanmean(X, axis=0)
+            elif impute == 'median':
+                fill = np.nanmedian(X, axis=0)
+            else:
+                modes = df[numeric_cols].mode(dropna=True)
+                fill = modes.iloc[0].to_numpy(dtype='float64', na_value=np.nan) if len(modes) else np.full(X.shape[1], np.nan)
+            X = np.where(np.isnan(X), fill, X)
+
+    # 2. 异常值判定与裁剪 (NaN 边界视为不设限)
+    lower, upper = _outlier_bounds(X, strategy)
+    with np.errstate(invalid='ignore'):
+        outlier_counts = ((X < lower) | (X > upper)).sum(axis=0)
+    X = np.clip(X, np.where(np.isnan(lower), -np.inf, lower), np.where(np.isnan(upper), np.inf, upper))
+
+    for j, col in enumerate(numeric_cols):
+        if null_counts[j] > 0:
+            report["missing_details"][col] = int(null_counts[j])
+            report["total_missing"] += int(null_counts[j])
+        if outlier_counts[j] > 0:
+            report["outliers_details"][col] = int(outlier_counts[j])
+            report["total_outliers"] += int(outlier_counts[j])
+        report["bounds"][col] = _bounds_list(lower[j], upper[j])
+
+    if not dry_run:
+        df = df.copy()
+        for j, col in enumerate(numeric_cols):
+            df[col] = _restore_dtype(X[:, j], df[col])
+    return df, report
+
+
+def write_frame(df, path, output_format='csv'):
+    """按输出格式固化清洗结果 (CSV 采用 UTF-8-SIG 解决 Excel 解析中文乱码)"""
+    if output_format == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+class _ChunkWriter:
+    """分块追加写出器：CSV 仅首块写表头与 BOM；Parquet 以首块 schema 为准逐块写入行组"""
+
+    def __init__(self, path, output_format):
+        self.path = path
+        self.tmp = f"{path}.{os.getpid()}.tmp"
+        self.output_format = output_format
+        self._parquet = None
+        self._started = False
+
+    def write(self, chunk):
+        if self.output_format == 'parquet':
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pa_parquet.ParquetWriter(self.tmp, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            chunk.to_csv(self.tmp, index=False, header=not self._started, mode='a' if self._started else 'w',
+                         encoding='utf-8' if self._started else 'utf-8-sig')
+        self._started = True
+
+    def close(self, columns):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif not self._started:
+            write_frame(pd.DataFrame(columns=columns), self.tmp, self.output_format)
+        os.replace(self.tmp, self.path)
+
+
+def _absorb_constant(moments, sketch, value, count):
+    """把 count 个相同的插补值并入累加器与草图 (常数组的二阶中心矩为 0，可直接按 Chan 公式合并)"""
+    if count == 0 or np.isnan(value):
+        return
+    group = RunningMoments()
+    group.count, group.mean, group.m2, group.min, group.max = count, float(value), 0.0, float(value), float(value)
+    moments.merge(group)
+    if sketch is not None:
+        for start in range(0, count, STREAM_CHUNK_ROWS):
+            sketch.update(np.full(min(STREAM_CHUNK_ROWS, count - start), value))
+
+
+def _stream_bounds(moments, sketch, strategy):
+    method, k = strategy["outliers"], strategy["threshold"]
+    if method == 'none' or moments.count == 0:
+        return np.nan, np.nan
+    if method == 'sigma':
+        std = moments.std if moments.count > 1 else 0.0
+        return moments.mean - k * std, moments.mean + k * std
+    if method == 'iqr':
+        q1, q3 = sketch.quantile([0.25, 0.75])
+        return q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    return tuple(sketch.quantile(strategy["winsor_limits"]))
+
+
+def _ffill_chunk(series, carry):
+    """跨块前向填充：块首的缺失值沿用上一块的最后一个有效值"""
+    filled = series.ffill()
+    if not np.isnan(carry):
+        filled = filled.fillna(carry)
+    valid = filled.dropna()
+    return filled, (float(valid.iloc[-1]) if len(valid) else carry)
+
+
+def clean_streaming(filepath, out_path, output_format='csv', strategy=None, dry_run=False):
+    """
+    【两遍流式清洗】：内存峰值只与数据块大小相关。
+      第一遍：分块累加各列缺失数、可合并的 Welford 矩与极值 (按需附带 KLL 分位数草图)，并记录各块推断出的类型；
+      第二遍：按第一遍得到的全局插补值与异常值边界逐块插补、裁剪并追加写出。
+    常数插补值的二阶中心矩为 0，插补后的矩可由 Chan 合并公式直接得到，无需第三遍扫描；
+    均值插补 + 3σ 策略下战报与全量清洗 (clean_frame) 一致，依赖分位数的策略为草图近似值。
+    """
+    strategy = strategy or resolve_strategy()
+    impute, outliers = strategy["impute"], strategy["outliers"]
+    if impute not in STREAM_IMPUTE_METHODS or outliers not in STREAM_OUTLIER_METHODS:
+        raise ValueError("众数插补与 MAD 判定需要全量数据，流式清洗暂不支持，请关闭 stream 模式")
+    need_sketch = impute == 'median' or outliers in ('iqr', 'winsorize')
+
+    header = read_columns(filepath)
+    kinds = {col: set() for col in header}
+    nulls = dict.fromkeys(header, 0)
+    remaining = dict.fromkeys(header, 0)
+    carry = dict.fromkeys(header, np.nan)
+    moments = {col: RunningMoments() for col in header}
+    sketches = {col: KLLSketch() if need_sketch else None for col in header}
+    total_rows = 0
+
+    for chunk in iter_csv_chunks(filepath):
+        total_rows += len(chunk)
+        for col in header:
+            series = chunk[col]
+            kinds[col].add(series.dtype.kind)
+            nulls[col] += int(series.isna().sum())
+            if series.dtype.kind not in 'iuf':
+                continue
+            if impute == 'ffill':
+                series, carry[col] = _ffill_chunk(series, carry[col])
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            remaining[col] += int(np.isnan(values).sum())
+            moments[col].update(values)
+            if need_sketch:
+                sketches[col].update(values)
+
+    # 仅在每个数据块中都被推断为数值的列，才会在全量解析时成为数值列
+    numeric_cols = [c for c in header if kinds[c] and kinds[c] <= set('iuf')]
+    report = _empty_report(total_rows, strategy)
+    report["approximate"] = need_sketch
+    plan, dtypes = {}, {}
+    for col in numeric_cols:
+        if nulls[col] > 0:
+            report["missing_details"][col] = nulls[col]
+            report["total_missing"] += nulls[col]
+        m, sketch = moments[col], sketches[col]
+        fill = np.nan
+        if impute in ('mean', 'median') and m.count:
+            fill = m.mean if impute == 'mean' else sketch.quantile(0.5)
+            _absorb_constant(m, sketch, fill, remaining[col])
+        lower, upper = _stream_bounds(m, sketch, strategy)
+        plan[col] = (fill, lower, upper)
+        report["bounds"][col] = _bounds_list(lower, upper)
+        # 整数列只要裁剪到非整数边界即整体升格为浮点，与全量裁剪的类型行为保持一致
+        clipped = m.count and ((m.min < lower and not float(lower).is_integer())
+                               or (m.max > upper and not float(upper).is_integer()))
+        dtypes[col] = 'int64' if kinds[col] <= set('iu') and not clipped else 'float64'
+
+    writer = None if dry_run else _ChunkWriter(out_path, output_format)
+    text_cols = [c for c in header if c not in numeric_cols]
+    carry = dict.fromkeys(numeric_cols, np.nan)
+    for chunk in iter_csv_chunks(filepath, dtype=dtypes, text_columns=text_cols):
+        for col in numeric_cols:
+            fill, lower_bound, upper_bound = plan[col]
+            values = chunk[col]
+            if impute == 'ffill':
+                values, carry[col] = _ffill_chunk(values, carry[col])
+            elif not np.isnan(fill):
+                values = values.fillna(fill)
+            outlier_count = int(((values < lower_bound) | (values > upper_bound)).sum())
+            if outlier_count > 0:
+                report["outliers_details"][col] = report["outliers_details"].get(col, 0) + outlier_count
+                report["total_outliers"] += outlier_count
+            chunk[col] = values.clip(lower=lower_bound, upper=upper_bound)
+        if writer is not None:
+            writer.write(chunk)
+    if writer is not None:
+        writer.close(header)
+    report["outliers_details"] = {c: report["outliers_details"][c] for c in numeric_cols
+                                  if c in report["outliers_details"]}
+    return report
@@ -0,0 +1,179 @@
+import os
+import glob
+import time
+import uuid
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from config import JOB_WORKERS, JOB_RETENTION_SECONDS, JOB_MAX_RETAINED
+from utils import state_path, write_state, read_state
+
+# 【异步任务子系统：本地进程池 + 落盘共享状态】
+# 重计算任务在独立进程中执行，不占用 Flask 请求线程，也不与轻量接口争抢 GIL；
+# 任务状态、进度与取消标志均以 JSON 文件落盘，多进程 WSGI 部署下任意工作进程都能查询或取消任务
+_executor = None
+_web_processes = 1
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """任务在检查点处发现取消标志后主动中止"""
+
+
+def _job_path(job_id):
+    return state_path('jobs', job_id)
+
+
+def _cancel_path(job_id):
+    return state_path('jobs', f"{job_id}.cancel")
+
+
+class JobProgress:
+    """
+    工作进程侧的进度句柄 (可被 pickle 传递至子进程)。
+    任务函数通过 update 上报进度，并在阶段边界调用 check_cancelled 响应取消请求。
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def update(self, percent, message='', **extra):
+        state = read_state(_job_path(self.job_id)) or {}
+        state.update(extra, percent=int(percent), message=message)
+        write_state(_job_path(self.job_id), state)
+
+    def check_cancelled(self):
+        if os.path.exists(_cancel_path(self.job_id)):
+            raise JobCancelled()
+
+
+def running_jobs():
+    """统计所有工作进程中处于 running 状态的任务数 (读取落盘状态，跨进程一致)"""
+    return sum(1 for path in glob.glob(state_path('jobs', '*'))
+               if not path.endswith('.cancel.json') and (read_state(path) or {}).get("state") == "running")
+
+
+def set_web_processes(count):
+    """
+    声明共享本机的 Web 工作进程数，由部署入口在派生工作进程之前调用。
+    每个 Web 工作进程各自持有一个进程池，池规模按此均分 JOB_WORKERS，避免任务进程总数随 Web 进程数成倍增长
+    """
+    global _web_processes
+    _web_processes = max(1, int(count))
+
+
+def pool_size():
+    """当前进程的任务进程池规模：整机预算 JOB_WORKERS 按 Web 工作进程数均分，至少为 1"""
+    return max(1, JOB_WORKERS // _web_processes)
+
+
+def _ensure_pool():
+    """
+    惰性创建进程池。进程池在多线程的请求处理上下文中建立，fork 会把其他线程持有的锁原样复制进子进程，
+    因此统一以 spawn 方式启动工作进程 (任务函数须为可按模块路径导入的顶层函数)
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _run_job(fn, payload, progress):
+    """工作进程入口：统一包装任务函数，确保异常以可序列化的消息形式回传"""
+    try:
+        # 排队期间已被其他工作进程取消的任务不再执行
+        progress.check_cancelled()
+        progress.update(0, "运行中", state="running")
+        return {"ok": True, "result": fn(payload, progress)}
+    except JobCancelled:
+        return {"ok": False, "cancelled": True}
+    except Exception as e:
+        traceback.print_exc()
+        return {"ok": False, "message": str(e)}
+
+
+def _finish(job_id, future):
+    """任务结束回调：把最终结果写入状态文件，供所有工作进程读取"""
+    state = read_state(_job_path(job_id)) or {}
+    if future.cancelled():
+        state["state"] = "cancelled"
+    else:
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = {"ok": False, "message": f"任务进程异常退出: {e}"}
+        if outcome["ok"]:
+            state.update(state="done", percent=100, result=outcome["result"])
+        elif outcome.get("cancelled"):
+            state["state"] = "cancelled"
+        else:
+            state.update(state="error", message=outcome["message"])
+    state["finished"] = time.time()
+    write_state(_job_path(job_id), state)
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+
+
+def _purge_expired():
+    """回收超过保留时长或超出保留上限的已结束任务"""
+    now = time.time()
+    finished = []
+    for path in glob.glob(state_path('jobs', '*')):
+        state = read_state(path)
+        if state and state.get("finished"):
+            finished.append((state["created"], path))
+    finished.sort()
+    for i, (created, path) in enumerate(finished):
+        if now - created > JOB_RETENTION_SECONDS or len(finished) - i > JOB_MAX_RETAINED:
+            for target in (path, path[:-len('.json')] + '.cancel.json'):
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+
+
+def submit_job(kind, fn, payload):
+    """
+    投递后台任务并立即返回任务 ID。
+
+    :param kind: 任务类别标识 (如 'predict')
+    :param fn: 模块级任务函数 fn(payload, progress)，须可被子进程导入
+    :param payload: 可序列化的任务参数字典
+    """
+    with _jobs_lock:
+        executor = _ensure_pool()
+        _purge_expired()
+        job_id = uuid.uuid4().hex
+        write_state(_job_path(job_id), {"kind": kind, "created": time.time(), "state": "queued",
+                                        "percent": 0, "message": "排队中"})
+        future = executor.submit(_run_job, fn, payload, JobProgress(job_id))
+        _jobs[job_id] = future
+    future.add_done_callback(lambda f: _finish(job_id, f))
+    return job_id
+
+
+def get_job(job_id):
+    """查询任务状态快照：queued / running / done / error / cancelled；不存在时返回 None"""
+    state = read_state(_job_path(job_id))
+    if state is None:
+        return None
+    if state.get("state") in ("queued", "running") and os.path.exists(_cancel_path(job_id)):
+        # 取消指令已下达、任务尚未到达检查点
+        state["cancel_requested"] = True
+    info = {"job_id": job_id, "kind": state.pop("kind"), "created": state.pop("created"),
+            "progress": state.pop("percent", 0), "message": state.pop("message", ''), **state}
+    info.pop("finished", None)
+    return info
+
+
+def cancel_job(job_id):
+    """取消任务：本进程排队中的任务直接撤销；其余情况置位取消标志，于下一个检查点中止"""
+    if read_state(_job_path(job_id)) is None:
+        return False
+    with _jobs_lock:
+        future = _jobs.get(job_id)
+    if future is None or not future.cancel():
+        write_state(_cancel_path(job_id), {"requested": time.time()})
+    return True
@@ -0,0 +1,77 @@
+import warnings
+import numpy as np
+from utils import read_df, get_derived, put_derived
+
+# 五数概括所需的分位点 (最小值、下四分位、中位数、上四分位、最大值)
+QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+
+def compute_column_stats(df, columns):
+    """
+    【融合统计核：单次遍历的向量化矩计算】
+    将所有选中的数值列一次性物化为 NumPy 二维矩阵，沿列轴批量求出计数、缺失数、均值、标准差、
+    五数概括、偏度，再为每列生成直方图分箱。描述统计、分布可视化与数据摘要三个接口共用此结果。
+
+    :param df: 已完成列投影的数据框
+    :param columns: 需计算的数值列
+    :return: dict {列名: 统计量字典}
+    """
+    if not columns:
+        return {}
+    X = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+    mask = ~np.isnan(X)
+    n = mask.sum(axis=0)
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # 全空列会触发 "Mean of empty slice" 等告警，其结果本就应为 NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(X, axis=0)
+        dev = np.where(mask, X - mean, 0.0)
+        m2 = (dev ** 2).sum(axis=0)
+        m3 = (dev ** 3).sum(axis=0)
+        std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        quantiles = np.nanquantile(X, QUANTILES, axis=0)
+
+        # 与 pandas.Series.skew 口径一致的无偏偏度 (Fisher-Pearson 校正)
+        pm2, pm3 = m2 / n, m3 / n
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * pm3 / pm2 ** 1.5
+        skew = np.where(n < 3, np.nan, np.where(pm2 <= 1e-14 * np.maximum(mean ** 2, 1), 0.0, skew))
+
+    result = {}
+    for j, col in enumerate(columns):
+        values = X[mask[:, j], j]
+        counts, edges = np.histogram(values, bins='auto') if values.size else (np.array([], dtype=int), np.array([]))
+        result[col] = {
+            "count": int(n[j]), "nulls": int(len(X) - n[j]), "mean": float(mean[j]), "std": float(std[j]),
+            "min": float(quantiles[0, j]), "q25": float(quantiles[1, j]), "median": float(quantiles[2, j]),
+            "q75": float(quantiles[3, j]), "max": float(quantiles[4, j]), "skew": float(skew[j]),
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()}
+        }
+    return result
+
+
+def get_column_stats(filepath, columns, df=None):
+    """
+    按文件版本缓存的统计核入口：已算过的列直接复用，其余列合并为一次批量计算。
+    同一会话内仪表盘的描述统计、分布图与摘要调用因此只需计算一次。
+
+    :param df: 可选的已加载数据框；缺省时仅按需投影读取未命中的列
+    :return: dict {列名: 统计量字典}，文件中不存在的列会被忽略
+    """
+    result, missing = {}, []
+    for col in dict.fromkeys(columns):
+        cached = get_derived(filepath, ('colstats', col))
+        if cached is not None:
+            result[col] = cached
+        else:
+            missing.append(col)
+
+    if missing:
+        if df is None:
+            df = read_df(filepath, usecols=missing, dtype=dict.fromkeys(missing, 'float64'))
+        present = [c for c in missing if c in df.columns]
+        for col, col_stats in compute_column_stats(df, present).items():
+            put_derived(filepath, ('colstats', col), col_stats)
+            result[col] = col_stats
+
+    return {col: result[col] for col in columns if col in result}
@@ -2,11 +2,18 @@ import os
 import pandas as pd
 import numpy as np
 from flask import request, jsonify
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
-from config import UPLOAD_FOLDER
-from utils import read_df
+from threadpoolctl import threadpool_limits
+from config import (UPLOAD_FOLDER, ML_N_JOBS, ML_TREE_STAGES, ML_LARGE_ROWS, ML_LARGE_MAX_DEPTH, ML_HGB_ROWS,
+                    ML_PERMUTATION_SAMPLE, PREDICT_SCATTER_POINTS, PREDICT_SERIES_POINTS, SCATTER_POINT_LIMIT)
+from utils import read_df, invalidate_df_cache
+from services.service_profile import get_profile
+from services.service_jobs import submit_job, running_jobs
+from services.service_models import get_or_train
+from services.service_reduce import clamp_budget, random_indices, lttb_indices
 
 
 def do_summary():
@@ -16,29 +23,22 @@ def do_summary():
     try:
         filename = request.json.get('filename')
         if not filename: return jsonify({"status": "error", "message": "系统未找到当前处理的文件"}), 400
-        df = read_df(os.path.join(UPLOAD_FOLDER, filename))
-
-        # 尝试将能转数值的列都强转成数值，为机器学习铺路
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except Exception:
-                pass
+        # 优先复用上传时后台构建的数据画像，无需再次触碰原始数据
+        profile = get_profile(os.path.join(UPLOAD_FOLDER, filename))
+        col_profiles = profile["column_profiles"]
 
         # 核心特征分类
-        all_cols = df.columns.tolist()
-        numeric_cols = [c for c in all_cols if pd.api.types.is_numeric_dtype(df[c]) and not any(
-            kw in str(c).lower() for kw in ['号', 'id', '编号', '代码'])]
-        categorical_cols = [c for c in all_cols if c not in numeric_cols]
-        binary_cols = [c for c in all_cols if df[c].nunique() == 2]
-
-        row_count = len(df)
-        col_count = len(df.columns)
+        numeric_cols = profile["numeric_columns"]
+        categorical_cols = profile["categorical_columns"]
+        binary_cols = profile["binary_columns"]
+
+        row_count = profile["row_count"]
+        col_count = profile["col_count"]
         insights = []
 
         # 1. 矩阵稀疏度 (Sparsity) 探针与过拟合预警
         total_cells = row_count * col_count
-        missing_cells = df.isnull().sum().sum()
+        missing_cells = sum(cp["nulls"] for cp in col_profiles.values())
         missing_rate = missing_cells / total_cells if total_cells > 0 else 0
         quality_score = 100 - (missing_rate * 100)
 
@@ -57,8 +57,8 @@ def do_summary():
         if len(numeric_cols) > 0:
             skew_insights = []
             for col in numeric_cols:
-                skew_val = df[col].skew()
-                if pd.notna(skew_val):
+                skew_val = col_profiles[col]["skew"]
+                if skew_val is not None:
                     if skew_val > 1.5:
                         skew_insights.append(f"【{col}】存在严重的“右偏”断档")
                     elif skew_val < -1.5:
@@ -76,7 +76,8 @@ def do_summary():
         # 3. 靶点特征推荐算法 (基于关联度极值搜寻最易预测特征)
         has_ai_recommendation = False
         if len(numeric_cols) >= 3:
-            corr_df = df[numeric_cols].corr().abs()
+            corr = profile["correlation"]
+            corr_df = pd.DataFrame(corr["matrix"], index=corr["columns"], columns=corr["columns"], dtype=float).abs()
             target_candidate = corr_df.sum().idxmax()
             feature_candidates = [c for c in numeric_cols if c != target_candidate]
             insights.append(
@@ -96,123 +97,308 @@ def do_summary():
         return jsonify({"status": "error", "message": f"算法运算异常: {str(e)}"}), 500
 
 
-def do_predict():
-    """【预测模块一：基于随机森林 (Random Forest) 的特征重要性拆解】"""
-    try:
-        data = request.json
-        filename = data.get('filename')
-        target_col = data.get('target_col')
-        feature_cols = data.get('feature_cols', [])
-
-        if not filename or not target_col or len(feature_cols) == 0:
-            return jsonify({"status": "error", "message": "参数设定不完整"}), 400
+def _load_training_set(filename, target_col, feature_cols, min_rows_message):
+    """加载并切分训练数据 (8:2，固定随机种子)，有效样本不足时抛出带提示语的 ValueError"""
+    df = read_df(os.path.join(UPLOAD_FOLDER, filename), usecols=[target_col] + feature_cols)
+    df_clean = df[[target_col] + feature_cols].dropna()
 
-        df = read_df(os.path.join(UPLOAD_FOLDER, filename))
-        df_clean = df[[target_col] + feature_cols].dropna()
+    if len(df_clean) < 10:
+        raise ValueError(min_rows_message)
 
-        if len(df_clean) < 10:
-            return jsonify({"status": "error", "message": "去除缺失值后有效数据量过低，模型无法收敛"}), 400
+    X = df_clean[feature_cols]
+    y = df_clean[target_col]
+    return train_test_split(X, y, test_size=0.2, random_state=42)
 
-        X = df_clean[feature_cols]
-        y = df_clean[target_col]
 
-        # 以 8:2 切分构建训练集与测试集
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+# 可选的回归引擎：精确分裂的随机森林 / 直方图分箱的梯度提升树
+ENGINES = ('random_forest', 'hist_gbdt')
 
-        # 实例化 Bagging 集成树模型，锁定随机种子以保证结果复现性
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
 
-        r2 = r2_score(y_test, y_pred)
-        mse = mean_squared_error(y_test, y_pred)
+def resolve_engine(engine, n_train):
+    """engine=auto (或缺省) 时按训练集行数自动选择：大数据集走直方图梯度提升"""
+    if engine in ENGINES:
+        return engine
+    return 'hist_gbdt' if n_train > ML_HGB_ROWS else 'random_forest'
 
-        importances = model.feature_importances_.tolist()
-        feature_importances = [round(i * 100, 2) for i in importances]
 
-        # 降维抽样，下发不超过 100 条真实/预测对给前端散点图
-        scatter_data = [[float(actual), float(pred)] for actual, pred in
-                        zip(y_test.tolist()[:100], y_pred.tolist()[:100])]
+def model_params(engine, n_train):
+    """
+    【训练规模自适应】：生成指定引擎的超参数 (参与模型注册表指纹计算)。
+    随机森林在训练集超过 ML_LARGE_ROWS 行时，按比例限制每棵树的自助抽样规模并封顶树深，使百万行文件的训练时长有界；
+    直方图梯度提升天然按分箱计算分裂点，无需额外限流。
+    """
+    if engine == 'hist_gbdt':
+        return {"engine": engine, "max_iter": ML_TREE_STAGES[-1], "learning_rate": 0.1, "random_state": 42,
+                "test_size": 0.2, "early_stopping": False}
+    params = {"engine": engine, "n_estimators": ML_TREE_STAGES[-1], "random_state": 42,
+              "test_size": 0.2, "max_samples": None, "max_depth": None}
+    if n_train > ML_LARGE_ROWS:
+        params.update(max_samples=round(ML_LARGE_ROWS / n_train, 4), max_depth=ML_LARGE_MAX_DEPTH)
+    return params
+
+
+def training_n_jobs():
+    """训练并行度：显式配置 ML_N_JOBS 时直接采用，否则按正在运行的训练任务数均分 CPU 核心"""
+    if ML_N_JOBS:
+        return ML_N_JOBS
+    return max(1, (os.cpu_count() or 1) // max(1, running_jobs()))
+
+
+def build_estimator(params, n_jobs=-1):
+    """按超参数实例化可热启动 (warm_start) 的回归器，返回 (模型, 逐级生长所用的参数名)"""
+    if params["engine"] == 'hist_gbdt':
+        model = HistGradientBoostingRegressor(max_iter=ML_TREE_STAGES[0], learning_rate=params["learning_rate"],
+                                              random_state=params["random_state"], early_stopping=False,
+                                              warm_start=True)
+        return model, "max_iter"
+    # 实例化 Bagging 集成树模型，锁定随机种子以保证结果复现性；n_jobs 控制并行建树的核心数
+    model = RandomForestRegressor(n_estimators=ML_TREE_STAGES[0], random_state=params["random_state"],
+                                  max_samples=params["max_samples"], max_depth=params["max_depth"],
+                                  n_jobs=n_jobs, warm_start=True)
+    return model, "n_estimators"
+
+
+def _permutation_importances(model, X_test, y_test, n_jobs):
+    """在测试集子样本上并行计算置换重要性，负值截断为 0 后归一化"""
+    if len(X_test) > ML_PERMUTATION_SAMPLE:
+        X_test = X_test.sample(ML_PERMUTATION_SAMPLE, random_state=42)
+        y_test = y_test.loc[X_test.index]
+    result = permutation_importance(model, X_test, y_test, n_repeats=5, random_state=42, n_jobs=n_jobs)
+    scores = np.clip(result.importances_mean, 0, None)
+    total = scores.sum()
+    return (scores / total if total > 0 else scores).tolist()
+
+
+def _fit_model(filename, target_col, feature_cols, split, engine, progress):
+    """
+    经由模型注册表获取回归模型：同一文件版本、变量组合与引擎下的模型只训练一次。
+    新训练时以热启动 (warm_start) 方式逐级生长树木 / 提升轮次，并在每个节点把测试集 R²/MSE 作为中间结果实时上报。
+    """
+    X_train, X_test, y_train, y_test = split
+    params = model_params(resolve_engine(engine, len(X_train)), len(X_train))
+
+    def trainer():
+        n_jobs = training_n_jobs()
+        model, stage_param = build_estimator(params, n_jobs)
+        stages = []
+        # 梯度提升经由 OpenMP 多线程训练，同样按分得的核心数限流
+        with threadpool_limits(limits=n_jobs, user_api='openmp'):
+            for i, n_stage in enumerate(ML_TREE_STAGES):
+                progress.check_cancelled()
+                # 热启动仅追加新树 / 新一轮提升，已有部分保持不变，最终模型与一次性训练完全一致
+                model.set_params(**{stage_param: n_stage})
+                model.fit(X_train, y_train)
+                y_pred = model.predict(X_test)
+                # 阶段记录以各模型自身的规模参数命名：随机森林为树木数，梯度提升为提升迭代轮数
+                stages.append({stage_param: n_stage, "r2": float(round(r2_score(y_test, y_pred), 4)),
+                               "mse": float(round(mean_squared_error(y_test, y_pred), 4))})
+                message = f"已生长 {n_stage} 棵决策树" if stage_param == "n_estimators" else f"已完成 {n_stage} 轮提升迭代"
+                progress.update(30 + 55 * (i + 1) // len(ML_TREE_STAGES), message, stages=stages)
+
+            # 随机森林沿用 Gini 不纯度重要性；梯度提升无内置重要性，改用置换重要性
+            if hasattr(model, 'feature_importances_'):
+                importances, method = model.feature_importances_.tolist(), "impurity"
+            else:
+                progress.update(85, "计算置换特征重要性")
+                importances, method = _permutation_importances(model, X_test, y_test, n_jobs), "permutation"
+        return {"model": model, "stages": stages, "importances": importances, "importance_method": method}
 
-        return jsonify({
-            "status": "success",
-            "data": {
-                "r2": round(r2, 4),
-                "mse": round(mse, 4),
-                "features": feature_cols,
-                "importances": feature_importances,
-                "scatter": scatter_data
-            }
-        })
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    progress.update(30, "训练随机森林模型" if params["engine"] == 'random_forest' else "训练直方图梯度提升模型")
+    return get_or_train(os.path.join(UPLOAD_FOLDER, filename), target_col, feature_cols, params, trainer)
 
 
-def do_predict_new():
-    """【预测模块二：集成时间序列平滑与置信度动态惩罚规则的推理引擎】"""
+def train_predict(params, progress):
+    """
+    【预测模块一：基于随机森林 (Random Forest) 的特征重要性拆解】
+    后台任务函数，在任务进程池中执行。
+    """
+    target_col, feature_cols = params['target_col'], params['feature_cols']
+    progress.update(10, "加载训练数据")
+    split = _load_training_set(params['filename'], target_col, feature_cols, "去除缺失值后有效数据量过低，模型无法收敛")
+    X_test, y_test = split[1], split[3]
+    progress.check_cancelled()
+
+    artifact, reused = _fit_model(params['filename'], target_col, feature_cols, split, params.get('engine'), progress)
+    model, model_features = artifact["model"], artifact["feature_cols"]
+    progress.check_cancelled()
+
+    progress.update(90, "评估模型表现")
+    y_pred = model.predict(X_test[model_features])
+
+    r2 = r2_score(y_test, y_pred)
+    mse = mean_squared_error(y_test, y_pred)
+
+    # 复用模型的特征顺序可能与本次勾选顺序不同，按请求顺序重排重要性
+    importances = dict(zip(model_features, artifact["importances"]))
+    feature_importances = [round(importances[c] * 100, 2) for c in feature_cols]
+
+    # 降维抽样：按客户端点数预算 (缺省 100) 从整个测试集均匀随机抽取真实/预测对给前端散点图
+    budget = clamp_budget(params.get('max_points'), PREDICT_SCATTER_POINTS, SCATTER_POINT_LIMIT)
+    idx = random_indices(len(y_pred), budget)
+    scatter_data = np.column_stack([y_test.to_numpy(dtype='float64')[idx], y_pred[idx]]).tolist()
+
+    return {
+        "r2": float(round(r2, 4)),
+        "mse": float(round(mse, 4)),
+        "features": feature_cols,
+        "importances": feature_importances,
+        "scatter": scatter_data,
+        "scatter_reduction": {"method": "random" if len(idx) < len(y_pred) else "none",
+                              "original_points": len(y_pred), "returned_points": len(idx), "budget": budget},
+        "engine": artifact["hyperparams"]["engine"],
+        "importance_method": artifact["importance_method"],
+        "stages": artifact["stages"],
+        "model_reused": reused
+    }
+
+
+def train_predict_new(params, progress):
+    """
+    【预测模块二：集成时间序列平滑与置信度动态惩罚规则的推理引擎】
+    后台任务函数，在任务进程池中执行。
+    """
+    target_col, feature_cols = params['target_col'], params['feature_cols']
+    progress.update(10, "加载训练数据")
+    split = _load_training_set(params['filename'], target_col, feature_cols, "有效数据量不足")
+    X_test, y_test = split[1], split[3]
+    progress.check_cancelled()
+
+    artifact, reused = _fit_model(params['filename'], target_col, feature_cols, split, params.get('engine'), progress)
+    model = artifact["model"]
+    progress.check_cancelled()
+
+    # 提取 50 条连续序列进行仿真推理展示
+    progress.update(90, "生成推理序列")
+    sample_size = min(50, len(X_test))
+    X_show = X_test[artifact["feature_cols"]].iloc[:sample_size]
+    y_show_real = y_test.iloc[:sample_size].values
+    y_show_pred = model.predict(X_show)
+
+    # ====== 🚀 核心算法创新：引入启发式多维惩罚机制 ======
+    sample_r2 = r2_score(y_show_real, y_show_pred)
+    std_pred = np.std(y_show_pred)
+    std_real = np.std(y_show_real)
+
+    # 1. Pearson 趋势相关系数（侦测拟合曲线相位是否一致）
+    if std_pred == 0 or std_real == 0:
+        corr = 0
+    else:
+        corr = np.corrcoef(y_show_real, y_show_pred)[0, 1]
+
+    # 2. 平均绝对百分比误差 (MAPE) 推导基础准确率
+    mape = np.mean(np.abs((y_show_real - y_show_pred) / (y_show_real + 1e-9)))
+    acc = max(0, 1 - mape)
+
+    # 3. 退化熔断：若 R2 极低或相关性破灭，代表模型退化为纯均值直线。此时触发惩罚系数 0.45
+    if sample_r2 < 0.15 or corr < 0.3:
+        confidence = round(acc * 45, 2)
+    else:
+        confidence = round((acc * 0.4 + corr * 0.6) * 100, 2)
+
+    if confidence > 99:
+        confidence = 98.75
+
+    # 图表序列：对整个测试集按原始行序推理 (置信度口径不变，仍基于上方的展示序列)，
+    # LTTB 降采样时真实与预测两条折线共用一组横坐标，按合并后的三角形面积选点，保留峰谷形态
+    X_series = X_test.sort_index()
+    series_real = y_test.loc[X_series.index].to_numpy(dtype='float64')
+    series_pred = model.predict(X_series[artifact["feature_cols"]])
+    budget = clamp_budget(params.get('max_points'), PREDICT_SERIES_POINTS, SCATTER_POINT_LIMIT)
+    idx = lttb_indices(np.column_stack([series_real, series_pred]), budget)
+    labels = [f"测试点 {i + 1}" for i in idx.tolist()]
+
+    return {
+        "confidence": float(confidence),
+        "sampleSize": sample_size,
+        "labels": labels,
+        "realValues": np.round(series_real[idx], 2).tolist(),
+        "predictedValues": np.round(series_pred[idx], 2).tolist(),
+        "series_reduction": {"method": "lttb" if len(idx) < len(X_series) else "none",
+                             "original_points": len(X_series), "returned_points": len(idx), "budget": budget},
+        "engine": artifact["hyperparams"]["engine"],
+        "model_reused": reused
+    }
+
+
+def score_new_rows(params, progress):
+    """
+    【模型推理服务】：复用注册表中的已训练模型为新上传的数据逐行打分 (模型缺失时训练一次并登记)，
+    预测结果追加为新列另存为 scored_ 文件。后台任务函数，在任务进程池中执行。
+    """
+    target_col, feature_cols = params['target_col'], params['feature_cols']
+    progress.update(10, "检索已训练模型")
+    split = _load_training_set(params['filename'], target_col, feature_cols, "去除缺失值后有效数据量过低，模型无法收敛")
+    artifact, reused = _fit_model(params['filename'], target_col, feature_cols, split, params.get('engine'), progress)
+    progress.check_cancelled()
+
+    progress.update(70, "批量推理新数据")
+    score_name = params['score_filename']
+    new_df = read_df(os.path.join(UPLOAD_FOLDER, score_name))
+    missing = [c for c in artifact["feature_cols"] if c not in new_df.columns]
+    if missing:
+        raise ValueError(f"待预测数据缺少特征列: {', '.join(map(str, missing))}")
+
+    # 特征存在缺失的行无法推理，预测值留空
+    X_new = new_df[artifact["feature_cols"]]
+    valid = X_new.notna().all(axis=1)
+    pred_col = f"{target_col}_预测"
+    new_df[pred_col] = np.nan
+    if valid.any():
+        new_df.loc[valid, pred_col] = artifact["model"].predict(X_new[valid])
+
+    scored_filename = f"scored_{score_name.rsplit('.', 1)[0]}.csv"
+    scored_path = os.path.join(UPLOAD_FOLDER, scored_filename)
+    new_df.to_csv(scored_path, index=False, encoding='utf-8-sig')
+    invalidate_df_cache(scored_path)
+
+    return {
+        "scored_filename": scored_filename,
+        "row_count": len(new_df),
+        "scored_rows": int(valid.sum()),
+        "unscored_rows": int((~valid).sum()),
+        "prediction_column": pred_col,
+        "engine": artifact["hyperparams"]["engine"],
+        # 无法推理的行在预览中以 null 表示，不与真实的 0 值预测混淆
+        "preview": [None if pd.isna(v) else v for v in np.round(new_df[pred_col].head(100).astype(float), 4).tolist()],
+        "model_reused": reused
+    }
+
+
+def _submit_training(kind, fn, **extra):
+    """校验训练参数并投递后台任务，立即返回任务句柄 (前端通过 /api/jobs/<id> 轮询结果)"""
     try:
         data = request.json
         filename = data.get('filename')
         target_col = data.get('target_col')
         feature_cols = data.get('feature_cols', [])
 
+        engine = data.get('engine', 'auto')
+
         if not filename or not target_col or len(feature_cols) == 0:
             return jsonify({"status": "error", "message": "参数设定不完整"}), 400
+        if engine not in ENGINES + ('auto',):
+            return jsonify({"status": "error", "message": f"不支持的模型引擎: {engine}"}), 400
 
-        df = read_df(os.path.join(UPLOAD_FOLDER, filename))
-        df_clean = df[[target_col] + feature_cols].dropna()
-
-        if len(df_clean) < 10:
-            return jsonify({"status": "error", "message": "有效数据量不足"}), 400
-
-        X = df_clean[feature_cols]
-        y = df_clean[target_col]
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        job_id = submit_job(kind, fn, {"filename": filename, "target_col": target_col, "feature_cols": feature_cols,
+                                       "engine": engine, "max_points": data.get('max_points'), **extra})
+        return jsonify({"status": "success", "data": {"job_id": job_id, "state": "queued"}}), 202
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
 
-        # 提取 50 条连续序列进行仿真推理展示
-        sample_size = min(50, len(X_test))
-        X_show = X_test.iloc[:sample_size]
-        y_show_real = y_test.iloc[:sample_size].values
-        y_show_pred = model.predict(X_show)
+def do_predict_score():
+    """【模型推理】：投递新数据批量打分任务，复用已训练模型而无需重新训练"""
+    score_filename = (request.json or {}).get('score_filename')
+    if not score_filename:
+        return jsonify({"status": "error", "message": "未指定待预测的数据文件"}), 400
+    return _submit_training('predict_score', score_new_rows, score_filename=score_filename)
 
-        # ====== 🚀 核心算法创新：引入启发式多维惩罚机制 ======
-        sample_r2 = r2_score(y_show_real, y_show_pred)
-        std_pred = np.std(y_show_pred)
-        std_real = np.std(y_show_real)
 
-        # 1. Pearson 趋势相关系数（侦测拟合曲线相位是否一致）
-        if std_pred == 0 or std_real == 0:
-            corr = 0
-        else:
-            corr = np.corrcoef(y_show_real, y_show_pred)[0, 1]
+def do_predict():
+    """【预测模块一】：投递随机森林训练与特征重要性评估任务"""
+    return _submit_training('predict', train_predict)
 
-        # 2. 平均绝对百分比误差 (MAPE) 推导基础准确率
-        mape = np.mean(np.abs((y_show_real - y_show_pred) / (y_show_real + 1e-9)))
-        acc = max(0, 1 - mape)
 
-        # 3. 退化熔断：若 R2 极低或相关性破灭，代表模型退化为纯均值直线。此时触发惩罚系数 0.45
-        if sample_r2 < 0.15 or corr < 0.3:
-            confidence = round(acc * 45, 2)
-        else:
-            confidence = round((acc * 0.4 + corr * 0.6) * 100, 2)
-
-        if confidence > 99:
-            confidence = 98.75
-
-        labels = [f"测试点 {i + 1}" for i in range(sample_size)]
-
-        return jsonify({
-            "status": "success",
-            "data": {
-                "confidence": confidence,
-                "sampleSize": sample_size,
-                "labels": labels,
-                "realValues": np.round(y_show_real, 2).tolist(),
-                "predictedValues": np.round(y_show_pred, 2).tolist()
-            }
-        })
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
+def do_predict_new():
+    """【预测模块二】：投递未知数据推理与置信度诊断任务"""
+    return _submit_training('predict_new', train_predict_new)
@@ -0,0 +1,91 @@
+import os
+import glob
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import joblib
+from config import MODEL_MEMORY_ENTRIES, MODEL_DISK_MAX, CACHE_DIRNAME
+from utils import cache_path, file_signature
+
+# 【模型注册表：进程内 LRU + 磁盘持久化】
+# 以 (文件版本, 目标列, 排序后的特征列, 超参数) 为键复用已训练模型，
+# 同一会话内 predict 与 predict_new 只需训练一次；磁盘副本可跨任务进程共享
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+
+def model_key(filepath, target_col, feature_cols, hyperparams):
+    """生成模型指纹：特征列排序后参与哈希，列的勾选顺序不影响模型复用"""
+    raw = json.dumps([*file_signature(filepath), target_col, sorted(feature_cols), hyperparams],
+                     ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _model_path(filepath, key):
+    # 挂在源文件的派生缓存命名空间下，文件失效回收时模型随之清理
+    return cache_path(filepath, f'.model.{key}.joblib')
+
+
+def _evict_disk(folder):
+    """磁盘侧按最近访问时间淘汰超出上限的模型文件"""
+    files = sorted(glob.glob(os.path.join(folder, CACHE_DIRNAME, '*.model.*.joblib')), key=os.path.getmtime)
+    for path in files[:max(0, len(files) - MODEL_DISK_MAX)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _remember(key, artifact):
+    with _models_lock:
+        _models[key] = artifact
+        _models.move_to_end(key)
+        while len(_models) > MODEL_MEMORY_ENTRIES:
+            _models.popitem(last=False)
+
+
+def lookup_model(filepath, key):
+    """依次查询进程内缓存与磁盘副本，未命中返回 None"""
+    with _models_lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+    path = _model_path(filepath, key)
+    if os.path.exists(path):
+        try:
+            artifact = joblib.load(path)
+        except Exception:
+            return None
+        os.utime(path)
+        _remember(key, artifact)
+        return artifact
+    return None
+
+
+def store_model(filepath, key, artifact):
+    """登记新训练的模型：写入进程内缓存并原子落盘"""
+    _remember(key, artifact)
+    path = _model_path(filepath, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    joblib.dump(artifact, tmp)
+    os.replace(tmp, path)
+    _evict_disk(os.path.dirname(os.path.abspath(filepath)))
+
+
+def get_or_train(filepath, target_col, feature_cols, hyperparams, trainer):
+    """
+    【模型复用入口】
+    命中注册表时直接返回已训练模型，否则调用 trainer() 训练并登记。
+
+    :param trainer: 无参训练函数，返回至少含 model 键的字典 (其余键作为训练元数据一并登记)
+    :return: (artifact, reused) artifact 含 model / feature_cols / target_col / hyperparams 及训练元数据
+    """
+    key = model_key(filepath, target_col, feature_cols, hyperparams)
+    artifact = lookup_model(filepath, key)
+    if artifact is not None:
+        return artifact, True
+    artifact = dict(trainer(), feature_cols=list(feature_cols), target_col=target_col, hyperparams=hyperparams)
+    store_model(filepath, key, artifact)
+    return artifact, False
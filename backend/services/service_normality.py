@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import scipy.stats as stats
+from config import NORMALITY_SHAPIRO_MAX, NORMALITY_SUBSAMPLE_MAX, NORMALITY_ANDERSON_MAX, NORMALITY_WORKERS
+from utils import get_derived, put_derived
+from services.service_sketch import RunningMoments, AndersonSketch
+
+# 【可扩展正态性检验】
+# Shapiro-Wilk 的 p 值仅在 5000 个样本以内可靠，且整列计算随规模急剧变慢；
+# auto 模式按样本量分档：小样本沿用 Shapiro-Wilk，稍大的样本对固定种子子样本做 Shapiro-Wilk，
+# 中等规模改用基于概率尺度直方图的 Anderson-Darling (无需排序)，超大规模改用只依赖矩累加器的 D'Agostino K² 检验。
+# 各列在线程池中并行检验，结果按文件版本缓存
+NORMALITY_METHODS = ('auto', 'shapiro', 'dagostino', 'anderson')
+_executor = ThreadPoolExecutor(max_workers=NORMALITY_WORKERS, thread_name_prefix='normality')
+
+
+def resolve_method(method, n):
+    """auto 模式下按有效样本量选择检验方法"""
+    if method != 'auto':
+        return method
+    if n <= NORMALITY_SUBSAMPLE_MAX:
+        return 'shapiro'
+    return 'anderson' if n <= NORMALITY_ANDERSON_MAX else 'dagostino'
+
+
+def dagostino_from_moments(m):
+    """
+    由流式矩累加器推导 D'Agostino-Pearson K² 统计量与 p 值 (与 scipy.stats.normaltest 一致)，
+    偏度检验与峰度检验各自转换为近似标准正态的 Z 值后平方求和，服从自由度为 2 的卡方分布。
+    """
+    n = float(m.count)
+    # 偏度检验 (D'Agostino 1970)
+    y = m.skew * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+    beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = 1.0 if y == 0 else y
+    z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+    # 峰度检验 (Anscombe & Glynn 1983)
+    expected = 3.0 * (n - 1) / (n + 1)
+    var_b2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    x = (m.kurtosis - expected) / np.sqrt(var_b2)
+    sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+    a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+    term1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    term2 = np.sign(denom) * ((1 - 2.0 / a) / abs(denom)) ** (1 / 3.0) if denom != 0 else np.nan
+    z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+    k2 = z_skew ** 2 + z_kurt ** 2
+    return float(k2), float(stats.chi2.sf(k2, 2))
+
+
+def anderson_pvalue(a2, n):
+    """参数未知的正态 Anderson-Darling 检验 p 值近似 (D'Agostino & Stephens 1986 分段公式)"""
+    a = a2 * (1 + 0.75 / n + 2.25 / n ** 2)
+    if a >= 153.467:
+        # 最高一段的二次式在此之后回升，实际 p 值已远小于浮点精度
+        p = 0.0
+    elif a >= 0.6:
+        p = np.exp(1.2937 - 5.709 * a + 0.0186 * a ** 2)
+    elif a >= 0.34:
+        p = np.exp(0.9177 - 4.279 * a - 1.38 * a ** 2)
+    elif a >= 0.2:
+        p = 1 - np.exp(-8.318 + 42.796 * a - 59.938 * a ** 2)
+    else:
+        p = 1 - np.exp(-13.436 + 101.14 * a - 223.73 * a ** 2)
+    return float(min(max(p, 0.0), 1.0))
+
+
+def test_normality(values, method='auto'):
+    """
+    对单列有效值执行正态性检验，样本不足时返回 None；
+    常数列 (方差为零) 或统计量数值溢出时 statistic / p_value 置为 None 并附带 message，保证响应为合法 JSON。
+
+    :param values: 已剔除缺失值的 float64 数组
+    :return: dict 含 method / statistic / p_value / sample_size / subsampled (及可选 message)
+    """
+    n = len(values)
+    method = resolve_method(method, n)
+    if n < 3 or (method == 'dagostino' and n < 8):
+        return None
+    subsampled = False
+    if method == 'shapiro' and n > NORMALITY_SHAPIRO_MAX:
+        # 固定种子的无放回子样本，同一文件版本的结果可复现
+        idx = np.random.default_rng(42).choice(n, size=NORMALITY_SHAPIRO_MAX, replace=False)
+        values, subsampled = values[np.sort(idx)], True
+    result = {"method": method, "statistic": None, "p_value": None,
+              "sample_size": int(len(values)), "subsampled": subsampled}
+    if values.max() == values.min():
+        return dict(result, message="常数列方差为零，无法进行正态性检验")
+
+    if method == 'shapiro':
+        stat, p = stats.shapiro(values)
+    else:
+        # 首遍矩累加器给出均值与标准差，Anderson-Darling 再以一遍直方图草图求 A²
+        moments = RunningMoments().update(values)
+        if method == 'anderson':
+            stat = AndersonSketch(moments.mean, moments.std).update(values).statistic()
+            p = anderson_pvalue(stat, n)
+        else:
+            stat, p = dagostino_from_moments(moments)
+    if not (np.isfinite(stat) and np.isfinite(p)):
+        return dict(result, message="检验统计量数值溢出，无法给出结论")
+    return dict(result, statistic=float(stat), p_value=float(p))
+
+
+def get_normality(filepath, df, columns, method='auto'):
+    """
+    按文件版本缓存的正态性检验入口：已检验过的列直接复用，其余列投递线程池并行检验。
+
+    :param df: 已加载且包含 columns 的数据框
+    :return: dict {列名: 检验结果}，样本不足的列不出现在结果中
+    """
+    results, pending = {}, {}
+    for col in columns:
+        cached = get_derived(filepath, ('normality', col, method))
+        if cached is not None:
+            results[col] = cached
+        else:
+            pending[col] = _executor.submit(test_normality, df[col].dropna().to_numpy(dtype='float64'), method)
+    for col, future in pending.items():
+        results[col] = future.result()
+        if results[col] is not None:
+            put_derived(filepath, ('normality', col, method), results[col])
+    return {col: results[col] for col in columns if results[col] is not None}
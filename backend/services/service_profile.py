@@ -0,0 +1,165 @@
+import os
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from flask import request, jsonify
+from config import UPLOAD_FOLDER, PROFILE_WORKERS, PROFILE_TOP_K
+from utils import read_df, cache_path, file_signature, version_stamp
+from services.service_kernel import get_column_stats
+
+# 【异步任务调度：后台画像线程池】
+# 画像构建与上传请求解耦，上传接口无需等待即可返回
+_executor = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix='profile')
+_states = {}
+_states_lock = threading.Lock()
+
+
+def profile_path(filepath):
+    return cache_path(filepath, '.profile.json')
+
+
+def _json_safe(value):
+    """将 NaN/Inf 转为 None，保证画像文件为合法 JSON"""
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def build_profile(filepath):
+    """
+    【数据画像引擎】：一次性推断列类型并汇总缺失数、基数、矩、分位数、高频取值与 Pearson 相关矩阵，
+    后续摘要等接口直接基于画像作答，无需再触碰原始数据。
+    """
+    version = version_stamp(file_signature(filepath))
+    df = read_df(filepath)
+
+    # 尝试将能转数值的列都强转成数值，与数据摘要的口径保持一致
+    for col in df.columns:
+        try:
+            df[col] = pd.to_numeric(df[col])
+        except Exception:
+            pass
+
+    all_cols = df.columns.tolist()
+    numeric_cols = [c for c in all_cols if pd.api.types.is_numeric_dtype(df[c]) and not any(
+        kw in str(c).lower() for kw in ['号', 'id', '编号', '代码'])]
+    nunique = df.nunique()
+    nulls = df.isnull().sum()
+    col_stats = get_column_stats(filepath, numeric_cols, df=df)
+
+    column_profiles = {}
+    for col in all_cols:
+        top = df[col].value_counts().head(PROFILE_TOP_K)
+        column_profiles[str(col)] = {
+            "dtype": str(df[col].dtype),
+            "inferred_type": "numeric" if col in numeric_cols else "categorical",
+            "nulls": int(nulls[col]),
+            "cardinality": int(nunique[col]),
+            "top_values": [[str(k), int(v)] for k, v in top.items()],
+            **col_stats.get(col, {})
+        }
+
+    corr = df[numeric_cols].corr(method='pearson') if numeric_cols else pd.DataFrame()
+    return _json_safe({
+        "version": version,
+        "row_count": len(df),
+        "col_count": len(all_cols),
+        "columns": [str(c) for c in all_cols],
+        "numeric_columns": [str(c) for c in numeric_cols],
+        "categorical_columns": [str(c) for c in all_cols if c not in numeric_cols],
+        "binary_columns": [str(c) for c in all_cols if nunique[c] == 2],
+        "column_profiles": column_profiles,
+        "correlation": {"columns": [str(c) for c in numeric_cols], "matrix": corr.values.tolist()}
+    })
+
+
+def save_profile(filepath, profile):
+    target = profile_path(filepath)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False)
+    os.replace(tmp, target)
+
+
+def load_profile(filepath):
+    """读取已固化的画像；画像缺失或与当前文件版本不符时返回 None"""
+    path = profile_path(filepath)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("version") == version_stamp(file_signature(filepath)) else None
+
+
+def get_profile(filepath):
+    """优先读取已固化的画像，后台任务尚未完成时同步构建一次作为兜底"""
+    profile = load_profile(filepath)
+    if profile is None:
+        profile = build_profile(filepath)
+        save_profile(filepath, profile)
+    return profile
+
+
+def _run_profile(filepath):
+    key = os.path.abspath(filepath)
+    with _states_lock:
+        _states[key] = {"state": "running"}
+    try:
+        if load_profile(filepath) is None:
+            save_profile(filepath, build_profile(filepath))
+        with _states_lock:
+            _states.pop(key, None)
+    except Exception as e:
+        traceback.print_exc()
+        with _states_lock:
+            _states[key] = {"state": "error", "message": str(e)}
+
+
+def schedule_profile(filepath):
+    """在上传完成后投递后台画像任务，立即返回"""
+    with _states_lock:
+        _states[os.path.abspath(filepath)] = {"state": "pending"}
+    _executor.submit(_run_profile, filepath)
+
+
+def profile_status(filepath):
+    """查询画像就绪状态：ready / pending / running / error / missing"""
+    if load_profile(filepath) is not None:
+        return {"state": "ready"}
+    with _states_lock:
+        return dict(_states.get(os.path.abspath(filepath), {"state": "missing"}))
+
+
+def do_profile_status():
+    """【异步画像探针】：报告指定文件的后台画像是否已就绪"""
+    try:
+        filename = request.json.get('filename')
+        filepath = os.path.join(UPLOAD_FOLDER, filename or '')
+        if not filename or not os.path.exists(filepath):
+            return jsonify({"status": "error", "message": "未找到指定数据资产"}), 400
+        return jsonify({"status": "success", "data": dict(profile_status(filepath), filename=filename)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def do_profile():
+    """【数据画像下发】：返回文件的列画像 (后台尚未完成时同步构建)"""
+    try:
+        filename = request.json.get('filename')
+        filepath = os.path.join(UPLOAD_FOLDER, filename or '')
+        if not filename or not os.path.exists(filepath):
+            return jsonify({"status": "error", "message": "未找到指定数据资产"}), 400
+        return jsonify({"status": "success", "data": get_profile(filepath)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+# 【可视化降采样：服务端点数削减】
+# 浏览器端 ECharts 在数万点以上即难以流畅渲染，百万级点对的 JSON 更是无谓的带宽开销；
+# 散点图按点数预算做随机 / 网格分层抽样，超大规模时改为二维网格密度聚合，折线序列采用 LTTB 保形降采样
+SCATTER_REDUCTIONS = ('auto', 'none', 'random', 'stratified', 'density')
+
+
+def clamp_budget(value, default, maximum):
+    """解析客户端声明的点数预算：缺省或非法时取默认值，并封顶在服务端上限内"""
+    try:
+        budget = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(2, min(budget, maximum))
+
+
+def random_indices(n, budget, seed=42):
+    """无放回均匀随机抽取 budget 个位置，按原始顺序返回 (固定种子，同一请求结果可复现)"""
+    if n <= budget:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=budget, replace=False))
+
+
+def _grid_cells(x, y, bins):
+    """将点对映射到 bins × bins 等宽网格，返回 (单元编号, x 分箱边界, y 分箱边界)"""
+    x_edges = np.linspace(x.min(), x.max(), bins + 1)
+    y_edges = np.linspace(y.min(), y.max(), bins + 1)
+    # 右端点归入最后一格；常数列 (边界重合) 全部落入第 0 格
+    bx = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, bins - 1)
+    by = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, bins - 1)
+    return bx * bins + by, x_edges, y_edges
+
+
+def stratified_indices(x, y, budget, bins, seed=42):
+    """
+    【网格分层抽样】
+    以二维网格为层：每个非空单元先保底 1 个点，剩余名额再按单元点数占比分配。
+    相比纯随机抽样，稀疏区域与离群点不会被高密度主体"淹没"，散点图的轮廓与尾部得以保留。
+    非空单元数超过预算时退化为均匀随机抽样。
+    """
+    n = len(x)
+    if n <= budget:
+        return np.arange(n)
+    cells, _, _ = _grid_cells(x, y, bins)
+    uniq, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    if len(uniq) > budget:
+        return random_indices(n, budget, seed)
+
+    # 最大余数法分配剩余名额，使入选总数恰好等于预算
+    share = (counts - 1) * (budget - len(uniq)) / max(1, n - len(uniq))
+    quota = 1 + np.floor(share).astype(int)
+    remainder = share - np.floor(share)
+    quota[np.argsort(-remainder, kind='stable')[:budget - int(quota.sum())]] += 1
+
+    # 随机打乱后按单元稳定排序，组内名次小于配额者入选，整个过程无 Python 级循环
+    order = np.random.default_rng(seed).permutation(n)
+    order = order[np.argsort(inverse[order], kind='stable')]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(n) - np.repeat(starts, counts)
+    keep = order[rank < np.repeat(quota, counts)]
+    return np.sort(keep)
+
+
+def grid_density(x, y, bins):
+    """
+    【二维网格密度聚合】
+    将点对计数到 bins × bins 网格，仅返回非空单元的 (x 中心, y 中心, 点数)，
+    下发体量与原始行数无关，前端以气泡大小 / 颜色映射密度。
+    """
+    cells, x_edges, y_edges = _grid_cells(x, y, bins)
+    counts = np.bincount(cells, minlength=bins * bins)
+    occupied = np.flatnonzero(counts)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    return x_centers[occupied // bins], y_centers[occupied % bins], counts[occupied]
+
+
+def lttb_indices(values, n_out):
+    """
+    【LTTB 折线降采样 (Largest-Triangle-Three-Buckets)】
+    首尾点固定保留，其余点均分为 n_out - 2 个桶，每桶选取与"上一入选点"和"下一桶均值"构成三角形面积最大的点，
+    在大幅削减点数的同时保留峰谷形态。values 可为二维 (n, k)：多条序列共用横轴时面积逐列累加，
+    保证所有序列在同一组横坐标上对齐。
+    """
+    y = np.asarray(values, dtype='float64')
+    if y.ndim == 1:
+        y = y[:, None]
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n) if n_out >= n else np.unique([0, n - 1])
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # 下一桶的均值点 (最后一个桶以末点为锚)
+        nxt_lo, nxt_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        nxt_x = (nxt_lo + nxt_hi - 1) / 2
+        nxt_y = y[nxt_lo:nxt_hi].mean(axis=0)
+        xs = np.arange(lo, hi)
+        area = np.abs((prev - nxt_x) * (y[lo:hi] - y[prev]) - (prev - xs)[:, None] * (nxt_y - y[prev])).sum(axis=1)
+        prev = lo + int(np.argmax(area))
+        picked[i + 1] = prev
+    return picked
+
+
+def reduce_scatter(frame, budget, method='auto', density_threshold=None, max_bins=100):
+    """
+    【散点削减入口】
+    :param frame: 两列 (x, y) 且已剔除缺失值的 DataFrame
+    :param budget: 客户端声明的点数预算
+    :param method: auto / none / random / stratified / density；auto 时点数未超预算原样返回，
+                   超过 density_threshold 行改为密度聚合，否则网格分层抽样
+    :return: (削减后的 DataFrame, 削减说明)；密度聚合时追加 count 列
+    """
+    n = len(frame)
+    if method == 'auto':
+        if n <= budget:
+            method = 'none'
+        elif density_threshold is not None and n > density_threshold:
+            method = 'density'
+        else:
+            method = 'stratified'
+    info = {"method": method, "original_points": n, "budget": budget}
+    if method == 'none' or n == 0:
+        info.update(method='none', returned_points=n)
+        return frame, info
+
+    x = frame.iloc[:, 0].to_numpy(dtype='float64')
+    y = frame.iloc[:, 1].to_numpy(dtype='float64')
+    # 网格边长取 √预算，保证非空单元数不超过点数预算
+    bins = int(max(2, min(max_bins, np.sqrt(budget))))
+    if method == 'density':
+        cx, cy, counts = grid_density(x, y, bins)
+        reduced = pd.DataFrame({frame.columns[0]: cx, frame.columns[1]: cy, "count": counts})
+        info.update(returned_points=len(reduced), bins=bins)
+        return reduced, info
+
+    if method == 'stratified':
+        idx = stratified_indices(x, y, budget, bins)
+        info["bins"] = bins
+    else:
+        idx = random_indices(n, budget)
+    info["returned_points"] = len(idx)
+    return frame.iloc[idx], info
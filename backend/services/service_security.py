@@ -1,8 +1,104 @@
 import os
+import re
+import numpy as np
 import pandas as pd
 from flask import request, jsonify
-from config import UPLOAD_FOLDER
-from utils import read_df
+from config import UPLOAD_FOLDER, STREAM_THRESHOLD_BYTES, MASK_SAMPLE_ROWS, MASK_MATCH_RATIO
+from utils import read_df, read_columns, iter_csv_chunks, invalidate_df_cache
+
+# 【表头语义探针】：列名命中以下关键字即视为高敏感维度
+MASK_KEYWORDS = ['名', 'name', '号', 'id', '手机', '电话', '身份']
+
+# 【内容探针：可插拔的 PII 模式库】
+# 列名未能暴露敏感性时，按抽样取值的整串匹配比例识别手机号、身份证号与邮箱
+PII_DETECTORS = {
+    "phone": re.compile(r"(?:\+?86[- ]?)?1[3-9]\d{9}"),
+    "id_card": re.compile(r"\d{17}[\dXx]|\d{15}"),
+    "email": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+}
+
+
+def register_detector(name, pattern):
+    """注册自定义内容探针 (正则需整串匹配单元格取值)"""
+    PII_DETECTORS[name] = re.compile(pattern) if isinstance(pattern, str) else pattern
+
+
+def _sample_text(series):
+    """抽取固定规模的非空样本并统一为文本 (整数值浮点列去掉 .0 尾巴，以免漏检数值型手机号)"""
+    values = series.dropna()
+    if len(values) > MASK_SAMPLE_ROWS:
+        values = values.sample(MASK_SAMPLE_ROWS, random_state=0)
+    text = values.astype(str).str.strip()
+    if pd.api.types.is_float_dtype(series):
+        text = text.str.replace(r'\.0$', '', regex=True)
+    return text[text != '']
+
+
+def detect_pii_columns(df):
+    """
+    【敏感列识别】：先按列名关键字，再对剩余列抽样做内容模式匹配。
+    :return: dict {列名: 命中来源 ('keyword' 或探针名)}
+    """
+    detected = {}
+    for col in df.columns:
+        if any(kw in str(col).lower() for kw in MASK_KEYWORDS):
+            detected[col] = 'keyword'
+            continue
+        if pd.api.types.is_bool_dtype(df[col]):
+            continue
+        sample = _sample_text(df[col])
+        if sample.empty:
+            continue
+        for name, pattern in PII_DETECTORS.items():
+            if sample.str.fullmatch(pattern).mean() >= MASK_MATCH_RATIO:
+                detected[col] = name
+                break
+    return detected
+
+
+def mask_series(series):
+    """
+    【长度感知型不可逆混淆算法 (向量化)】
+    短名保首字，常规保首尾，长串阻断式遮蔽；以 pandas 字符串向量化运算 + np.select 一次性处理整列。
+    缺失值保持缺失，空串与 'nan'/'None' 字面量原样保留。
+    """
+    text = series.astype(str).str.strip()
+    length = text.str.len()
+    head = text.str.slice(0, 1)
+    masked = np.select(
+        [text.isin(['nan', 'None', '']), length <= 2, length == 3],
+        [text, head + '*', head + '*' + text.str.slice(-1)],
+        default=text.str.slice(0, 4) + '****'
+    )
+    return pd.Series(masked, index=series.index, dtype=object).where(series.notna())
+
+
+def _mask_frame(df, columns):
+    df = df.copy()
+    for col in columns:
+        df[col] = mask_series(df[col])
+    return df
+
+
+def _mask_streaming(filepath, masked_path):
+    """
+    【流式脱敏】：超大 CSV 逐块读取、脱敏、追加写出，内存峰值只与块大小相关。
+    全部列以原始文本读取 (不做类型推断与缺失值识别)：敏感列依据首个数据块抽样判定，
+    未脱敏的列逐字节原样写出，不会因各块独立推断类型而出现 5 / 5.0 之类的漂移。
+    """
+    header = read_columns(filepath)
+    first = next(iter_csv_chunks(filepath, chunksize=MASK_SAMPLE_ROWS, raw_text=True), pd.DataFrame(columns=header))
+    detected = detect_pii_columns(first)
+    tmp = f"{masked_path}.{os.getpid()}.tmp"
+    for i, chunk in enumerate(iter_csv_chunks(filepath, raw_text=True)):
+        # 仅首块写入表头与 BOM，后续块以追加方式续写
+        _mask_frame(chunk, detected).to_csv(tmp, index=False, header=(i == 0), mode='w' if i == 0 else 'a',
+                                             encoding='utf-8-sig' if i == 0 else 'utf-8')
+    if not os.path.exists(tmp):
+        pd.DataFrame(columns=header).to_csv(tmp, index=False, encoding='utf-8-sig')
+    os.replace(tmp, masked_path)
+    return detected
+
 
 def do_mask():
     """
@@ -12,27 +108,20 @@ def do_mask():
         filename = request.json.get('filename')
         if not filename: return jsonify({"status": "error", "message": "未找到指定数据资产"}), 400
 
-        df = read_df(os.path.join(UPLOAD_FOLDER, filename))
-        masked_cols = []
-
-        def mask_val(x):
-            """长度感知型不可逆混淆算法"""
-            x = str(x).strip()
-            if x in ['nan', 'None', '']: return x
-            # 短名保首字，常规保首尾，长串阻断式遮蔽
-            if len(x) <= 2: return x[0] + '*'
-            elif len(x) == 3: return x[0] + '*' + x[-1]
-            else: return x[:4] + '****'
-
-        # 利用文本语义检索，精准定位高敏感维度集合
-        for col in df.columns:
-            if any(kw in str(col).lower() for kw in ['名', 'name', '号', 'id', '手机', '电话', '身份']):
-                masked_cols.append(col)
-                df[col] = df[col].apply(mask_val)
-
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
         masked_filename = "masked_" + filename
-        df.to_csv(os.path.join(UPLOAD_FOLDER, masked_filename), index=False, encoding='utf-8-sig')
+        masked_path = os.path.join(UPLOAD_FOLDER, masked_filename)
+
+        if filepath.lower().endswith('.csv') and os.path.getsize(filepath) > STREAM_THRESHOLD_BYTES:
+            detected = _mask_streaming(filepath, masked_path)
+        else:
+            df = read_df(filepath)
+            # 利用文本语义检索与内容抽样，精准定位高敏感维度集合
+            detected = detect_pii_columns(df)
+            _mask_frame(df, detected).to_csv(masked_path, index=False, encoding='utf-8-sig')
+        invalidate_df_cache(masked_path)
 
-        return jsonify({"status": "success", "data": {"masked_filename": masked_filename, "masked_cols": masked_cols}})
+        return jsonify({"status": "success", "data": {"masked_filename": masked_filename,
+                                                      "masked_cols": list(detected), "detections": detected}})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "message": str(e)}), 500
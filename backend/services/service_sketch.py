@@ -0,0 +1,258 @@
+import numpy as np
+from scipy.special import ndtr, xlogy
+
+
+class RunningMoments:
+    """
+    【流式统计：可合并的 Welford 矩累加器】
+    逐块吸收数值并维护计数、均值、二至四阶中心矩与极值，任意两个累加器可按 Chan / Terriberry 并行公式无损合并，
+    因此分块读取、多进程分片计算的结果与一次性全量计算完全一致；三、四阶矩支撑偏度、峰度与 D'Agostino 正态检验。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """吸收一个数据块 (自动剔除 NaN)"""
+        arr = np.asarray(values, dtype='float64')
+        arr = arr[~np.isnan(arr)]
+        if arr.size == 0:
+            return self
+        other = RunningMoments()
+        other.count = int(arr.size)
+        other.mean = float(arr.mean())
+        dev = arr - other.mean
+        other.m2 = float((dev ** 2).sum())
+        other.m3 = float((dev ** 3).sum())
+        other.m4 = float((dev ** 4).sum())
+        other.min = float(arr.min())
+        other.max = float(arr.max())
+        return self.merge(other)
+
+    def merge(self, other):
+        """Chan 并行合并：将另一个累加器的统计量并入自身"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.m3, self.m4 = other.count, other.mean, other.m2, other.m3, other.m4
+            self.min, self.max = other.min, other.max
+            return self
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        # 高阶矩的合并依赖旧的低阶矩，须按 4 → 3 → 2 的顺序更新
+        self.m4 += (other.m4 + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+                    + 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2
+                    + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.m3 += (other.m3 + delta ** 3 * na * nb * (na - nb) / n ** 2
+                    + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        self.m2 += other.m2 + delta ** 2 * na * nb / n
+        self.mean += delta * nb / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def var(self):
+        """样本方差 (ddof=1)，与 pandas.Series.var 口径一致"""
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var)) if self.count > 1 else np.nan
+
+    @property
+    def skew(self):
+        """有偏样本偏度 g1 = m3 / m2^1.5 (与 scipy.stats.skew 默认口径一致)"""
+        return self.count ** 0.5 * self.m3 / self.m2 ** 1.5 if self.m2 > 0 else np.nan
+
+    @property
+    def kurtosis(self):
+        """有偏样本峰度 (Pearson 口径，正态分布为 3)"""
+        return self.count * self.m4 / self.m2 ** 2 if self.m2 > 0 else np.nan
+
+
+class GroupedMoments:
+    """
+    【流式统计：分组多列矩累加器】
+    以 (组 × 列) 二维数组维护每组每列的计数、均值与二阶中心矩，是 RunningMoments 的分组向量化版本。
+    单个数据块只需一次 groupby 聚合即可吸收，块与块之间按 Chan 公式整体合并，
+    Welch t 检验与单因素方差分析均可直接由这些充分统计量推出。
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.groups = []
+        self.count = np.zeros((0, len(self.columns)))
+        self.mean = np.zeros((0, len(self.columns)))
+        self.m2 = np.zeros((0, len(self.columns)))
+
+    @classmethod
+    def from_frame(cls, frame, group_col):
+        """对一个数据块做一次 groupby 聚合 (分组列缺失的行自动剔除)，组按首次出现顺序排列"""
+        columns = [c for c in frame.columns if c != group_col]
+        acc = cls(columns)
+        grouped = frame.groupby(group_col, sort=False)[columns]
+        count = grouped.count()
+        acc.groups = count.index.tolist()
+        acc.count = count.to_numpy(dtype='float64')
+        # 全空组的均值为 NaN、单元素组的方差为 NaN，按 0 计入以便合并
+        acc.mean = np.nan_to_num(grouped.mean().to_numpy(dtype='float64'))
+        acc.m2 = np.nan_to_num(grouped.var(ddof=0).to_numpy(dtype='float64')) * acc.count
+        return acc
+
+    def update(self, frame, group_col):
+        """吸收一个数据块"""
+        return self.merge(GroupedMoments.from_frame(frame[[group_col] + self.columns], group_col))
+
+    def merge(self, other):
+        """按组标签对齐后以 Chan 并行公式合并，另一方新出现的组追加在末尾"""
+        position = {g: i for i, g in enumerate(self.groups)}
+        new = [g for g in other.groups if g not in position]
+        if new:
+            pad = np.zeros((len(new), len(self.columns)))
+            self.groups += new
+            self.count, self.mean, self.m2 = (np.vstack([a, pad]) for a in (self.count, self.mean, self.m2))
+            position = {g: i for i, g in enumerate(self.groups)}
+        rows = np.array([position[g] for g in other.groups], dtype=int)
+        if rows.size == 0:
+            return self
+        n_a, n_b = self.count[rows], other.count
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean[rows]
+            ratio = np.where(n > 0, n_b / n, 0.0)
+            self.mean[rows] += delta * ratio
+            self.m2[rows] += other.m2 + delta ** 2 * n_a * ratio
+        self.count[rows] = n
+        return self
+
+    @property
+    def var(self):
+        """组内样本方差 (ddof=1)，计数不足 2 的位置为 NaN"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+
+class KLLSketch:
+    """
+    【流式统计：KLL 分位数草图】
+    以多层压缩器 (compactor) 维护带权样本，内存占用仅与精度参数 k 相关、与数据规模无关，
+    秩误差约为 O(1/k)。草图之间可合并，用于超大文件的中位数与分位数近似估计。
+    """
+
+    def __init__(self, k=200, seed=42):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h):
+        # 越高层容量越大，底层按 2/3 几何衰减，保证总体空间为 O(k)
+        depth = len(self.levels) - h - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(level)
+                # 奇数长度时保留最大值在本层，其余两两配对随机取一晋升，权重翻倍
+                keep = level[-1:] if len(level) % 2 else level[:0]
+                pairs = level[:len(level) - len(keep)]
+                promoted = pairs[int(self._rng.integers(2))::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = keep
+            h += 1
+
+    def update(self, values):
+        """吸收一个数据块 (自动剔除 NaN)"""
+        arr = np.asarray(values, dtype='float64')
+        arr = arr[~np.isnan(arr)]
+        if arr.size == 0:
+            return self
+        self.n += int(arr.size)
+        self.levels[0] = np.concatenate([self.levels[0], arr])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """逐层拼接两个草图后重新压缩"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """估计分位数，q 可为标量或序列"""
+        if self.n == 0:
+            return np.nan if np.isscalar(q) else [np.nan] * len(q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='mergesort')
+        items, cum = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(q, dtype='float64') * cum[-1]
+        idx = np.minimum(np.searchsorted(cum, ranks, side='left'), len(items) - 1)
+        result = items[idx]
+        return float(result) if np.isscalar(q) else result.tolist()
+
+
+class AndersonSketch:
+    """
+    【流式统计：概率尺度直方图 (Anderson-Darling)】
+    以首遍矩累加器给出的均值与标准差将每个值映射为 u = Φ((x - μ) / σ)，计入 [0, 1] 上的等宽分箱；
+    数据块可逐个吸收、分箱计数直接相加合并。A² 为经验分布 F_n 与 u 的加权平方距离积分，
+    箱内 F_n 按线性插值后逐箱闭式求积，无需对整列排序，误差约为 2Δ·ln(1/Δ) (Δ 为箱宽)、与样本量无关。
+    """
+
+    def __init__(self, mean, std, bins=1 << 14):
+        self.mean, self.std = float(mean), float(std)
+        self.counts = np.zeros(bins, dtype='int64')
+
+    def update(self, values):
+        arr = np.asarray(values, dtype='float64')
+        arr = arr[~np.isnan(arr)]
+        u = ndtr((arr - self.mean) / self.std)
+        idx = np.minimum((u * len(self.counts)).astype('int64'), len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def statistic(self):
+        """A² = n∫(F_n - u)² / (u(1 - u)) du，样本为空时返回 NaN"""
+        n = int(self.counts.sum())
+        if n == 0:
+            return np.nan
+        bins = len(self.counts)
+        lo = np.arange(bins) / bins
+        hi = np.arange(1, bins + 1) / bins
+        p = self.counts / n
+        # 箱内 F_n(u) = alpha + (beta + 1)·u，被积式按 1/(u(1-u)) = 1/u + 1/(1-u) 拆分后各项可直接积分；
+        # 首箱 alpha = 0、末箱 gamma = 0，端点处 0·ln0 按 0 处理
+        slope = p * bins
+        alpha = np.concatenate([[0.0], np.cumsum(p)[:-1]]) - slope * lo
+        beta = slope - 1
+        gamma = alpha + beta
+        gamma[-1] = 0.0  # 末箱累计概率恰为 1，消除浮点残差以免 ln0 发散
+
+        def antiderivative(u):
+            return (xlogy(alpha ** 2, u) + 2 * alpha * beta * u + beta ** 2 * u ** 2 / 2
+                    - xlogy(gamma ** 2, 1 - u) + 2 * gamma * beta * (1 - u) - beta ** 2 * (1 - u) ** 2 / 2)
+
+        return float(n * (antiderivative(hi) - antiderivative(lo)).sum())
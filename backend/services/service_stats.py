@@ -1,23 +1,74 @@
 import os
+import numpy as np
 import pandas as pd
 import scipy.stats as stats
 from flask import request, jsonify
-from config import UPLOAD_FOLDER
-from utils import read_df
+from config import (UPLOAD_FOLDER, STREAM_THRESHOLD_BYTES, SCATTER_MAX_POINTS, SCATTER_POINT_LIMIT,
+                    SCATTER_DENSITY_THRESHOLD, ANOVA_MAX_GROUPS)
+from utils import read_df, read_columns, iter_csv_chunks, negotiate_format, column_arrays, arrow_response
+from services.service_sketch import RunningMoments, KLLSketch, GroupedMoments
+from services.service_kernel import get_column_stats
+from services.service_reduce import SCATTER_REDUCTIONS, clamp_budget, reduce_scatter
+from services.service_normality import NORMALITY_METHODS, get_normality
+
+
+def _stat(value):
+    """统计量保留 4 位小数；空列 / 全缺失列的 NaN 统计量输出为 None (NaN 不是合法 JSON)"""
+    return round(float(value), 4) if np.isfinite(value) else None
+
+
+def _descriptive_streaming(filepath, columns):
+    """
+    【流式引擎】：分块读取 CSV，以可合并的 Welford 累加器与 KLL 草图汇总各列统计量，
+    内存占用与文件规模无关；中位数来自分位数草图，属近似值。
+    """
+    header = read_columns(filepath)
+    selected = [c for c in columns if c in header]
+    moments = {col: RunningMoments() for col in selected}
+    sketches = {col: KLLSketch() for col in selected}
+    for chunk in iter_csv_chunks(filepath, usecols=selected, dtype=dict.fromkeys(selected, 'float64')):
+        for col in selected:
+            values = chunk[col].to_numpy(dtype='float64', na_value=np.nan)
+            moments[col].update(values)
+            sketches[col].update(values)
+
+    stats_data = []
+    for col in selected:
+        m = moments[col]
+        stats_data.append({
+            "variable": str(col), "count": int(m.count), "mean": _stat(m.mean) if m.count else None,
+            "median": _stat(sketches[col].quantile(0.5)), "std": _stat(m.std),
+            "min": _stat(m.min) if m.count else None, "max": _stat(m.max) if m.count else None,
+            "approximate": True
+        })
+    return stats_data
+
+
+def _use_streaming(filepath):
+    """请求显式指定 stream 时从之；否则 CSV 超过 STREAM_THRESHOLD_BYTES 时自动切换为分块流式引擎"""
+    stream = request.json.get('stream')
+    if stream is None:
+        stream = os.path.getsize(filepath) > STREAM_THRESHOLD_BYTES
+    return bool(stream) and filepath.lower().endswith('.csv')
 
 
 def do_descriptive():
     """获取标量特征维度的描述性综合测度 (中心偏态、离散规模等)"""
     try:
-        df = read_df(os.path.join(UPLOAD_FOLDER, request.json.get('filename')))
-        selected = [c for c in request.json.get('columns', []) if c in df.columns]
+        columns = request.json.get('columns', [])
+        filepath = os.path.join(UPLOAD_FOLDER, request.json.get('filename'))
+
+        # 超大 CSV (或显式要求 stream) 切换为分块流式引擎，避免整表物化导致进程崩溃
+        if _use_streaming(filepath):
+            return jsonify({"status": "success", "data": _descriptive_streaming(filepath, columns)})
+
+        # 融合统计核：与分布图、数据摘要共享按文件版本缓存的逐列统计量
         stats_data = []
-        for col in selected:
-            d = df[col].dropna()
+        for col, st in get_column_stats(filepath, columns).items():
             stats_data.append({
-                "variable": str(col), "count": int(d.count()), "mean": float(round(d.mean(), 4)),
-                "median": float(round(d.median(), 4)), "std": float(round(d.std(), 4)),
-                "min": float(round(d.min(), 4)), "max": float(round(d.max(), 4))
+                "variable": str(col), "count": st["count"], "mean": _stat(st["mean"]),
+                "median": _stat(st["median"]), "std": _stat(st["std"]),
+                "min": _stat(st["min"]), "max": _stat(st["max"])
             })
         return jsonify({"status": "success", "data": stats_data})
     except Exception as e:
@@ -26,22 +77,34 @@ def do_descriptive():
 
 def do_advanced():
     """
-    【高阶统计】：实施 Shapiro-Wilk 参数正态性校验，构建多变量间的 Pearson 线性关联热力矩阵
+    【高阶统计】：实施参数正态性校验 (按样本量在 Shapiro-Wilk / Anderson-Darling / D'Agostino K² 间分档)，
+    构建多变量间的 Pearson 线性关联热力矩阵
     """
     try:
-        df = read_df(os.path.join(UPLOAD_FOLDER, request.json.get('filename')))
-        selected = [c for c in request.json.get('columns', []) if c in df.columns]
+        columns = request.json.get('columns', [])
+        normality_method = request.json.get('normality_method', 'auto')
+        if normality_method not in NORMALITY_METHODS:
+            return jsonify({"status": "error", "message": f"不支持的正态性检验方法: {normality_method}"}), 400
+        reduction = request.json.get('reduction', 'auto')
+        if reduction not in SCATTER_REDUCTIONS:
+            return jsonify({"status": "error", "message": f"不支持的散点削减方式: {reduction}"}), 400
+        budget = clamp_budget(request.json.get('max_points'), SCATTER_MAX_POINTS, SCATTER_POINT_LIMIT)
+        filepath = os.path.join(UPLOAD_FOLDER, request.json.get('filename'))
+        df = read_df(filepath, usecols=columns, dtype=dict.fromkeys(columns, 'float64'))
+        selected = [c for c in columns if c in df.columns]
         if len(selected) < 2: return jsonify({"status": "error", "message": "维度特征不足，无法构建关联矩阵"}), 400
 
-        # 正态探针
+        # 正态探针：各列并行检验，结果按文件版本缓存
         normality_results = []
-        for col in selected:
-            d = df[col].dropna()
-            if len(d) >= 3:
-                stat, p = stats.shapiro(d)
-                normality_results.append({
-                    "variable": col, "statistic": float(round(stat, 4)), "p_value": float(round(p, 4)), "is_normal": bool(p > 0.05)
-                })
+        for col, res in get_normality(filepath, df, selected, normality_method).items():
+            # 常数列等无法检验的情形 statistic / p_value 为 null，is_normal 同样置 null 并透传 message
+            testable = res["p_value"] is not None
+            normality_results.append({
+                "variable": col, "statistic": round(res["statistic"], 4) if testable else None,
+                "p_value": round(res["p_value"], 4) if testable else None,
+                "is_normal": bool(res["p_value"] > 0.05) if testable else None, "method": res["method"],
+                "sample_size": res["sample_size"], "subsampled": res["subsampled"], "message": res.get("message")
+            })
 
         # 皮尔逊积度相关
         corr_matrix = []
@@ -51,39 +114,168 @@ def do_advanced():
                 corr_matrix.append([i, j, float(corr_df.iloc[i, j])])
 
         var1, var2 = selected[0], selected[1]
-        scatter_data = df[[var1, var2]].copy().dropna().values.tolist()
+        # 可视化降采样：按客户端点数预算抽样或聚合为网格密度，响应中注明实际采用的削减方式
+        scatter_df, scatter_reduction = reduce_scatter(df[[var1, var2]].dropna(), budget, reduction,
+                                                       density_threshold=SCATTER_DENSITY_THRESHOLD)
+        result = {"variables": selected, "normality": normality_results, "correlation_matrix": corr_matrix,
+                  "scatter_vars": [var1, var2], "scatter_reduction": scatter_reduction}
 
-        return jsonify({"status": "success", "data": {"variables": selected, "normality": normality_results, "correlation_matrix": corr_matrix, "scatter_data": scatter_data, "scatter_vars": [var1, var2]}})
+        # 散点数据按协商格式编码：Arrow 流 (其余结果写入 schema 元数据) / 列式平行数组 / 默认点对列表
+        fmt = negotiate_format()
+        if fmt == 'arrow':
+            return arrow_response(scatter_df, {"status": "success", "data": result})
+        if fmt == 'columnar':
+            return jsonify({"status": "success", "format": fmt, "data": dict(result, scatter_data=column_arrays(scatter_df))})
+        return jsonify({"status": "success", "data": dict(result, scatter_data=scatter_df.values.tolist())})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def group_moments(filepath, group_col, target_cols, stream=False):
+    """
+    【假设检验引擎：分组充分统计量】
+    一次 groupby 聚合求出所有目标列在各组内的计数、均值与二阶中心矩；stream 为真时逐块聚合后合并，
+    内存占用与文件规模无关。非数值列被剔除 (流式模式下任一数据块无法转为数值即剔除)。
+
+    :return: (GroupedMoments, 原始数据框或 None)；流式模式不保留原始数据
+    """
+    if stream:
+        header = read_columns(filepath)
+        columns = [c for c in target_cols if c in header and c != group_col]
+        acc = GroupedMoments(columns)
+        numeric = set(columns)
+        for chunk in iter_csv_chunks(filepath, usecols=[group_col] + columns, text_columns=[group_col],
+                                     dtype=dict.fromkeys(columns, 'float64')):
+            numeric &= {c for c in columns if pd.api.types.is_numeric_dtype(chunk[c])}
+            chunk = chunk[[group_col]].join(chunk[columns].apply(pd.to_numeric, errors='coerce'))
+            acc.update(chunk, group_col)
+        keep = [j for j, c in enumerate(columns) if c in numeric]
+        acc.columns = [columns[j] for j in keep]
+        acc.count, acc.mean, acc.m2 = acc.count[:, keep], acc.mean[:, keep], acc.m2[:, keep]
+        return acc, None
+
+    # 列投影：仅加载分组列与待检验的目标列
+    df = read_df(filepath, usecols=[group_col] + target_cols)
+    columns = [c for c in target_cols if c in df.columns and c != group_col and pd.api.types.is_numeric_dtype(df[c])]
+    return GroupedMoments.from_frame(df[[group_col] + columns], group_col), df
+
+
+def welch_ttest(gm, a=0, b=1):
+    """由两组的充分统计量批量推出所有目标列的 Welch t 统计量、自由度与双侧 p 值 (与 scipy.stats.ttest_ind(equal_var=False) 一致)"""
+    n1, n2 = gm.count[a], gm.count[b]
+    v1, v2 = gm.var[a] / n1, gm.var[b] / n2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = (gm.mean[a] - gm.mean[b]) / np.sqrt(v1 + v2)
+        dof = (v1 + v2) ** 2 / (v1 ** 2 / (n1 - 1) + v2 ** 2 / (n2 - 1))
+    return t, dof, 2 * stats.t.sf(np.abs(t), dof)
+
+
+def oneway_anova(gm):
+    """由 k 组充分统计量批量计算单因素方差分析 F 统计量 (与 scipy.stats.f_oneway 一致)，空组不参与"""
+    n = gm.count
+    k = (n > 0).sum(axis=0)
+    total = n.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand = (n * gm.mean).sum(axis=0) / total
+        ss_between = (n * (gm.mean - grand) ** 2).sum(axis=0)
+        ss_within = gm.m2.sum(axis=0)
+        df_between, df_within = k - 1, total - k
+        f = (ss_between / df_between) / (ss_within / df_within)
+    return f, df_between, df_within, stats.f.sf(f, df_between, df_within)
+
+
+def kruskal_wallis(df, group_col, gm):
+    """
+    Kruskal-Wallis H 检验 (与 scipy.stats.kruskal 一致，含结校正)：所有目标列一次性求秩，
+    再以同一次 groupby 汇总各组秩和。秩依赖全局排序，只能在整表模式下计算。
+    """
+    sub = df[df[group_col].notna()]
+    rank_sums = sub[gm.columns].rank().groupby(sub[group_col], sort=False).sum().reindex(gm.groups)
+    r = rank_sums.to_numpy(dtype='float64')
+    n = gm.count
+    total = n.sum(axis=0)
+    k = (n > 0).sum(axis=0)
+    ties = np.zeros(len(gm.columns))
+    for j, col in enumerate(gm.columns):
+        t = sub[col].value_counts().to_numpy(dtype='float64')
+        ties[j] = (t ** 3 - t).sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        h = 12 / (total * (total + 1)) * np.where(n > 0, r ** 2 / n, 0).sum(axis=0) - 3 * (total + 1)
+        h /= 1 - ties / (total ** 3 - total)
+    return h, k - 1, stats.chi2.sf(h, k - 1)
+
+
 def do_ttest():
     """
     【差异性假说检验】：基于方差不齐假设运行稳健的 Welch's t-test，推断组间绝对差异
+    所有目标列的组内计数、均值、方差由一次 groupby 聚合得出，t 值与 p 值批量推导；超大 CSV 走分块聚合
     """
     try:
-        df = read_df(os.path.join(UPLOAD_FOLDER, request.json.get('filename')))
         group_col, target_cols = request.json.get('group_col'), request.json.get('columns', [])
-        if not group_col or group_col not in df.columns: return jsonify(
+        filepath = os.path.join(UPLOAD_FOLDER, request.json.get('filename'))
+        if not group_col or group_col not in read_columns(filepath): return jsonify(
             {"status": "error", "message": "未探测到符合要求的二项分布分组变量"}), 400
 
-        groups = df[group_col].dropna().unique()
-        if len(groups) != 2: return jsonify({"status": "error", "message": "强制阻断：选定变量非二项分布属性"}), 400
+        gm, _ = group_moments(filepath, group_col, target_cols, stream=_use_streaming(filepath))
+        if len(gm.groups) != 2: return jsonify({"status": "error", "message": "强制阻断：选定变量非二项分布属性"}), 400
 
-        group1_data, group2_data = df[df[group_col] == groups[0]], df[df[group_col] == groups[1]]
+        # 激活 equal_var=False 提升检验的鲁棒性 (Robustness)
+        t, _, p = welch_ttest(gm)
         results = []
-        for col in target_cols:
-            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
-                d1, d2 = group1_data[col].dropna(), group2_data[col].dropna()
-                if len(d1) > 1 and len(d2) > 1:
-                    # 激活 equal_var=False 提升检验的鲁棒性 (Robustness)
-                    stat, p = stats.ttest_ind(d1, d2, equal_var=False)
-                    results.append({
-                        "variable": col, "group1_name": str(groups[0]), "group1_mean": float(round(d1.mean(), 4)),
-                        "group2_name": str(groups[1]), "group2_mean": float(round(d2.mean(), 4)),
-                        "t_value": float(round(stat, 4)), "p_value": float(round(p, 4)), "significant": bool(p < 0.05)
-                    })
+        for j, col in enumerate(gm.columns):
+            if gm.count[0, j] > 1 and gm.count[1, j] > 1:
+                results.append({
+                    "variable": col, "group1_name": str(gm.groups[0]), "group1_mean": float(round(gm.mean[0, j], 4)),
+                    "group2_name": str(gm.groups[1]), "group2_mean": float(round(gm.mean[1, j], 4)),
+                    "t_value": float(round(t[j], 4)), "p_value": float(round(p[j], 4)), "significant": bool(p[j] < 0.05)
+                })
         return jsonify({"status": "success", "data": results})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def do_anova():
+    """
+    【多组差异检验】：k 组单因素方差分析 (anova) 或非参数 Kruskal-Wallis 检验 (kruskal)，
+    与 t 检验共用分组充分统计量；方差分析支持超大 CSV 的分块聚合
+    """
+    try:
+        group_col, target_cols = request.json.get('group_col'), request.json.get('columns', [])
+        method = request.json.get('method', 'anova')
+        if method not in ('anova', 'kruskal'):
+            return jsonify({"status": "error", "message": f"不支持的检验方法: {method}"}), 400
+        filepath = os.path.join(UPLOAD_FOLDER, request.json.get('filename'))
+        if not group_col or group_col not in read_columns(filepath):
+            return jsonify({"status": "error", "message": "未探测到有效的分组变量"}), 400
+        stream = _use_streaming(filepath)
+        if stream and method == 'kruskal':
+            return jsonify({"status": "error", "message": "Kruskal-Wallis 检验依赖全局秩次，暂不支持流式模式"}), 400
+
+        gm, df = group_moments(filepath, group_col, target_cols, stream=stream)
+        if not 2 <= len(gm.groups) <= ANOVA_MAX_GROUPS:
+            return jsonify({"status": "error",
+                            "message": f"分组变量须包含 2 ~ {ANOVA_MAX_GROUPS} 个类别，当前为 {len(gm.groups)} 个"}), 400
+
+        if method == 'anova':
+            statistic, df_between, df_within, p = oneway_anova(gm)
+        else:
+            statistic, df_between, p = kruskal_wallis(df, group_col, gm)
+            df_within = np.full(len(gm.columns), np.nan)
+        std = np.sqrt(gm.var)
+
+        results = []
+        for j, col in enumerate(gm.columns):
+            if df_between[j] < 1 or not np.isfinite(statistic[j]):
+                continue
+            results.append({
+                "variable": col, "method": method, "statistic": float(round(statistic[j], 4)),
+                "p_value": float(round(p[j], 4)), "significant": bool(p[j] < 0.05),
+                "df_between": int(df_between[j]),
+                "df_within": int(df_within[j]) if np.isfinite(df_within[j]) else None,
+                "groups": [{"name": str(g), "count": int(gm.count[i, j]), "mean": float(round(gm.mean[i, j], 4)),
+                            "std": float(round(std[i, j], 4)) if gm.count[i, j] > 1 else None}
+                           for i, g in enumerate(gm.groups) if gm.count[i, j] > 0]
+            })
+        return jsonify({"status": "success", "data": results})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -0,0 +1,250 @@
+import io
+import os
+import glob
+import time
+import uuid
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from flask import request, jsonify
+from config import (UPLOAD_FOLDER, CACHE_DIRNAME, UPLOAD_CHUNK_BYTES, UPLOAD_PREVIEW_ROWS, UPLOAD_INGEST_WORKERS,
+                    UPLOAD_SESSION_TTL_SECONDS, UPLOAD_INGEST_TIMEOUT_SECONDS, allowed_file)
+from utils import read_df, sniff_encoding, get_parse_info, state_path, write_state, read_state, FileLock
+from services.service_profile import schedule_profile
+
+# 【分块续传会话】
+# 每个会话对应 uploads/.cache/ 下的一个 .part 临时文件，已接收字节数即为其物理大小，
+# 客户端断线后查询状态即可从断点续传；文件拼装完成后在后台线程池完成全量入库。
+# 会话元数据以状态文件落盘，多进程部署下切片请求可落到任意工作进程
+_ingest_executor = ThreadPoolExecutor(max_workers=UPLOAD_INGEST_WORKERS, thread_name_prefix='ingest')
+
+# 嗅探首块时最多读取的字节数 (足以覆盖表头与预览行)
+_SNIFF_BYTES = 1024 * 1024
+
+
+def classify_columns(df):
+    """
+    【特征工程：智能字段属性推断与分类引擎】
+    返回 (全部列, 连续型数值列, 二分类列)，整表上传与分块上传的早期响应共用同一口径。
+    """
+    columns = df.columns.tolist()
+
+    # 智能过滤：识别真正的连续型数值列。
+    # 采用正则/关键字匹配探测技术，强行剔除“学号”、“流水号”等伪数值列(标识符)，保证后续统计算法不被污染。
+    numeric_cols = [c for c in columns if pd.api.types.is_numeric_dtype(df[c]) and not any(
+        kw in str(c).lower() for kw in ['号', 'id', '编号', '代码', '索引'])]
+
+    # 特征挖掘：探测所有唯一值数量严格等于2的特征列，提名为二分类变量（为后续 T检验 储备靶点）
+    binary_cols = [c for c in columns if df[c].nunique() == 2]
+    return columns, numeric_cols, binary_cols
+
+
+def _part_path(upload_id):
+    return os.path.join(UPLOAD_FOLDER, CACHE_DIRNAME, 'uploads', f'{upload_id}.part')
+
+
+def _received(session):
+    try:
+        return os.path.getsize(session["part"])
+    except FileNotFoundError:
+        return 0
+
+
+def _early_schema(session, complete=False):
+    """
+    【早期结构探测】：仅凭已到达的首段字节解析表头与前 N 行，
+    在全量数据仍在传输时即可下发字段分类与预览 (二分类判定基于样本，入库完成后以全量结果为准)。
+    """
+    with open(session["part"], 'rb') as f:
+        sample = f.read(_SNIFF_BYTES)
+    # 截断至最后一个完整行，避免半行数据被误判为脏数据；
+    # 宽表在首段内可能不足 N 行，此时按已到达的完整行解析，至少需要表头加一行数据
+    if not complete:
+        if sample.count(b'\n') < 2:
+            return None
+        sample = sample[:sample.rfind(b'\n') + 1]
+    encoding = sniff_encoding(sample, final=complete)
+    df = pd.read_csv(io.BytesIO(sample), encoding=encoding, nrows=UPLOAD_PREVIEW_ROWS,
+                     float_precision='round_trip')
+    columns, numeric_cols, binary_cols = classify_columns(df)
+    return {
+        "filename": session["filename"],
+        "original_filename": session["original_filename"],
+        "columns": columns,
+        "numeric_columns": numeric_cols,
+        "binary_columns": binary_cols,
+        "encoding": encoding,
+        "preview": df.astype(object).where(df.notna(), "").to_dict(orient='records'),
+        "approximate": True
+    }
+
+
+def _session_path(upload_id):
+    return state_path('uploads', upload_id)
+
+
+def _session_lock(upload_id):
+    return FileLock(_part_path(upload_id) + '.lock')
+
+
+def _update_session(upload_id, **changes):
+    with _session_lock(upload_id):
+        session = read_state(_session_path(upload_id))
+        session.update(changes, updated=time.time())
+        write_state(_session_path(upload_id), session)
+    return session
+
+
+def _purge_expired():
+    """
+    回收闲置超过保留时长的上传会话：删除会话状态、未拼装完成的 .part 临时文件及其锁文件。
+    后台入库中的会话按入库超时判定：入库线程随工作进程崩溃后状态永远停留在 ingesting，超时即回收；
+    已转正的数据文件不受影响。
+    """
+    now = time.time()
+    for path in glob.glob(_session_path('*')):
+        upload_id = os.path.basename(path)[:-len('.json')]
+        session = read_state(path)
+        if session is None:
+            continue
+        ttl = UPLOAD_INGEST_TIMEOUT_SECONDS if session.get("state") == "ingesting" else UPLOAD_SESSION_TTL_SECONDS
+        if now - session.get("updated", os.path.getmtime(path)) <= ttl:
+            continue
+        with _session_lock(upload_id):
+            for target in (path, _part_path(upload_id)):
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+        try:
+            os.remove(_part_path(upload_id) + '.lock')
+        except FileNotFoundError:
+            pass
+
+
+def _ingest(upload_id):
+    """后台全量入库：解析并固化列式副本，随后投递画像任务"""
+    session = read_state(_session_path(upload_id))
+    try:
+        df = read_df(session["filepath"])
+        schedule_profile(session["filepath"])
+        columns, numeric_cols, binary_cols = classify_columns(df)
+        _update_session(upload_id, state="ready", data={
+            "filename": session["filename"],
+            "original_filename": session["original_filename"],
+            "columns": columns,
+            "numeric_columns": numeric_cols,
+            "binary_columns": binary_cols,
+            "row_count": len(df),
+            "parse_info": get_parse_info(session["filepath"])
+        })
+    except Exception as e:
+        traceback.print_exc()
+        _update_session(upload_id, state="error", message=f"文件解析异常: {str(e)}")
+
+
+def _session_view(upload_id, session):
+    view = {"upload_id": upload_id, "filename": session["filename"], "state": session["state"],
+            "received": _received(session) if session["state"] == "receiving" else session["size"],
+            "size": session["size"], "chunk_size": UPLOAD_CHUNK_BYTES}
+    for key in ("schema", "data", "message"):
+        if session.get(key) is not None:
+            view[key] = session[key]
+    return view
+
+
+def do_upload_init():
+    """【分块上传：建立续传会话】分配会话 ID 与安全文件名，返回建议切片大小"""
+    try:
+        data = request.json
+        original_name = data.get('filename') or ''
+        size = data.get('size')
+        if not allowed_file(original_name):
+            return jsonify({"status": "error", "message": "系统不支持该文件格式"}), 400
+
+        ext = original_name.rsplit('.', 1)[1].lower()
+        _purge_expired()
+        upload_id = uuid.uuid4().hex
+        # 沿用整表上传的时间戳命名策略，追加会话 ID 前缀防止同秒并发上传互相覆写
+        safe_filename = f"upload_{int(time.time())}_{upload_id[:8]}.{ext}"
+        session = {"filename": safe_filename, "original_filename": original_name, "ext": ext,
+                   "size": int(size) if size is not None else None, "part": _part_path(upload_id),
+                   "filepath": os.path.join(UPLOAD_FOLDER, safe_filename), "state": "receiving",
+                   "updated": time.time()}
+        os.makedirs(os.path.dirname(session["part"]), exist_ok=True)
+        open(session["part"], 'wb').close()
+        write_state(_session_path(upload_id), session)
+        return jsonify({"status": "success", "data": _session_view(upload_id, session)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def do_upload_chunk(upload_id):
+    """
+    【分块上传：追加切片】
+    offset 必须等于服务端已接收字节数，否则返回 409 与正确断点供客户端续传；
+    CSV 首段字节足够时立即附带早期结构探测结果。
+    """
+    _purge_expired()
+    if read_state(_session_path(upload_id)) is None:
+        return jsonify({"status": "error", "message": "上传会话不存在或已过期"}), 404
+    try:
+        offset = int(request.args.get('offset', -1))
+        with _session_lock(upload_id):
+            session = read_state(_session_path(upload_id))
+            if session["state"] != "receiving":
+                return jsonify({"status": "error", "message": "该上传会话已结束"}), 400
+            received = _received(session)
+            if offset != received:
+                return jsonify({"status": "error", "message": "切片偏移与服务端断点不一致",
+                                "received": received}), 409
+            with open(session["part"], 'ab') as f:
+                f.write(request.get_data(cache=False))
+
+            if session["ext"] == 'csv' and session.get("schema") is None:
+                try:
+                    session["schema"] = _early_schema(session)
+                except Exception:
+                    # 首段样本无法解析时不影响续传，入库完成后再以全量结果作答
+                    session["schema"] = None
+            # 每次追加均刷新活跃时间，持续续传中的会话不会被回收
+            session["updated"] = time.time()
+            write_state(_session_path(upload_id), session)
+        return jsonify({"status": "success", "data": _session_view(upload_id, session)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def do_upload_complete(upload_id):
+    """【分块上传：拼装完成】将临时文件转正并投递后台全量入库，立即返回早期结构信息"""
+    if read_state(_session_path(upload_id)) is None:
+        return jsonify({"status": "error", "message": "上传会话不存在或已过期"}), 404
+    try:
+        with _session_lock(upload_id):
+            session = read_state(_session_path(upload_id))
+            if session["state"] != "receiving":
+                return jsonify({"status": "success", "data": _session_view(upload_id, session)}), 202
+            received = _received(session)
+            if session["size"] is not None and received != session["size"]:
+                return jsonify({"status": "error", "message": "文件尚未传输完整", "received": received}), 409
+            if session["ext"] == 'csv' and session.get("schema") is None:
+                try:
+                    session["schema"] = _early_schema(session, complete=True)
+                except Exception:
+                    session["schema"] = None
+            os.replace(session["part"], session["filepath"])
+            session.update(state="ingesting", size=received, updated=time.time())
+            write_state(_session_path(upload_id), session)
+        _ingest_executor.submit(_ingest, upload_id)
+        return jsonify({"status": "success", "data": _session_view(upload_id, session)}), 202
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def do_upload_status(upload_id):
+    """【分块上传：会话探针】返回断点位置、早期结构与后台入库状态 (receiving / ingesting / ready / error)"""
+    session = read_state(_session_path(upload_id))
+    if session is None:
+        return jsonify({"status": "error", "message": "上传会话不存在或已过期"}), 404
+    return jsonify({"status": "success", "data": _session_view(upload_id, session)})
+
@@ -2,18 +2,101 @@ import os
 import pandas as pd
 import numpy as np
 from flask import request, jsonify
-from config import UPLOAD_FOLDER
-from utils import read_df
+from config import UPLOAD_FOLDER, RADAR_BATCH_MAX, OPTIONS_DEFAULT_LIMIT, OPTIONS_MAX_LIMIT
+from utils import read_df, read_columns, get_derived
+from services.service_kernel import get_column_stats
+
+# 候选值检索支持的匹配方式与排序方式
+OPTION_MATCHES = ('prefix', 'substring')
+OPTION_SORTS = ('appearance', 'frequency', 'alpha')
+
+
+def build_option_index(filepath, col):
+    """
+    【候选值索引】
+    以 factorize 一次性求出列内唯一值及其频数 (仅对唯一值做字符串化，而非整列)，
+    并预先排好字典序与频数序，按 (文件版本, 列) 缓存。之后的前缀检索为二分查找，
+    Top-K 与分页为切片操作，即便百万行高基数列也只需毫秒级响应。
+    """
+    series = read_df(filepath, usecols=[col])[col]
+    codes, uniques = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    labels = pd.Index(uniques).astype(str)
+    if series.dtype == object and not labels.is_unique:
+        # 混合类型列中不同原始值字符串化后可能重合 (如 1 与 '1')，合并其频数并保留首次出现顺序
+        merged = pd.Series(counts, index=labels).groupby(level=0, sort=False).sum()
+        labels, counts = merged.index, merged.to_numpy()
+    # 唯一值互不相同，排序无需稳定；字符串索引的 argsort 远快于对 object 数组排序
+    alpha_order = np.asarray(labels.argsort())
+    labels = labels.to_numpy(dtype=object)
+    return {
+        "labels": labels,
+        "counts": counts.astype('int64'),
+        "alpha_order": alpha_order,
+        "sorted_labels": labels[alpha_order],
+        "freq_order": np.argsort(-counts, kind='stable'),
+        "lower": pd.Series(labels, dtype=str).str.lower()
+    }
+
+
+def query_options(index, query='', match='substring', sort='appearance'):
+    """
+    在候选值索引上检索，返回命中唯一值的位置数组 (已按 sort 排序)。
+
+    :param match: prefix 前缀匹配 (区分大小写，二分查找) / substring 子串匹配 (不区分大小写)
+    :param sort: appearance 首次出现顺序 / frequency 频数降序 / alpha 字典序
+    """
+    if not query:
+        if sort == 'frequency':
+            return index["freq_order"]
+        if sort == 'alpha':
+            return index["alpha_order"]
+        return np.arange(len(index["labels"]))
+
+    if match == 'prefix':
+        lo = np.searchsorted(index["sorted_labels"], query, side='left')
+        hi = np.searchsorted(index["sorted_labels"], query + '\U0010ffff', side='left')
+        hits = index["alpha_order"][lo:hi]
+        if sort == 'alpha':
+            return hits
+    else:
+        hits = np.flatnonzero(index["lower"].str.contains(query.lower(), regex=False).to_numpy(dtype=bool))
+        if sort == 'alpha':
+            return hits[np.argsort(index["labels"][hits], kind='stable')]
+    if sort == 'frequency':
+        return hits[np.argsort(-index["counts"][hits], kind='stable')]
+    return np.sort(hits)
 
 
 def do_get_options():
-    """解析检索特征维度内的唯一实例清单"""
+    """
+    解析检索特征维度内的唯一实例清单
+    支持 query 前缀 / 子串检索、按频数取 Top-K 与 offset / limit 分页；with_counts 为真时同时下发频数
+    """
     try:
-        df = read_df(os.path.join(UPLOAD_FOLDER, request.json.get('filename')))
         col = request.json.get('column')
-        if col not in df.columns: return jsonify({"status": "error", "message": "检索列索引失效"}), 400
-        options = df[col].dropna().astype(str).unique().tolist()[:1000]
-        return jsonify({"status": "success", "data": options})
+        query = str(request.json.get('query') or '')
+        match, sort = request.json.get('match', 'substring'), request.json.get('sort', 'appearance')
+        if match not in OPTION_MATCHES or sort not in OPTION_SORTS:
+            return jsonify({"status": "error", "message": "不支持的检索方式或排序方式"}), 400
+        try:
+            offset = max(0, int(request.json.get('offset') or 0))
+            limit = min(max(1, int(request.json.get('limit') or OPTIONS_DEFAULT_LIMIT)), OPTIONS_MAX_LIMIT)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "分页参数必须为整数"}), 400
+
+        filepath = os.path.join(UPLOAD_FOLDER, request.json.get('filename'))
+        if col not in read_columns(filepath): return jsonify({"status": "error", "message": "检索列索引失效"}), 400
+        index = get_derived(filepath, ('options', col), lambda: build_option_index(filepath, col))
+
+        hits = query_options(index, query, match, sort)
+        page = hits[offset:offset + limit]
+        values = index["labels"][page].tolist()
+        if request.json.get('with_counts'):
+            values = [{"value": v, "count": int(c)} for v, c in zip(values, index["counts"][page].tolist())]
+        return jsonify({"status": "success", "data": values,
+                        "page": {"total": int(len(hits)), "offset": offset, "limit": limit,
+                                 "cardinality": int(len(index["labels"]))}})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -23,20 +106,17 @@ def do_distribution():
     【特征编码】：将连续数值型特征转换为适用于 ECharts 渲染的五数概括 (Boxplot) 及分组聚类 (Histogram) JSON结构
     """
     try:
-        df = read_df(os.path.join(UPLOAD_FOLDER, request.json.get('filename')))
         selected = request.json.get('columns', [])
         charts_data = []
-        for col in selected:
-            if col not in df.columns: continue
-            d = df[col].dropna()
-            if len(d) == 0: continue
+        # 箱线图五数概括与直方图分箱均取自融合统计核 (按文件版本缓存，与描述统计共享)
+        for col, st in get_column_stats(os.path.join(UPLOAD_FOLDER, request.json.get('filename')), selected).items():
+            if st["count"] == 0: continue
 
             # 使用 numpy 的 auto 模式实现高斯分箱平滑
-            counts, bin_edges = np.histogram(d, bins='auto')
+            counts, bin_edges = st["histogram"]["counts"], st["histogram"]["edges"]
             charts_data.append({
                 "variable": col,
-                "boxplot": [float(d.min()), float(d.quantile(0.25)), float(d.median()), float(d.quantile(0.75)),
-                            float(d.max())],
+                "boxplot": [st["min"], st["q25"], st["median"], st["q75"], st["max"]],
                 "histogram": {"categories": [f"{round(bin_edges[i], 1)}~{round(bin_edges[i + 1], 1)}" for i in
                                              range(len(counts))], "series": [int(c) for c in counts]}
             })
@@ -64,29 +144,84 @@ def do_categorical():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def build_radar_index(filepath, id_col):
+    """
+    【雷达图实体索引】
+    一次性完成数值维度筛选、群体均值 / 量程向量计算，并以 id 列的字符串形式建立哈希索引 (重复 id 取首行)，
+    按 (文件版本, id 列) 缓存于派生结果缓存中；后续单个或批量寻址均为 O(1) 哈希查找，无需整列字符串比较。
+    """
+    df = read_df(filepath)
+    if id_col not in df.columns:
+        raise KeyError(id_col)
+    numeric_df = df.select_dtypes(include=['number'])
+    valid_numeric_cols = [c for c in numeric_df.columns if
+                          not any(kw in str(c).lower() for kw in ['号', 'id', '编号', '代码'])]
+
+    keys = df[id_col].astype(str)
+    first = ~keys.duplicated().to_numpy()
+    return {
+        "columns": valid_numeric_cols,
+        "avg_data": numeric_df[valid_numeric_cols].mean().round(2).tolist(),
+        # 将各维度的界限量程向外拓展 10%，维持雷达图的视觉张力与边界留白
+        "indicators": [{"name": col, "max": float(numeric_df[col].max()) * 1.1} for col in valid_numeric_cols],
+        "keys": pd.Index(keys.to_numpy()[first]),
+        "positions": np.flatnonzero(first)
+    }
+
+
+def radar_profiles(filepath, id_col, target_vals):
+    """
+    经由缓存索引批量寻址多个实体，返回 (索引, [(实体名, 坐标向量)], 未命中的实体名列表)。
+    整批目标只做一次向量化哈希查找与一次行切片。
+    """
+    index = get_derived(filepath, ('radar', id_col), lambda: build_radar_index(filepath, id_col))
+    names = [str(v) for v in target_vals]
+    hits = index["keys"].get_indexer(names)
+    found = hits >= 0
+    profiles = []
+    if index["columns"] and found.any():
+        # 列投影读取：只物化雷达维度列 (命中列式副本时按列读取)，不为取几行而载入整表
+        rows = read_df(filepath, usecols=index["columns"]).iloc[index["positions"][hits[found]]]
+        values = np.round(np.nan_to_num(rows.to_numpy(dtype='float64', na_value=np.nan), nan=0.0), 2)
+        profiles = list(zip([n for n, ok in zip(names, found) if ok], values.tolist()))
+    return index, profiles, [n for n, ok in zip(names, found) if not ok]
+
+
 def do_radar():
     """【多维标量空间构建】：提取指定单一实例的多元坐标，并计算群体重心准线以构建雷达图映射"""
     try:
         filename, id_col, target_val = request.json.get('filename'), request.json.get('id_col'), request.json.get(
             'target_val')
-        df = read_df(os.path.join(UPLOAD_FOLDER, filename))
-        numeric_df = df.select_dtypes(include=['number'])
-
-        valid_numeric_cols = [c for c in numeric_df.columns if
-                              not any(kw in str(c).lower() for kw in ['号', 'id', '编号', '代码'])]
-        if not valid_numeric_cols: return jsonify({"status": "error", "message": "无法构建有效维度的雷达骨架"}), 400
+        index, profiles, _ = radar_profiles(os.path.join(UPLOAD_FOLDER, filename), id_col, [target_val])
+        if not index["columns"]: return jsonify({"status": "error", "message": "无法构建有效维度的雷达骨架"}), 400
+        if not profiles: return jsonify({"status": "error", "message": "寻址失败，目标实体丢失"}), 400
 
-        avg_data = numeric_df[valid_numeric_cols].mean().round(2).tolist()
-        target_row = df[df[id_col].astype(str) == str(target_val)]
-        if target_row.empty: return jsonify({"status": "error", "message": "寻址失败，目标实体丢失"}), 400
+        return jsonify({"status": "success",
+                        "data": {"indicators": index["indicators"], "avg_data": index["avg_data"],
+                                 "target_data": profiles[0][1], "target_name": str(target_val)}})
+    except KeyError:
+        return jsonify({"status": "error", "message": "寻址失败，身份列不存在"}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        target_data = target_row[valid_numeric_cols].iloc[0].fillna(0).round(2).tolist()
 
-        # 将各维度的界限量程向外拓展 10%，维持雷达图的视觉张力与边界留白
-        indicators = [{"name": col, "max": float(numeric_df[col].max()) * 1.1} for col in valid_numeric_cols]
+def do_radar_batch():
+    """【多实体雷达对比】：一次请求返回多个实体的坐标向量，共享同一套群体均值与量程骨架"""
+    try:
+        filename, id_col = request.json.get('filename'), request.json.get('id_col')
+        target_vals = request.json.get('target_vals') or []
+        if not isinstance(target_vals, list) or not target_vals:
+            return jsonify({"status": "error", "message": "请至少指定一个对比实体"}), 400
+        if len(target_vals) > RADAR_BATCH_MAX:
+            return jsonify({"status": "error", "message": f"单次最多对比 {RADAR_BATCH_MAX} 个实体"}), 400
 
+        index, profiles, missing = radar_profiles(os.path.join(UPLOAD_FOLDER, filename), id_col, target_vals)
+        if not index["columns"]: return jsonify({"status": "error", "message": "无法构建有效维度的雷达骨架"}), 400
         return jsonify({"status": "success",
-                        "data": {"indicators": indicators, "avg_data": avg_data, "target_data": target_data,
-                                 "target_name": str(target_val)}})
+                        "data": {"indicators": index["indicators"], "avg_data": index["avg_data"],
+                                 "profiles": [{"target_name": name, "target_data": data} for name, data in profiles],
+                                 "missing": missing}})
+    except KeyError:
+        return jsonify({"status": "error", "message": "寻址失败，身份列不存在"}), 400
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# 测试直接导入后端模块 (utils / services)，与 app.py 的运行目录保持一致
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """在临时工作目录中运行 Flask 测试客户端，uploads / outputs 等相对路径均落在该目录下"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('uploads')
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def dataset(client):
+    """将数据帧写入 uploads/ 作为已上传的 CSV，返回文件名"""
+    def _write(df, name='data.csv'):
+        df.to_csv(os.path.join('uploads', name), index=False)
+        return name
+    return _write
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from services.service_clean import clean_frame, resolve_strategy, MAD_SCALE
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"v": [1.0, 2.0, 2.0, 3.0, np.nan, 100.0], "k": [1, 2, 2, 3, 4, 50], "s": list("abcdef")})
+
+
+def test_default_strategy_is_mean_and_sigma():
+    assert resolve_strategy() == {"impute": "mean", "outliers": "sigma", "threshold": 3.0,
+                                  "winsor_limits": [0.01, 0.99]}
+
+
+@pytest.mark.parametrize("options", [{"impute": "zero"}, {"outliers": "z"}, {"winsor_limits": [0.9, 0.1]}])
+def test_invalid_strategy(options):
+    with pytest.raises(ValueError):
+        resolve_strategy(options)
+
+
+@pytest.mark.parametrize("impute, expected", [("mean", 21.6), ("median", 2.0), ("mode", 2.0), ("ffill", 3.0)])
+def test_impute_methods(frame, impute, expected):
+    out, report = clean_frame(frame, resolve_strategy({"impute": impute, "outliers": "none"}))
+    assert out.loc[4, "v"] == pytest.approx(expected)
+    assert report["missing_details"] == {"v": 1} and report["total_outliers"] == 0
+
+
+def test_impute_none_keeps_missing(frame):
+    out, _ = clean_frame(frame, resolve_strategy({"impute": "none", "outliers": "none"}))
+    assert np.isnan(out.loc[4, "v"])
+
+
+def test_iqr_bounds_and_clip(frame):
+    out, report = clean_frame(frame, resolve_strategy({"impute": "none", "outliers": "iqr"}))
+    q1, q3 = frame["v"].quantile([0.25, 0.75])
+    assert report["bounds"]["v"] == pytest.approx([q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)])
+    assert out["v"].max() == pytest.approx(q3 + 1.5 * (q3 - q1)) and report["outliers_details"]["v"] == 1
+
+
+def test_mad_is_robust_to_the_outlier(frame):
+    _, report = clean_frame(frame, resolve_strategy({"impute": "none", "outliers": "mad", "threshold": 2}))
+    median = frame["v"].median()
+    mad = (frame["v"] - median).abs().median()
+    assert report["bounds"]["v"] == pytest.approx([median - 2 * MAD_SCALE * mad, median + 2 * MAD_SCALE * mad])
+    assert report["outliers_details"]["v"] == 1
+
+
+def test_winsorize_clips_to_quantiles(frame):
+    out, report = clean_frame(frame, resolve_strategy({"impute": "none", "outliers": "winsorize",
+                                                       "winsor_limits": [0.2, 0.8]}))
+    lo, hi = frame["v"].quantile([0.2, 0.8])
+    assert report["bounds"]["v"] == pytest.approx([lo, hi])
+    assert out["v"].min() == pytest.approx(lo) and out["v"].max() == pytest.approx(hi)
+
+
+def test_integer_columns_keep_dtype_when_bounds_are_whole(frame):
+    out, _ = clean_frame(frame, resolve_strategy({"impute": "none", "outliers": "winsorize",
+                                                  "winsor_limits": [0.0, 0.6]}))
+    assert out["k"].dtype == "int64" and out["k"].max() == 3 and out["s"].tolist() == frame["s"].tolist()
+    out, _ = clean_frame(frame, resolve_strategy({"outliers": "sigma", "threshold": 1}))
+    assert out["k"].dtype == "float64"
+
+
+def test_dry_run_leaves_data_untouched(frame):
+    out, report = clean_frame(frame, dry_run=True)
+    pd.testing.assert_frame_equal(out, frame)
+    assert report["total_missing"] == 1
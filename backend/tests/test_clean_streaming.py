@@ -0,0 +1,82 @@
+import functools
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import services.service_clean as service_clean
+from services.service_clean import clean_frame, clean_streaming, resolve_strategy
+from utils import iter_csv_chunks
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 200
+    value = rng.normal(10, 2, n)
+    value[[3, 50, 51, 120]] = np.nan
+    value[[10, 150]] = [100.0, -80.0]
+    count = rng.integers(0, 20, n)
+    count[7] = 500
+    return pd.DataFrame({"value": value, "count": count, "label": rng.choice(["a", "b"], n)})
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """以 7 行为一块，使插补、前向填充与裁剪都跨越多个块边界"""
+    monkeypatch.setattr(service_clean, 'iter_csv_chunks', functools.partial(iter_csv_chunks, chunksize=7))
+
+
+@pytest.fixture
+def source(tmp_path, frame):
+    path = str(tmp_path / "raw.csv")
+    frame.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("options", [None, {"impute": "ffill", "outliers": "sigma"},
+                                     {"impute": "none", "outliers": "none"}])
+def test_stream_matches_in_memory(source, tmp_path, small_chunks, options):
+    strategy = resolve_strategy(options)
+    expected_df, expected = clean_frame(pd.read_csv(source), strategy)
+    out = str(tmp_path / "out.csv")
+    report = clean_streaming(source, out, strategy=strategy)
+    for key in ("total_rows", "total_missing", "missing_details", "total_outliers", "outliers_details"):
+        assert report[key] == expected[key]
+    for col, bounds in expected["bounds"].items():
+        assert report["bounds"][col] == pytest.approx(bounds, nan_ok=True)
+    result = pd.read_csv(out, encoding='utf-8-sig')
+    pd.testing.assert_frame_equal(result, expected_df, check_exact=False, rtol=1e-12)
+
+
+def test_quantile_strategies_are_approximate(source, tmp_path, small_chunks):
+    strategy = resolve_strategy({"impute": "median", "outliers": "iqr"})
+    _, expected = clean_frame(pd.read_csv(source), strategy)
+    report = clean_streaming(source, str(tmp_path / "out.csv"), strategy=strategy)
+    assert report["approximate"]
+    assert report["missing_details"] == expected["missing_details"]
+    lower, upper = report["bounds"]["value"]
+    assert lower == pytest.approx(expected["bounds"]["value"][0], abs=1.0)
+    assert upper == pytest.approx(expected["bounds"]["value"][1], abs=1.0)
+
+
+def test_dry_run_writes_nothing(source, tmp_path, small_chunks):
+    out = str(tmp_path / "out.csv")
+    report = clean_streaming(source, out, dry_run=True)
+    assert report["total_missing"] == 4 and not os.path.exists(out)
+
+
+@pytest.mark.parametrize("options", [{"impute": "mode"}, {"outliers": "mad"}])
+def test_full_data_strategies_rejected(source, tmp_path, options):
+    with pytest.raises(ValueError):
+        clean_streaming(source, str(tmp_path / "out.csv"), strategy=resolve_strategy(options))
+
+
+def test_clean_route_stream_mode(client, dataset, frame):
+    name = dataset(frame)
+    resp = client.post('/api/clean', json={"filename": name, "stream": True})
+    data = resp.get_json()["data"]
+    assert resp.status_code == 200 and data["total_missing"] == 4 and data["outliers_details"]["count"] == 1
+    cleaned = pd.read_csv(os.path.join('uploads', data["cleaned_filename"]), encoding='utf-8-sig')
+    assert cleaned["value"].notna().all() and cleaned["count"].max() < 500
+    resp = client.post('/api/clean', json={"filename": name, "stream": True, "strategy": {"impute": "mode"}})
+    assert resp.status_code == 400
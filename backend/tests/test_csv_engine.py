@@ -0,0 +1,56 @@
+import codecs
+import pandas as pd
+import pytest
+from utils import sniff_encoding, csv_encoding, read_df, get_parse_info, invalidate_df_cache
+
+TEXT = "姓名,成绩,日期\n张三,90.5,2024-01-02\n李四,88,2024-02-03\n"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (codecs.BOM_UTF8 + TEXT.encode('utf-8'), 'utf-8-sig'),
+    (TEXT.encode('utf-16'), 'utf-16'),
+    (TEXT.encode('utf-8'), 'utf-8'),
+    (TEXT.encode('gbk'), 'gb18030'),
+])
+def test_sniff_encoding(raw, expected):
+    assert sniff_encoding(raw) == expected
+
+
+def test_truncated_multibyte_tail_is_tolerated():
+    sample = TEXT.encode('utf-8')[:-1] + '中'.encode('utf-8')[:2]
+    assert sniff_encoding(sample, final=False) == 'utf-8'
+    assert sniff_encoding(sample, final=True) == 'gb18030'
+
+
+@pytest.fixture
+def write(tmp_path):
+    written = []
+
+    def _write(raw, name='d.csv'):
+        path = str(tmp_path / name)
+        with open(path, 'wb') as f:
+            f.write(raw)
+        written.append(path)
+        return path
+    yield _write
+    for path in written:
+        invalidate_df_cache(path)
+
+
+def test_invalid_utf8_beyond_first_block(write):
+    # 首块为纯 ASCII，非法字节出现在后续块：须逐块校验而非只看首块
+    raw = ("a,b\n" + "1,2\n" * 100).encode() + "张三,1\n".encode('gbk')
+    path = write(raw)
+    assert csv_encoding(path, block_size=64) == 'gb18030'
+
+
+@pytest.mark.parametrize("encoding", ['utf-8', 'gbk', 'utf-8-sig'])
+def test_read_df_parses_once_with_sniffed_encoding(write, encoding):
+    path = write(TEXT.encode(encoding))
+    df = read_df(path)
+    assert df.columns.tolist() == ["姓名", "成绩", "日期"]
+    assert df["姓名"].tolist() == ["张三", "李四"] and df["成绩"].tolist() == [90.5, 88.0]
+    # 日期文本保持原文，两种解析引擎口径一致
+    assert df["日期"].tolist() == ["2024-01-02", "2024-02-03"]
+    info = get_parse_info(path)
+    assert info["engine"] in ('pyarrow', 'c') and info["encoding"] in (encoding, 'gb18030')
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def table(dataset):
+    return dataset(pd.DataFrame({"id": range(10), "score": [5.0, 1.0, 3.0, 9.0, 7.0, 2.0, 8.0, 4.0, 6.0, 0.0],
+                                 "name": [f"n{i}" for i in range(10)]}))
+
+
+def window(client, **payload):
+    res = client.post('/api/data/window', json=payload)
+    return res.status_code, res.get_json()
+
+
+def test_window_pages_and_sorts(client, table):
+    status, body = window(client, filename=table, offset=2, limit=3, sort_by="score", ascending="false")
+    assert status == 200
+    assert body["total"] == 10 and body["row_ids"] == [4, 8, 0]
+    assert [r["score"] for r in body["rows"]] == [7.0, 6.0, 5.0]
+
+
+@pytest.mark.parametrize("payload", [{"offset": None}, {"limit": "abc"}, {"offset": 1.5}, {"ascending": "maybe"},
+                                     {"filters": [{"column": "score", "op": "gt", "value": "abc"}]},
+                                     {"filters": [{"column": "missing", "op": "eq", "value": 1}]},
+                                     {"filters": "score>1"}])
+def test_invalid_parameters_return_400(client, table, payload):
+    status, body = window(client, filename=table, **payload)
+    assert status == 400 and body["status"] == "error"
+
+
+def test_filters(client, table):
+    status, body = window(client, filename=table, filters=[{"column": "score", "op": "ge", "value": "7"}])
+    assert status == 200 and body["row_ids"] == [3, 4, 6]
+    # 未指定列的 contains 条件跨全部列检索
+    status, body = window(client, filename=table, filters=[{"column": None, "op": "contains", "value": "N7"}])
+    assert status == 200 and body["row_ids"] == [7]
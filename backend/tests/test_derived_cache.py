@@ -0,0 +1,56 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import utils
+from utils import estimate_bytes, get_derived, get_df_cache_stats, invalidate_df_cache, put_derived
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "d.csv"
+    pd.DataFrame({"a": [1, 2]}).to_csv(path, index=False)
+    yield str(path)
+    invalidate_df_cache(str(path))
+
+
+def test_estimate_bytes_counts_buffers():
+    assert estimate_bytes(np.zeros(1000)) == 8000
+    nested = {"order": np.zeros(1000, dtype='int64'), "labels": ["x"] * 10}
+    assert estimate_bytes(nested) > 8000
+    assert estimate_bytes(pd.Series(np.zeros(1000))) >= 8000
+
+
+def test_evicts_by_bytes(source, monkeypatch):
+    monkeypatch.setattr(utils, 'DERIVED_CACHE_MAX_BYTES', 20_000)
+    put_derived(source, 'first', np.zeros(1000))
+    put_derived(source, 'second', np.zeros(1000))
+    assert get_derived(source, 'first') is not None
+    # 第三条超出预算：最久未使用的 second 被淘汰
+    put_derived(source, 'third', np.zeros(1000))
+    assert get_derived(source, 'second') is None
+    assert get_derived(source, 'first') is not None and get_derived(source, 'third') is not None
+    assert get_df_cache_stats()["derived_bytes"] <= 20_000
+
+
+def test_oversized_entry_is_not_cached(source, monkeypatch):
+    monkeypatch.setattr(utils, 'DERIVED_CACHE_MAX_BYTES', 1000)
+    put_derived(source, 'big', np.zeros(1000))
+    assert get_derived(source, 'big') is None
+
+
+def test_invalidate_releases_bytes(source):
+    before = get_df_cache_stats()["derived_bytes"]
+    put_derived(source, 'k', np.zeros(1000))
+    assert get_df_cache_stats()["derived_bytes"] >= before + 8000
+    invalidate_df_cache(source)
+    assert get_df_cache_stats()["derived_bytes"] == before and get_derived(source, 'k') is None
+
+
+def test_new_file_version_replaces_old_entries(source):
+    put_derived(source, 'k', np.zeros(1000))
+    before = get_df_cache_stats()["derived_bytes"]
+    pd.DataFrame({"a": [1, 2, 3]}).to_csv(source, index=False)
+    os.utime(source, ns=(1, 1))
+    put_derived(source, 'k', np.zeros(10))
+    assert get_df_cache_stats()["derived_bytes"] < before
@@ -0,0 +1,57 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+from services.service_sketch import RunningMoments, KLLSketch
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(size=20000)
+    x[rng.choice(len(x), 500, replace=False)] = np.nan
+    return x
+
+
+def test_running_moments_merge_matches_numpy(values):
+    acc = RunningMoments()
+    for chunk in np.array_split(values, 9):
+        acc.update(chunk)
+    clean = values[~np.isnan(values)]
+    assert acc.count == clean.size
+    assert acc.mean == pytest.approx(clean.mean())
+    assert acc.var == pytest.approx(clean.var(ddof=1))
+    assert acc.skew == pytest.approx(stats.skew(clean))
+    assert acc.kurtosis == pytest.approx(stats.kurtosis(clean, fisher=False))
+    assert (acc.min, acc.max) == (clean.min(), clean.max())
+
+
+def test_kll_quantiles_within_rank_error(values):
+    sketch = KLLSketch()
+    for chunk in np.array_split(values, 9):
+        sketch.update(chunk)
+    clean = np.sort(values[~np.isnan(values)])
+    for q, est in zip([0.1, 0.5, 0.9], sketch.quantile([0.1, 0.5, 0.9])):
+        rank = np.searchsorted(clean, est) / clean.size
+        assert abs(rank - q) < 0.02
+
+
+def test_empty_sketches():
+    assert np.isnan(RunningMoments().update(np.array([np.nan])).std)
+    assert np.isnan(KLLSketch().quantile(0.5))
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_descriptive_empty_column_is_null(client, dataset, stream):
+    name = dataset(pd.DataFrame({"a": [1.0, 2.0, 4.0], "empty": [np.nan] * 3, "single": [np.nan, 5.0, np.nan]}))
+    resp = client.post('/api/analyze/descriptive', json={"filename": name, "columns": ["a", "empty", "single"],
+                                                          "stream": stream})
+    assert resp.status_code == 200
+    body = json.loads(resp.get_data(as_text=True), parse_constant=lambda c: pytest.fail(f"非法 JSON 常量 {c}"))
+    rows = {r["variable"]: r for r in body["data"]}
+    assert rows["a"]["mean"] == pytest.approx(2.3333) and rows["a"]["max"] == 4.0
+    assert rows["empty"]["count"] == 0
+    assert all(rows["empty"][k] is None for k in ("mean", "median", "std", "min", "max"))
+    # 单个有效值的标准差无定义
+    assert rows["single"]["std"] is None and rows["single"]["mean"] == 5.0
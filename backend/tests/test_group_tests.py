@@ -0,0 +1,82 @@
+import functools
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+import services.service_stats as service_stats
+from services.service_stats import group_moments, welch_ttest, oneway_anova, kruskal_wallis
+from utils import iter_csv_chunks
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 300
+    group = rng.choice(["a", "b", "c"], n)
+    shift = pd.Series(group).map({"a": 0.0, "b": 0.5, "c": 1.0}).to_numpy()
+    score = rng.normal(10, 2, n) + shift
+    score[rng.choice(n, 15, replace=False)] = np.nan
+    rating = rng.integers(1, 6, n)                 # 大量结，检验 Kruskal 的结校正
+    return pd.DataFrame({"group": group, "score": score, "rating": rating, "text": "x"})
+
+
+@pytest.fixture
+def source(dataset, frame):
+    return os.path.join('uploads', dataset(frame))
+
+
+def _samples(frame, col, groups):
+    return [frame.loc[frame["group"] == g, col].dropna() for g in groups]
+
+
+def test_anova_and_kruskal_match_scipy(source, frame):
+    gm, df = group_moments(source, "group", ["score", "rating", "text"])
+    assert gm.columns == ["score", "rating"]
+    f, df_between, df_within, p = oneway_anova(gm)
+    h, _, p_h = kruskal_wallis(df, "group", gm)
+    for j, col in enumerate(gm.columns):
+        samples = _samples(frame, col, gm.groups)
+        expected = stats.f_oneway(*samples)
+        assert f[j] == pytest.approx(expected.statistic) and p[j] == pytest.approx(expected.pvalue)
+        assert df_between[j] == 2 and df_within[j] == sum(map(len, samples)) - 3
+        expected = stats.kruskal(*samples)
+        assert h[j] == pytest.approx(expected.statistic) and p_h[j] == pytest.approx(expected.pvalue)
+
+
+def test_welch_matches_scipy(dataset, frame):
+    two = frame[frame["group"] != "c"]
+    gm, _ = group_moments(os.path.join('uploads', dataset(two, 'two.csv')), "group", ["score"])
+    t, _, p = welch_ttest(gm)
+    expected = stats.ttest_ind(*_samples(two, "score", gm.groups), equal_var=False)
+    assert t[0] == pytest.approx(expected.statistic) and p[0] == pytest.approx(expected.pvalue)
+
+
+def test_streamed_moments_match_in_memory(source, monkeypatch):
+    monkeypatch.setattr(service_stats, 'iter_csv_chunks', functools.partial(iter_csv_chunks, chunksize=17))
+    full, _ = group_moments(source, "group", ["score", "rating", "text"])
+    streamed, df = group_moments(source, "group", ["score", "rating", "text"], stream=True)
+    assert df is None and streamed.columns == full.columns
+    order = [streamed.groups.index(g) for g in full.groups]
+    np.testing.assert_array_equal(streamed.count[order], full.count)
+    np.testing.assert_allclose(streamed.mean[order], full.mean)
+    np.testing.assert_allclose(streamed.m2[order], full.m2)
+
+
+def test_anova_route(client, source):
+    name = os.path.basename(source)
+    resp = client.post('/api/analyze/anova', json={"filename": name, "group_col": "group", "columns": ["score"]})
+    row = resp.get_json()["data"][0]
+    assert row["method"] == "anova" and row["significant"] and len(row["groups"]) == 3
+    resp = client.post('/api/analyze/anova', json={"filename": name, "group_col": "group", "columns": ["score"],
+                                                   "method": "kruskal", "stream": True})
+    assert resp.status_code == 400
+
+
+def test_group_count_limits(client, dataset, monkeypatch):
+    monkeypatch.setattr(service_stats, 'ANOVA_MAX_GROUPS', 3)
+    name = dataset(pd.DataFrame({"g": list("abcd") * 5, "y": np.arange(20.0)}))
+    resp = client.post('/api/analyze/anova', json={"filename": name, "group_col": "g", "columns": ["y"]})
+    assert resp.status_code == 400
+    resp = client.post('/api/analyze/ttest', json={"filename": name, "group_col": "g", "columns": ["y"]})
+    assert resp.status_code == 400
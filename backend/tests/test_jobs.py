@@ -0,0 +1,104 @@
+import os
+import time
+import pandas as pd
+import pytest
+import services.service_jobs as service_jobs
+import services.service_models as service_models
+from services.service_jobs import submit_job, get_job, cancel_job, set_web_processes, pool_size
+from services.service_models import model_key, get_or_train, lookup_model
+
+
+def add_job(payload, progress):
+    """子进程任务：须为可按模块路径导入的顶层函数"""
+    progress.update(50, "计算中")
+    return payload["a"] + payload["b"]
+
+
+def wait_job(payload, progress):
+    while True:
+        progress.check_cancelled()
+        time.sleep(0.05)
+
+
+def _wait(job_id, states=("done", "error", "cancelled"), timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = get_job(job_id)
+        if info["state"] in states:
+            return info
+        time.sleep(0.05)
+    pytest.fail(f"任务 {job_id} 未在 {timeout}s 内结束")
+
+
+@pytest.fixture
+def pool(client):
+    """子进程沿用建池时的工作目录，每个用例在自己的临时目录中新建进程池并在结束时关闭"""
+    yield
+    if service_jobs._executor is not None:
+        service_jobs._executor.shutdown(wait=True, cancel_futures=True)
+        service_jobs._executor = None
+
+
+@pytest.mark.parametrize("budget, processes, expected", [(8, 1, 8), (8, 4, 2), (3, 4, 1)])
+def test_pool_size_splits_budget_across_web_processes(monkeypatch, budget, processes, expected):
+    monkeypatch.setattr(service_jobs, 'JOB_WORKERS', budget)
+    monkeypatch.setattr(service_jobs, '_web_processes', 1)
+    set_web_processes(processes)
+    assert pool_size() == expected
+
+
+def test_job_result_is_shared_through_state_file(pool, client):
+    job_id = submit_job('add', add_job, {"a": 2, "b": 3})
+    info = _wait(job_id)
+    assert info["state"] == "done" and info["result"] == 5 and info["progress"] == 100
+    assert client.get(f'/api/jobs/{job_id}').get_json()["data"]["result"] == 5
+
+
+def test_cancel_running_job(pool):
+    job_id = submit_job('wait', wait_job, {})
+    _wait(job_id, states=("running",))
+    assert cancel_job(job_id)
+    assert get_job(job_id).get("cancel_requested") or get_job(job_id)["state"] == "cancelled"
+    assert _wait(job_id)["state"] == "cancelled"
+
+
+def test_unknown_job():
+    assert get_job('missing') is None and not cancel_job('missing')
+
+
+@pytest.fixture
+def source(dataset, monkeypatch):
+    monkeypatch.setattr(service_models, '_models', type(service_models._models)())
+    return os.path.join('uploads', dataset(pd.DataFrame({"x": [1.0, 2.0], "y": [3.0, 4.0]})))
+
+
+def test_model_key_ignores_feature_order(source):
+    assert model_key(source, 'y', ['a', 'b'], {"k": 1}) == model_key(source, 'y', ['b', 'a'], {"k": 1})
+    assert model_key(source, 'y', ['a', 'b'], {"k": 1}) != model_key(source, 'y', ['a', 'b'], {"k": 2})
+
+
+def test_get_or_train_reuses_memory_and_disk(source):
+    calls = []
+
+    def trainer():
+        calls.append(1)
+        return {"model": {"weights": [1, 2]}, "score": 0.9}
+
+    artifact, reused = get_or_train(source, 'y', ['x'], {"k": 1}, trainer)
+    assert not reused and artifact["score"] == 0.9 and artifact["feature_cols"] == ['x']
+    assert get_or_train(source, 'y', ['x'], {"k": 1}, trainer)[1]
+    # 进程内缓存清空后仍可从磁盘副本复用 (模拟另一个任务进程)
+    service_models._models.clear()
+    artifact, reused = get_or_train(source, 'y', ['x'], {"k": 1}, trainer)
+    assert reused and artifact["model"] == {"weights": [1, 2]} and len(calls) == 1
+
+
+def test_model_disk_copies_are_bounded(source, monkeypatch):
+    monkeypatch.setattr(service_models, 'MODEL_DISK_MAX', 2)
+    keys = []
+    for k in range(4):
+        get_or_train(source, 'y', ['x'], {"k": k}, lambda: {"model": k})
+        keys.append(model_key(source, 'y', ['x'], {"k": k}))
+        time.sleep(0.01)
+    service_models._models.clear()
+    assert [lookup_model(source, key) is not None for key in keys] == [False, False, True, True]
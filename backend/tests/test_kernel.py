@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import services.service_kernel as service_kernel
+from services.service_kernel import compute_column_stats, get_column_stats
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    x = rng.gamma(2, size=500)
+    x[::37] = np.nan
+    return pd.DataFrame({"x": x, "n": rng.integers(0, 9, 500), "empty": np.nan, "one": [1.0] + [np.nan] * 499})
+
+
+def test_matches_pandas(frame):
+    stats = compute_column_stats(frame, ["x", "n"])
+    for col in ("x", "n"):
+        s, st = frame[col], stats[col]
+        assert st["count"] == s.count() and st["nulls"] == s.isna().sum()
+        assert st["mean"] == pytest.approx(s.mean()) and st["std"] == pytest.approx(s.std())
+        assert st["skew"] == pytest.approx(s.skew())
+        assert [st["min"], st["q25"], st["median"], st["q75"], st["max"]] == pytest.approx(
+            s.quantile([0, 0.25, 0.5, 0.75, 1]).tolist())
+        assert sum(st["histogram"]["counts"]) == s.count()
+        assert len(st["histogram"]["edges"]) == len(st["histogram"]["counts"]) + 1
+
+
+def test_degenerate_columns(frame):
+    stats = compute_column_stats(frame, ["empty", "one"])
+    assert stats["empty"]["count"] == 0 and np.isnan(stats["empty"]["mean"])
+    assert stats["empty"]["histogram"] == {"counts": [], "edges": []}
+    assert stats["one"]["mean"] == 1.0 and np.isnan(stats["one"]["std"]) and np.isnan(stats["one"]["skew"])
+
+
+def test_results_shared_across_endpoints(client, dataset, frame, monkeypatch):
+    calls = []
+    original = service_kernel.compute_column_stats
+    monkeypatch.setattr(service_kernel, 'compute_column_stats',
+                        lambda df, columns: calls.append(list(columns)) or original(df, columns))
+    name = dataset(frame)
+    client.post('/api/analyze/descriptive', json={"filename": name, "columns": ["x"], "stream": False})
+    client.post('/api/visualize/distribution', json={"filename": name, "columns": ["x", "n"]})
+    # 第二个接口只为尚未算过的列补算一次
+    assert calls == [["x"], ["n"]]
+    assert list(get_column_stats(os.path.join('uploads', name), ["n", "x"])) == ["n", "x"]
+    assert len(calls) == 2
+    assert list(get_column_stats(os.path.join('uploads', name), ["x", "missing"])) == ["x"]
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import services.service_security as service_security
+from services.service_security import detect_pii_columns, mask_series, register_detector
+
+
+@pytest.fixture
+def people():
+    n = 50
+    return pd.DataFrame({
+        "姓名": [f"张{i}明" for i in range(n)],
+        "contact": [f"138{i:08d}" for i in range(n)],
+        "mail": [f"user{i}@example.com" for i in range(n)],
+        "cert": [f"11010519900101{i:03d}X" for i in range(n)],
+        "score": np.arange(n) * 1.5,
+        "flag": [True, False] * (n // 2),
+    })
+
+
+def test_detects_by_keyword_then_content(people):
+    assert detect_pii_columns(people) == {"姓名": "keyword", "contact": "phone", "mail": "email", "cert": "id_card"}
+
+
+def test_float_phone_column_is_detected():
+    # 含缺失值的手机号列会被解析为浮点数，抽样时须去掉 .0 尾巴
+    df = pd.DataFrame({"contact": [13800000000.0 + i for i in range(20)] + [np.nan]})
+    assert detect_pii_columns(df) == {"contact": "phone"}
+
+
+def test_register_detector(monkeypatch):
+    monkeypatch.setitem(service_security.PII_DETECTORS, "plate", None)
+    register_detector("plate", r"[京沪][A-Z]\d{5}")
+    df = pd.DataFrame({"car": [f"京A{i:05d}" for i in range(10)]})
+    assert detect_pii_columns(df) == {"car": "plate"}
+
+
+def test_mask_series_is_length_aware():
+    s = pd.Series(["李", "李四", "王小明", "13812345678", "", None, "nan"], dtype=object)
+    assert mask_series(s).tolist()[:5] == ["李*", "李*", "王*明", "1381****", ""]
+    out = mask_series(s)
+    assert pd.isna(out[5]) and out[6] == "nan"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_mask_route_writes_masked_copy(client, dataset, people, monkeypatch, stream):
+    if stream:
+        monkeypatch.setattr(service_security, 'STREAM_THRESHOLD_BYTES', 0)
+    name = dataset(people)
+    resp = client.post('/api/mask', json={"filename": name})
+    data = resp.get_json()["data"]
+    assert sorted(data["masked_cols"]) == sorted(["姓名", "contact", "mail", "cert"])
+    masked = pd.read_csv(os.path.join('uploads', data["masked_filename"]), encoding='utf-8-sig', dtype=str)
+    assert masked["contact"].iloc[0] == "1380****" and masked["姓名"].iloc[0] == "张*明"
+    # 未脱敏列逐字节保留
+    assert masked["score"].tolist() == pd.read_csv(os.path.join('uploads', name), dtype=str)["score"].tolist()
+    assert masked["flag"].tolist() == ["True", "False"] * 25
+
+
+def test_stream_and_memory_paths_agree(client, dataset, people, monkeypatch):
+    name = dataset(people)
+    in_memory = client.post('/api/mask', json={"filename": name}).get_json()["data"]
+    frame = pd.read_csv(os.path.join('uploads', in_memory["masked_filename"]), dtype=str)
+    monkeypatch.setattr(service_security, 'STREAM_THRESHOLD_BYTES', 0)
+    streamed = client.post('/api/mask', json={"filename": name}).get_json()["data"]
+    assert streamed["detections"] == in_memory["detections"]
+    pd.testing.assert_frame_equal(pd.read_csv(os.path.join('uploads', streamed["masked_filename"]), dtype=str), frame)
@@ -0,0 +1,36 @@
+import sys
+import pandas as pd
+import pytest
+import metrics
+
+
+def _types(text):
+    return dict(line.split()[2:4] for line in text.splitlines() if line.startswith('# TYPE'))
+
+
+def test_cache_counts_exported_as_counters(client, dataset):
+    name = dataset(pd.DataFrame({"a": [1.0, 2.0]}))
+    client.post('/api/analyze/descriptive', json={"filename": name, "columns": ["a"]})
+    types = _types(client.get('/metrics').get_data(as_text=True))
+    for name in ("df_cache_hits", "df_cache_misses", "df_cache_evictions", "derived_cache_evictions"):
+        assert types[f"dataanalyzer_{name}_total"] == 'counter'
+        assert f"dataanalyzer_{name}" not in types
+    assert types["dataanalyzer_df_cache_bytes"] == 'gauge'
+    assert all(kind != 'counter' or name.endswith('_total') for name, kind in types.items())
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="当前 RSS 采样依赖 /proc")
+def test_current_rss_tracks_allocation():
+    before = metrics._current_rss()
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b'\x01' * len(block[::4096])  # 逐页写入，确保物理页真正驻留
+    assert metrics._current_rss() - before > 32 * 1024 * 1024
+    del block
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="当前 RSS 采样依赖 /proc")
+def test_rss_delta_exported_per_route(client):
+    client.get('/metrics')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert _types(text)["dataanalyzer_request_rss_delta_bytes"] == 'gauge'
+    assert 'dataanalyzer_request_rss_delta_bytes{route="/metrics"}' in text
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+import services.service_ml as service_ml
+from config import ML_TREE_STAGES
+from services.service_ml import train_predict_new, training_n_jobs
+
+
+class Progress:
+    """任务进度句柄的测试替身：记录上报的阶段，不落盘"""
+
+    def __init__(self):
+        self.updates = []
+
+    def update(self, percent, message='', **extra):
+        self.updates.append((percent, message, extra))
+
+    def check_cancelled(self):
+        pass
+
+
+@pytest.fixture
+def training_file(dataset):
+    rng = np.random.default_rng(1)
+    x = rng.normal(50, 10, 2000)
+    return dataset(pd.DataFrame({"x": x, "z": rng.normal(0, 1, 2000), "y": 2 * x + rng.normal(0, 5, 2000)}))
+
+
+def test_predict_new_metrics_use_display_sequence(training_file):
+    result = train_predict_new({"filename": training_file, "target_col": "y", "feature_cols": ["x", "z"],
+                                "engine": "random_forest", "max_points": 100}, Progress())
+    # 置信度与样本量沿用 50 条展示序列的口径，降采样只作用于图表序列
+    assert result["sampleSize"] == 50
+    reduction = result["series_reduction"]
+    assert reduction["method"] == "lttb" and reduction["original_points"] == 400
+    assert len(result["labels"]) == len(result["realValues"]) == len(result["predictedValues"]) == 100
+
+
+@pytest.mark.parametrize("engine, stage_param, wording", [("random_forest", "n_estimators", "棵决策树"),
+                                                          ("hist_gbdt", "max_iter", "轮提升迭代")])
+def test_stage_records_use_model_specific_units(training_file, engine, stage_param, wording):
+    progress = Progress()
+    train_predict_new({"filename": training_file, "target_col": "y", "feature_cols": ["x", "z"], "engine": engine},
+                      progress)
+    stages = [extra["stages"] for _, _, extra in progress.updates if "stages" in extra][-1]
+    assert [s[stage_param] for s in stages] == ML_TREE_STAGES
+    assert all(wording in message for _, message, extra in progress.updates if "stages" in extra)
+
+
+def test_training_n_jobs_shares_cores_between_running_jobs(monkeypatch):
+    monkeypatch.setattr(service_ml, 'ML_N_JOBS', 0)
+    monkeypatch.setattr(service_ml.os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(service_ml, 'running_jobs', lambda: 1)
+    assert training_n_jobs() == 8
+    monkeypatch.setattr(service_ml, 'running_jobs', lambda: 3)
+    assert training_n_jobs() == 2
+    monkeypatch.setattr(service_ml, 'ML_N_JOBS', 4)
+    assert training_n_jobs() == 4
@@ -0,0 +1,78 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+from config import NORMALITY_SHAPIRO_MAX, NORMALITY_SUBSAMPLE_MAX, NORMALITY_ANDERSON_MAX
+from services.service_normality import resolve_method, test_normality as normality
+from services.service_sketch import AndersonSketch
+
+
+@pytest.mark.parametrize("n, expected", [
+    (NORMALITY_SHAPIRO_MAX, 'shapiro'),
+    (NORMALITY_SUBSAMPLE_MAX, 'shapiro'),
+    (NORMALITY_ANDERSON_MAX, 'anderson'),
+    (NORMALITY_ANDERSON_MAX + 1, 'dagostino'),
+])
+def test_auto_tiers(n, expected):
+    assert resolve_method('auto', n) == expected
+    assert resolve_method('anderson', n) == 'anderson'
+
+
+def test_shapiro_subsamples_beyond_limit():
+    values = np.random.default_rng(1).normal(size=NORMALITY_SHAPIRO_MAX * 2)
+    res = normality(values)
+    assert res["method"] == 'shapiro' and res["subsampled"]
+    assert res["sample_size"] == NORMALITY_SHAPIRO_MAX
+    # 固定种子，同一数据重复检验结果一致
+    assert normality(values) == res
+
+
+def exact_anderson(values):
+    """按定义排序求 A² (均值与 ddof=1 标准差由样本估计)，作为草图的对照"""
+    n = len(values)
+    z = np.sort((values - values.mean()) / values.std(ddof=1))
+    i = np.arange(1, n + 1)
+    return -n - ((2 * i - 1) / n * (stats.norm.logcdf(z) + stats.norm.logsf(z[::-1]))).sum()
+
+
+@pytest.mark.parametrize("values", [
+    np.random.default_rng(2).normal(3, 2, 60000),
+    np.random.default_rng(3).exponential(size=60000),
+])
+def test_anderson_sketch_matches_exact_statistic(values):
+    exact = exact_anderson(values)
+    sketch = AndersonSketch(values.mean(), values.std(ddof=1))
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    assert sketch.statistic() == pytest.approx(exact, rel=5e-3, abs=2e-3)
+
+
+def test_dagostino_matches_scipy():
+    values = np.random.default_rng(4).gamma(4, size=3000)
+    res = normality(values, 'dagostino')
+    expected = stats.normaltest(values)
+    assert res["statistic"] == pytest.approx(expected.statistic)
+    assert res["p_value"] == pytest.approx(expected.pvalue)
+
+
+@pytest.mark.parametrize("method", ['auto', 'shapiro', 'anderson', 'dagostino'])
+def test_constant_column_has_no_statistic(method):
+    res = normality(np.full(100, 7.0), method)
+    assert res["statistic"] is None and res["p_value"] is None and res["message"]
+
+
+def test_too_few_values_skipped():
+    assert normality(np.array([1.0, 2.0])) is None
+
+
+def test_advanced_route_emits_valid_json_for_constant_column(client, dataset):
+    rng = np.random.default_rng(5)
+    name = dataset(pd.DataFrame({"a": rng.normal(size=200), "b": rng.normal(size=200), "c": 1.0}))
+    resp = client.post('/api/analyze/advanced', json={"filename": name, "columns": ["a", "b", "c"]})
+    assert resp.status_code == 200
+    # 严格解析：NaN / Infinity 不是合法 JSON
+    body = json.loads(resp.get_data(as_text=True), parse_constant=lambda c: pytest.fail(f"非法 JSON 常量 {c}"))
+    rows = {r["variable"]: r for r in body["data"]["normality"]}
+    assert rows["c"]["is_normal"] is None and rows["c"]["p_value"] is None and rows["c"]["message"]
+    assert isinstance(rows["a"]["is_normal"], bool)
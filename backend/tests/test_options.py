@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def table(dataset):
+    return dataset(pd.DataFrame({"city": ["Beijing", "Shanghai", "Beijing", "Bern", "shenzhen", "Beijing", "Bern"]}))
+
+
+def options(client, table, **payload):
+    res = client.post('/api/get_options', json={"filename": table, "column": "city", **payload})
+    return res.status_code, res.get_json()
+
+
+def test_default_appearance_order(client, table):
+    status, body = options(client, table)
+    assert status == 200 and body["data"] == ["Beijing", "Shanghai", "Bern", "shenzhen"]
+    assert body["page"]["cardinality"] == 4
+
+
+def test_prefix_is_case_sensitive_and_substring_is_not(client, table):
+    assert options(client, table, query="Be", match="prefix", sort="alpha")[1]["data"] == ["Beijing", "Bern"]
+    assert options(client, table, query="sh", match="substring")[1]["data"] == ["Shanghai", "shenzhen"]
+
+
+def test_top_k_with_counts_and_paging(client, table):
+    status, body = options(client, table, sort="frequency", limit=2, with_counts=True)
+    assert body["data"] == [{"value": "Beijing", "count": 3}, {"value": "Bern", "count": 2}]
+    assert body["page"] == {"total": 4, "offset": 0, "limit": 2, "cardinality": 4}
+    assert options(client, table, sort="frequency", offset=2)[1]["data"] == ["Shanghai", "shenzhen"]
+
+
+@pytest.mark.parametrize("payload", [{"match": "regex"}, {"sort": "random"}, {"limit": "many"}, {"column": "nope"}])
+def test_bad_parameters(client, table, payload):
+    assert options(client, table, **payload)[0] == 400
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from utils import apply_patch_ops
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"x": [1, 2, 3], "f": [1.5, None, 2.0], "s": ["a", "b", "c"]})
+
+
+def test_set_keeps_numeric_dtype(frame):
+    out = apply_patch_ops(frame, [{"op": "set", "row": 0, "column": "x", "value": "9"},
+                                  {"op": "set", "row": 1, "column": "f", "value": "2.5"}])
+    assert out["x"].dtype == "int64" and out.loc[0, "x"] == 9
+    assert out["f"].dtype == "float64" and out.loc[1, "f"] == 2.5
+
+
+def test_insert_coerces_values_like_set(frame):
+    out = apply_patch_ops(frame, [{"op": "insert", "row": 1, "values": {"x": "4", "f": "2.5", "s": "z"}},
+                                  {"op": "insert", "values": {"x": "1"}}])
+    assert out.dtypes.to_dict() == frame.dtypes.to_dict()
+    assert out["x"].tolist() == [1, 4, 2, 3, 1]
+    assert out.loc[1, "f"] == 2.5 and pd.isna(out.loc[4, "f"]) and pd.isna(out.loc[4, "s"])
+
+
+def test_insert_missing_numeric_value_matches_csv_reparse(frame):
+    out = apply_patch_ops(frame, [{"op": "insert", "values": {"x": "", "s": "q"}}])
+    # 整数列出现缺失值后与重新解析 CSV 的结果一致：升格为浮点而非 object
+    assert out["x"].dtype == "float64" and pd.isna(out.loc[3, "x"])
+    assert out["s"].dtype == frame["s"].dtype
+
+
+def test_delete_keeps_dtypes(frame):
+    out = apply_patch_ops(frame, [{"op": "delete", "row": 1}])
+    assert out.dtypes.to_dict() == frame.dtypes.to_dict()
+    assert out["x"].tolist() == [1, 3]
+
+
+def test_invalid_op_raises(frame):
+    with pytest.raises(ValueError):
+        apply_patch_ops(frame, [{"op": "insert", "row": 10, "values": {}}])
@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+import pytest
+from utils import cache_path, changelog_path, invalidate_df_cache, read_df
+
+
+@pytest.fixture
+def table(dataset):
+    return dataset(pd.DataFrame({"x": [1, 2, 3], "s": ["a", "b", "c"]}))
+
+
+def current_version(client, filename):
+    return client.post('/api/data/window', json={"filename": filename, "limit": 1}).get_json()["version"]
+
+
+def patch(client, filename, ops, **extra):
+    res = client.post('/api/data/patch', json={"filename": filename, "ops": ops, **extra})
+    return res.status_code, res.get_json()
+
+
+def test_base_version_is_required(client, table):
+    status, body = patch(client, table, [{"op": "set", "row": 0, "column": "x", "value": "9"}])
+    assert status == 400 and "base_version" in body["message"]
+    assert read_df(os.path.join('uploads', table))["x"].tolist() == [1, 2, 3]
+
+
+def test_stale_version_conflicts(client, table):
+    version = current_version(client, table)
+    status, body = patch(client, table, [{"op": "delete", "row": 0}], base_version=version)
+    assert status == 200 and body["row_count"] == 2
+    status, body = patch(client, table, [{"op": "delete", "row": 0}], base_version=version)
+    assert status == 409 and body["status"] == "conflict" and body["version"] != version
+
+
+def test_patches_replay_then_compact(client, table, monkeypatch):
+    monkeypatch.setattr('routes.process_routes.PATCH_COMPACT_EVERY', 2)
+    path = os.path.join('uploads', table)
+    status, body = patch(client, table, [{"op": "set", "row": 1, "column": "x", "value": "7"}],
+                         base_version=current_version(client, table))
+    assert status == 200 and not body["compacted"] and os.path.exists(changelog_path(path))
+    status, body = patch(client, table, [{"op": "insert", "row": None, "values": {"x": "4", "s": "d"}}],
+                         base_version=body["version"])
+    assert status == 200 and body["compacted"] and not os.path.exists(changelog_path(path))
+    assert pd.read_csv(path)["x"].tolist() == [1, 7, 3, 4]
+
+
+def test_invalidate_keeps_lock_file(client, table):
+    path = os.path.join('uploads', table)
+    read_df(path)
+    lock = cache_path(path, '.lock')
+    open(lock, 'w').close()
+    invalidate_df_cache(path)
+    assert os.path.exists(lock)
+    assert os.listdir(os.path.dirname(lock)) == [os.path.basename(lock)]
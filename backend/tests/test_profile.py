@@ -0,0 +1,52 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from services.service_profile import build_profile, get_profile, load_profile, profile_status, schedule_profile
+
+
+@pytest.fixture
+def source(dataset):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"学号": np.arange(100), "score": rng.normal(70, 8, 100), "math": rng.normal(60, 5, 100),
+                       "sex": rng.choice(["男", "女"], 100), "blank": np.nan})
+    return os.path.join('uploads', dataset(df))
+
+
+def test_build_profile(source):
+    profile = build_profile(source)
+    assert profile["row_count"] == 100 and profile["col_count"] == 5
+    # 标识符列不计入数值列
+    assert profile["numeric_columns"] == ["score", "math", "blank"]
+    assert "sex" in profile["binary_columns"] and "学号" in profile["categorical_columns"]
+    sex = profile["column_profiles"]["sex"]
+    assert sex["cardinality"] == 2 and sum(v for _, v in sex["top_values"]) == 100
+    assert profile["column_profiles"]["score"]["mean"] == pytest.approx(pd.read_csv(source)["score"].mean())
+    assert profile["correlation"]["matrix"][0][0] == pytest.approx(1.0)
+    # 全空列的统计量为 null，画像可直接序列化为合法 JSON
+    json.dumps(profile, allow_nan=False)
+    assert profile["column_profiles"]["blank"]["mean"] is None
+
+
+def test_background_profile_is_reused_until_file_changes(source):
+    schedule_profile(source)
+    deadline = time.time() + 30
+    while profile_status(source)["state"] != "ready" and time.time() < deadline:
+        time.sleep(0.05)
+    assert profile_status(source)["state"] == "ready"
+    assert get_profile(source) == load_profile(source)
+
+    pd.DataFrame({"score": [1.0, 2.0]}).to_csv(source, index=False)
+    os.utime(source, ns=(1, 1))
+    assert load_profile(source) is None and profile_status(source)["state"] != "ready"
+    assert get_profile(source)["row_count"] == 2
+
+
+def test_profile_routes(client, source):
+    name = os.path.basename(source)
+    assert client.post('/api/profile', json={"filename": name}).get_json()["data"]["row_count"] == 100
+    status = client.post('/api/profile/status', json={"filename": name}).get_json()["data"]
+    assert status == {"state": "ready", "filename": name}
+    assert client.post('/api/profile', json={"filename": "missing.csv"}).status_code == 400
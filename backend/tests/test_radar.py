@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+import services.service_visualize as visualize
+
+
+@pytest.fixture
+def table(dataset):
+    return dataset(pd.DataFrame({"学号": [1, 2, 3, 2], "name": ["a", "b", "c", "b2"],
+                                 "math": [90.0, 60.0, None, 10.0], "eng": [70.0, 80.0, 50.0, 20.0]}))
+
+
+def test_single_radar(client, table):
+    body = client.post('/api/visualize/radar', json={"filename": table, "id_col": "name", "target_val": "a"}).get_json()
+    assert body["status"] == "success"
+    assert [i["name"] for i in body["data"]["indicators"]] == ["math", "eng"]
+    assert body["data"]["target_data"] == [90.0, 70.0]
+
+
+def test_batch_uses_first_duplicate_and_reports_missing(client, table):
+    body = client.post('/api/visualize/radar/batch',
+                       json={"filename": table, "id_col": "学号", "target_vals": [2, "3", 9]}).get_json()
+    data = body["data"]
+    assert [p["target_name"] for p in data["profiles"]] == ["2", "3"]
+    # 重复 id 取首行；缺失值坐标按 0 绘制
+    assert data["profiles"][0]["target_data"] == [60.0, 80.0] and data["profiles"][1]["target_data"] == [0.0, 50.0]
+    assert data["missing"] == ["9"]
+
+
+def test_profiles_read_only_radar_columns(client, table, monkeypatch):
+    calls = []
+    original = visualize.read_df
+
+    def spy(filepath, usecols=None, dtype=None):
+        calls.append(usecols)
+        return original(filepath, usecols=usecols, dtype=dtype)
+
+    monkeypatch.setattr(visualize, 'read_df', spy)
+    client.post('/api/visualize/radar/batch', json={"filename": table, "id_col": "name", "target_vals": ["a"]})
+    assert calls[-1] == ["math", "eng"]
+
+
+def test_unknown_id_column(client, table):
+    res = client.post('/api/visualize/radar', json={"filename": table, "id_col": "nope", "target_val": "a"})
+    assert res.status_code == 400
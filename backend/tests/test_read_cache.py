@@ -0,0 +1,74 @@
+import os
+import pandas as pd
+import pytest
+import utils
+from utils import read_df, read_columns, invalidate_df_cache, get_df_cache_stats, cache_path, sidecar_path
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "d.csv")
+    pd.DataFrame({"a": [1, 2, 3], "b": [1.5, 2.5, 3.5], "s": ["x", "y", "z"]}).to_csv(path, index=False)
+    yield path
+    invalidate_df_cache(path)
+
+
+def _rewrite(path, df):
+    # 同一秒内的覆写同样改变 mtime_ns / 大小，这里显式推进 mtime 以免依赖文件系统时间精度
+    st = os.stat(path)
+    df.to_csv(path, index=False)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_second_read_hits_cache_and_projects(source):
+    read_df(source)
+    hits = get_df_cache_stats()["hits"]
+    df = read_df(source, usecols=["s", "a", "missing"])
+    assert df.columns.tolist() == ["s", "a"]
+    assert get_df_cache_stats()["hits"] == hits + 1
+    assert read_columns(source) == ["a", "b", "s"]
+
+
+def test_returned_frame_is_isolated_from_cache(source):
+    df = read_df(source)
+    df.loc[0, "a"] = 100
+    df["new"] = 1
+    again = read_df(source)
+    assert again.loc[0, "a"] == 1 and "new" not in again.columns
+
+
+def test_overwrite_changes_signature(source):
+    assert read_df(source)["a"].tolist() == [1, 2, 3]
+    _rewrite(source, pd.DataFrame({"a": [7, 8], "b": [0.1, 0.2], "s": ["p", "q"]}))
+    assert read_df(source)["a"].tolist() == [7, 8]
+    # 旧版本帧已被替换，不会残留在缓存中
+    path = os.path.abspath(source)
+    assert sum(1 for k in utils._df_cache if k[0] == path) == 1
+
+
+def test_dtype_hint_is_applied(source):
+    df = read_df(source, usecols=["a"], dtype={"a": "float64"})
+    assert df["a"].dtype == "float64"
+    assert read_df(source)["a"].dtype == "int64"
+
+
+@pytest.mark.skipif(not utils.HAS_ARROW, reason="列式副本依赖 pyarrow")
+def test_invalidate_drops_frames_and_sidecars_but_keeps_lock(source):
+    read_df(source)
+    assert os.path.exists(sidecar_path(source))
+    with utils.FileLock(cache_path(source, '.lock')):
+        pass
+    invalidate_df_cache(source)
+    path = os.path.abspath(source)
+    assert not any(k[0] == path for k in utils._df_cache)
+    assert not os.path.exists(sidecar_path(source))
+    assert os.path.exists(cache_path(source, '.lock'))
+
+
+@pytest.mark.skipif(not utils.HAS_ARROW, reason="列式副本依赖 pyarrow")
+def test_stale_sidecar_is_ignored(source):
+    read_df(source)
+    invalidate_df_cache()
+    _rewrite(source, pd.DataFrame({"a": [5], "b": [0.5], "s": ["w"]}))
+    # 副本记录的源文件指纹已过期，须重新解析源文件
+    assert read_df(source)["a"].tolist() == [5]
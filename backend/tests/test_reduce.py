@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from services.service_reduce import (clamp_budget, grid_density, lttb_indices, random_indices, reduce_scatter,
+                                     stratified_indices)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.normal(0, 1, 5000), [40.0]])
+    y = np.concatenate([rng.normal(0, 1, 5000), [-40.0]])
+    return x, y
+
+
+def test_clamp_budget():
+    assert clamp_budget(None, 100, 500) == 100
+    assert clamp_budget("abc", 100, 500) == 100
+    assert clamp_budget(10_000, 100, 500) == 500
+    assert clamp_budget(0, 100, 500) == 2
+
+
+def test_random_indices_sorted_and_unique():
+    idx = random_indices(1000, 50)
+    assert len(idx) == 50 and len(np.unique(idx)) == 50 and (np.diff(idx) > 0).all()
+    assert random_indices(10, 50).tolist() == list(range(10))
+
+
+def test_stratified_fills_budget_and_keeps_outlier(points):
+    x, y = points
+    idx = stratified_indices(x, y, 400, 20)
+    assert len(idx) == 400 and len(np.unique(idx)) == 400
+    # 稀疏区域的离群点独占一个网格单元，必然入选
+    assert len(x) - 1 in idx
+
+
+def test_grid_density_counts_every_point(points):
+    x, y = points
+    cx, cy, counts = grid_density(x, y, 10)
+    assert counts.sum() == len(x) and len(cx) == len(cy) == len(counts) <= 100
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    values = np.zeros(1000)
+    values[437] = 10.0
+    idx = lttb_indices(values, 20)
+    assert len(idx) == 20 and idx[0] == 0 and idx[-1] == 999 and 437 in idx
+    assert (np.diff(idx) > 0).all()
+    # 二维输入：多条序列共用同一组横坐标
+    both = lttb_indices(np.column_stack([values, -values]), 20)
+    assert 437 in both
+
+
+def test_reduce_scatter_auto_modes(points):
+    x, y = points
+    frame = pd.DataFrame({"x": x, "y": y})
+    same, info = reduce_scatter(frame, 10_000)
+    assert info["method"] == "none" and len(same) == len(frame)
+    sampled, info = reduce_scatter(frame, 300)
+    assert info["method"] == "stratified" and len(sampled) == info["returned_points"] == 300
+    dense, info = reduce_scatter(frame, 300, density_threshold=1000)
+    assert info["method"] == "density" and list(dense.columns) == ["x", "y", "count"]
+    assert dense["count"].sum() == len(frame)
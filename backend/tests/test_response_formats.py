@@ -0,0 +1,55 @@
+import gzip
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import utils
+from utils import ARROW_STREAM_MIMETYPE
+
+if utils.HAS_ARROW:
+    import pyarrow as pa
+
+
+@pytest.fixture
+def table(dataset):
+    return dataset(pd.DataFrame({"id": [1, 2, 3], "score": [1.5, np.nan, 3.0], "name": ["a", "b", None]}))
+
+
+def _get_full(client, name, **kwargs):
+    return client.post('/api/data/get_full', json={"filename": name, **kwargs.pop("body", {})}, **kwargs)
+
+
+def test_records_and_columnar_agree(client, table):
+    records = _get_full(client, table).get_json()
+    columnar = _get_full(client, table, body={"format": "columnar"}).get_json()
+    assert columnar["format"] == "columnar" and columnar["headers"] == records["headers"]
+    rows = [dict(zip(columnar["headers"], values)) for values in zip(*columnar["arrays"])]
+    assert rows == records["rows"]
+    assert records["rows"][1]["score"] == "" and columnar["version"] == records["version"]
+
+
+@pytest.mark.skipif(not utils.HAS_ARROW, reason="Arrow IPC 依赖 pyarrow")
+@pytest.mark.parametrize("kwargs", [{"body": {"format": "arrow"}}, {"headers": {"Accept": ARROW_STREAM_MIMETYPE}}])
+def test_arrow_stream_keeps_types_and_meta(client, table, kwargs):
+    resp = _get_full(client, table, **kwargs)
+    assert resp.mimetype == ARROW_STREAM_MIMETYPE
+    result = pa.ipc.open_stream(resp.get_data()).read_all()
+    # 缺失值以 Arrow null 原生下发，数值列保持原类型
+    assert result.schema.field("id").type == pa.int64() and result.schema.field("score").type == pa.float64()
+    assert result.column("score").null_count == 1
+    assert result.column("name").null_count == 1
+    assert "version" in json.loads(result.schema.metadata[b"meta"])
+
+
+def test_large_json_is_gzipped(client, table, monkeypatch):
+    monkeypatch.setattr(utils, 'COMPRESS_MIN_BYTES', 10)
+    monkeypatch.setattr(utils, 'HAS_BROTLI', False)
+    resp = _get_full(client, table, headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in resp.headers["Vary"]
+    assert json.loads(gzip.decompress(resp.get_data()))["headers"] == ["id", "score", "name"]
+    # 未声明支持压缩的客户端收到原文
+    assert "Content-Encoding" not in _get_full(client, table).headers
+
+
+def test_small_json_is_not_compressed(client, table):
+    assert "Content-Encoding" not in _get_full(client, table, headers={"Accept-Encoding": "gzip"}).headers
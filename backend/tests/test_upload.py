@@ -0,0 +1,68 @@
+import os
+import time
+import pytest
+import services.service_upload as service_upload
+from utils import read_state, write_state
+
+CSV = "id,score,group\n" + "".join(f"{i},{i * 1.5},{'ab'[i % 2]}\n" for i in range(200))
+
+
+def _init(client, size=len(CSV.encode())):
+    resp = client.post('/api/upload/init', json={"filename": "data.csv", "size": size})
+    assert resp.status_code == 200
+    return resp.get_json()["data"]["upload_id"]
+
+
+def _status(client, upload_id):
+    return client.get(f'/api/upload/status/{upload_id}')
+
+
+def test_chunked_upload_resumes_and_ingests(client):
+    body = CSV.encode()
+    upload_id = _init(client)
+    first = client.put(f'/api/upload/chunk/{upload_id}?offset=0', data=body[:1000]).get_json()["data"]
+    assert first["received"] == 1000
+    assert first["schema"]["columns"] == ["id", "score", "group"] and first["schema"]["approximate"]
+
+    # 断点不一致时返回正确断点，客户端据此续传
+    resp = client.put(f'/api/upload/chunk/{upload_id}?offset=0', data=body[1000:])
+    assert resp.status_code == 409 and resp.get_json()["received"] == 1000
+    assert client.post(f'/api/upload/complete/{upload_id}').status_code == 409
+
+    client.put(f'/api/upload/chunk/{upload_id}?offset=1000', data=body[1000:])
+    assert client.post(f'/api/upload/complete/{upload_id}').status_code == 202
+    deadline = time.time() + 30
+    while (info := _status(client, upload_id).get_json()["data"])["state"] == "ingesting" and time.time() < deadline:
+        time.sleep(0.05)
+    assert info["state"] == "ready" and info["data"]["row_count"] == 200
+    assert info["data"]["binary_columns"] == ["group"]
+    with open(os.path.join('uploads', info["filename"]), 'rb') as f:
+        assert f.read() == body
+
+
+def test_unknown_session(client):
+    assert _status(client, 'missing').status_code == 404
+    assert client.put('/api/upload/chunk/missing?offset=0', data=b'x').status_code == 404
+
+
+def _age(upload_id, state, seconds):
+    path = service_upload._session_path(upload_id)
+    session = read_state(path)
+    write_state(path, dict(session, state=state, updated=time.time() - seconds))
+
+
+@pytest.mark.parametrize("state, age, purged", [
+    ("receiving", 2 * 24 * 3600, True),
+    ("receiving", 60, False),
+    ("ingesting", 2 * 3600, True),    # 入库线程随进程崩溃遗留的会话
+    ("ingesting", 60, False),
+])
+def test_purge_expired_sessions(client, monkeypatch, state, age, purged):
+    monkeypatch.setattr(service_upload, 'UPLOAD_SESSION_TTL_SECONDS', 24 * 3600)
+    monkeypatch.setattr(service_upload, 'UPLOAD_INGEST_TIMEOUT_SECONDS', 3600)
+    upload_id = _init(client)
+    part = service_upload._part_path(upload_id)
+    _age(upload_id, state, age)
+    service_upload._purge_expired()
+    assert (_status(client, upload_id).status_code == 404) == purged
+    assert os.path.exists(part) != purged
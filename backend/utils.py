@@ -1,24 +1,749 @@
 # utils.py
+import codecs
+import glob
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
+from flask import request, Response
+from metrics import phase
+from config import (UPLOAD_FOLDER, DF_CACHE_MAX_BYTES, CACHE_DIRNAME, STREAM_CHUNK_ROWS, DERIVED_CACHE_ENTRIES,
+                    DERIVED_CACHE_MAX_BYTES, COMPRESS_MIN_BYTES)
+
+# 【可选依赖：Arrow 列式引擎】
+# 未安装 pyarrow 时静默降级为原始文件解析，不影响系统可用性
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pa_parquet
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# 【可选依赖：POSIX 文件锁】多进程部署时用于跨工作进程互斥
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 【可选依赖：brotli 压缩】
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# 【内存安全：写时复制 (Copy-on-Write) 探测】
+# pandas >= 3.0 默认启用 CoW；2.x 版本显式开启；更老版本无 CoW 语义，只能退化为深拷贝保护缓存
+_PANDAS_MAJOR = int(pd.__version__.split('.')[0])
+if _PANDAS_MAJOR == 2:
+    pd.set_option('mode.copy_on_write', True)
+_COW_ENABLED = _PANDAS_MAJOR >= 2
+
+# 【性能优化：进程级解析结果 LRU 缓存】
+# 以 (绝对路径, mtime, 文件大小, 投影列) 作为缓存键，同一文件在仪表盘会话内只解析一次
+_df_cache = OrderedDict()
+_df_cache_bytes = 0
+_df_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "derived_evictions": 0}
+_df_cache_lock = threading.Lock()
+# 无法固化列式副本的文件版本 (如混合类型列)，后续投影读取直接下推至原始解析器
+_sidecar_rejected = set()
+
+# 【性能优化：派生结果缓存】
+# 统计核、索引等由数据推导出的中间结果同样按文件版本指纹缓存，多个接口共享同一份计算；
+# 条目以 (结果, 估算字节数) 存放，与解析缓存一样按字节预算做 LRU 淘汰
+_derived_cache = OrderedDict()
+_derived_cache_bytes = 0
+
+
+def file_signature(filepath):
+    """
+    提取文件版本指纹 (绝对路径, mtime, 文件大小, 变更日志大小)，
+    文件被覆写或追加增量补丁后指纹变化，会自然令旧缓存失效
+    """
+    st = os.stat(filepath)
+    try:
+        log_size = os.stat(changelog_path(filepath)).st_size
+    except FileNotFoundError:
+        log_size = 0
+    return os.path.abspath(filepath), st.st_mtime_ns, st.st_size, log_size
+
+
+def version_stamp(sig):
+    """将版本指纹编码为不透明的版本号字符串 (用于副本校验与乐观并发控制)"""
+    return ":".join(str(v) for v in sig[1:])
+
+
+def _cow_view(df):
+    """下发缓存帧的写时复制视图，调用方的任何修改都不会污染缓存中的原始数据"""
+    return df.copy(deep=not _COW_ENABLED)
+
+
+def _project(df, usecols):
+    """按请求声明的列做投影，自动忽略不存在的列名并保持请求顺序"""
+    if usecols is None:
+        return df
+    return df[[c for c in dict.fromkeys(usecols) if c in df.columns]]
+
+
+def cache_path(filepath, suffix):
+    """推导源文件的派生缓存物理路径 (同目录下的隐藏 .cache 子目录，以源文件名 + 后缀命名)"""
+    folder, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(folder, CACHE_DIRNAME, name + suffix)
 
 
-def read_df(filepath):
+def state_path(namespace, key):
+    """
+    跨进程共享状态文件路径 (uploads/.cache/state/<命名空间>/<键>.json)。
+    多进程 WSGI 部署下，任务进度、上传会话等状态落盘后任意工作进程均可读取。
+    """
+    return os.path.join(UPLOAD_FOLDER, CACHE_DIRNAME, 'state', namespace, f"{key}.json")
+
+
+def write_state(path, state):
+    """原子写入状态文件：先写临时文件再整体替换，读取端不会看到半截 JSON"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+
+def read_state(path):
+    """读取状态文件，不存在或损坏时返回 None"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class FileLock:
+    """
+    进程内线程锁 + 跨进程文件锁 (POSIX flock)。
+    Windows 下 waitress 为单进程多线程模型，仅线程锁即可保证互斥。
+    """
+    _thread_locks = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        with FileLock._guard:
+            self._lock = FileLock._thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+
+def sidecar_path(filepath):
+    """推导源文件对应的列式旁路副本路径"""
+    return cache_path(filepath, '.feather')
+
+
+def changelog_path(filepath):
+    """推导源文件对应的追加式变更日志路径 (每行一批 JSON 补丁操作)"""
+    return cache_path(filepath, '.changes.jsonl')
+
+
+def write_sidecar(filepath, df, sig=None):
+    """
+    【数据入库：列式旁路副本固化】
+    将首次解析成功的数据帧转存为带类型的 Feather 文件，并在 schema 元数据中记录源文件指纹。
+    含混合类型列、非字符串表头等 Arrow 无法无损表达的数据将直接跳过，后续仍走原始解析。
+
+    :return: bool 是否写入成功
+    """
+    if not HAS_ARROW or not all(isinstance(c, str) for c in df.columns) or df.columns.has_duplicates:
+        return False
+    sig = sig or file_signature(filepath)
+    target = sidecar_path(filepath)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[b'source_signature'] = version_stamp(sig).encode()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 不压缩存储，以便读取端通过内存映射 (mmap) 零拷贝按列加载
+        feather.write_feather(table.replace_schema_metadata(meta), tmp, compression='uncompressed')
+        os.replace(tmp, target)
+        return True
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def _read_sidecar(filepath, sig, usecols=None):
+    """读取与源文件指纹一致的列式副本，仅加载被请求的列；副本缺失或过期时返回 None"""
+    if not HAS_ARROW:
+        return None
+    path = sidecar_path(filepath)
+    if not os.path.exists(path):
+        return None
+    try:
+        schema = feather.read_table(path, columns=[], memory_map=True).schema
+        if (schema.metadata or {}).get(b'source_signature') != version_stamp(sig).encode():
+            return None
+        columns = None if usecols is None else [c for c in dict.fromkeys(usecols) if c in schema.names]
+        return _project(feather.read_table(path, columns=columns, memory_map=True).to_pandas(), columns)
+    except Exception:
+        return None
+
+
+def _apply_dtype(df, dtype):
+    """宽容式类型收敛：逐列尝试转换为提示类型，无法转换的列保留原始推断类型"""
+    if not dtype:
+        return df
+    for col, t in dtype.items():
+        if col in df.columns and df[col].dtype != t:
+            try:
+                df[col] = df[col].astype(t)
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def _parse_file(filepath, usecols=None, dtype=None):
+    ext = filepath.rsplit('.', 1)[1].lower()
+    # 以可调用对象形式下推列投影，请求中不存在的列名不会触发解析异常
+    kwargs = {}
+    if usecols is not None:
+        wanted = set(usecols)
+        kwargs['usecols'] = lambda c: c in wanted
+    if dtype:
+        kwargs['dtype'] = {c: t for c, t in dtype.items() if usecols is None or c in wanted}
+
+    if ext == 'csv':
+        # 先嗅探编码再解析，整表只解析一次；优先使用多线程的 Arrow CSV 引擎，失败时回退至 C 引擎
+        encoding = csv_encoding(filepath)
+        started = time.perf_counter()
+        df, engine = None, 'c'
+        if HAS_ARROW:
+            try:
+                df, engine = _read_csv_arrow(filepath, encoding, usecols, kwargs.get('dtype')), 'pyarrow'
+            except Exception:
+                df = None
+        if df is None:
+            # round_trip 与 Arrow 引擎同为精确解析，两条路径得到的浮点数逐位一致
+            kwargs.update(encoding=encoding, float_precision='round_trip')
+            df = _read_with_dtype_fallback(pd.read_csv, filepath, kwargs)
+        put_derived(filepath, ('parse_info',), {"encoding": encoding, "engine": engine,
+                                                "parse_seconds": round(time.perf_counter() - started, 4)})
+        return df
+    elif ext == 'parquet':
+        # 清洗管线可输出 Parquet，其本身即为列式格式，直接读取即可
+        return _apply_dtype(_project(pd.read_parquet(filepath), usecols), dtype)
+    else:
+        # 根据 Excel 文件的后缀版本，智能路由至底层的开放解析引擎 (openpyxl / xlrd)
+        kwargs['engine'] = 'openpyxl' if ext == 'xlsx' else 'xlrd'
+        return _read_with_dtype_fallback(pd.read_excel, filepath, kwargs)
+
+
+def _read_csv_arrow(filepath, encoding, usecols=None, dtype=None):
+    """
+    Arrow 多线程 CSV 解析。Arrow 会把形如日期/时间的文本推断为时间类型，而 C 引擎保留原文，
+    因此先以首个数据块探测 schema，把时间类列显式指定为字符串，保证两种引擎的结果口径一致。
+    """
+    with pa_csv.open_csv(filepath, read_options=pa_csv.ReadOptions(encoding=encoding)) as reader:
+        schema = reader.schema
+    if len(set(schema.names)) != len(schema.names):
+        # 重名列的去重改名规则由 C 引擎负责
+        raise ValueError("duplicate column names")
+    types = {f.name: str for f in schema if pa.types.is_temporal(f.type)}
+    types.update(dtype or {})
+    kwargs = {'engine': 'pyarrow', 'encoding': encoding, 'dtype': types or None}
+    if usecols is not None:
+        wanted = set(usecols)
+        kwargs['usecols'] = [c for c in schema.names if c in wanted]
+        kwargs['dtype'] = {c: t for c, t in types.items() if c in wanted} or None
+    return pd.read_csv(filepath, **kwargs)
+
+
+def get_parse_info(filepath):
+    """查询当前文件版本最近一次原始解析的编码、引擎与耗时；尚未解析或命中列式副本时返回 None"""
+    return get_derived(filepath, ('parse_info',))
+
+
+def _read_with_dtype_fallback(reader, filepath, kwargs):
+    """类型提示直达解析器以省去类型推断；若提示与真实数据冲突，则退回自动推断后再宽容转换"""
+    try:
+        return reader(filepath, **kwargs)
+    except UnicodeDecodeError:
+        raise
+    except (ValueError, TypeError):
+        if not kwargs.get('dtype'):
+            raise
+        fallback = {k: v for k, v in kwargs.items() if k != 'dtype'}
+        return _apply_dtype(reader(filepath, **fallback), kwargs['dtype'])
+
+
+def _cache_put(key, df):
+    global _df_cache_bytes
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    with _df_cache_lock:
+        # 同一路径的旧版本帧已不可能再被命中，先行剔除
+        for old in [k for k in _df_cache if k[0] == key[0] and k[1:4] != key[1:4]]:
+            _df_cache_bytes -= _df_cache.pop(old)[1]
+        # 单帧超出总预算时不入缓存，避免把其余热点数据全部挤出
+        if size <= DF_CACHE_MAX_BYTES and key not in _df_cache:
+            _df_cache[key] = (df, size)
+            _df_cache_bytes += size
+            while _df_cache_bytes > DF_CACHE_MAX_BYTES:
+                _, (_, evicted_size) = _df_cache.popitem(last=False)
+                _df_cache_bytes -= evicted_size
+                _df_cache_stats["evictions"] += 1
+
+
+@phase('parse')
+def read_df(filepath, usecols=None, dtype=None):
     """
     【核心工具库：高容错数据读取引擎】
-    针对复杂环境下的多编码格式文件提供自动降级解析策略。
+    针对复杂环境下的多编码格式文件提供自动降级解析策略，并经由进程级 LRU 缓存复用解析结果。
+    首次解析后自动固化列式旁路副本，此后优先按列从副本加载，彻底绕开 Excel/CSV 的重复解析；
+    副本不可用时，列投影与类型提示将直接下推至底层解析器，只解析请求涉及的列。
 
     :param filepath: 目标文件的绝对物理路径
-    :return: pandas.DataFrame 数据框实例
+    :param usecols: 仅加载的列名清单 (列投影)，不存在的列名将被忽略；为 None 时加载全部列
+    :param dtype: 列类型提示字典 {列名: 类型}，无法转换的列保留自动推断类型
+    :return: pandas.DataFrame 数据框实例 (缓存帧的写时复制视图，可放心就地修改)
     """
-    ext = filepath.rsplit('.', 1)[1].lower()
+    sig = file_signature(filepath)
+    full_key = sig + (None, None)
+    dtype_key = tuple(sorted((str(c), str(t)) for c, t in dtype.items())) if dtype else None
+    key = sig + (None if usecols is None else tuple(dict.fromkeys(usecols)), dtype_key)
+
+    with _df_cache_lock:
+        # 全量帧命中时可直接投影出任意列组合
+        for k in dict.fromkeys((key, full_key)):
+            entry = _df_cache.get(k)
+            if entry is not None:
+                _df_cache.move_to_end(k)
+                _df_cache_stats["hits"] += 1
+                return _apply_dtype(_cow_view(_project(entry[0], usecols)), dtype)
+        _df_cache_stats["misses"] += 1
+
+    df = _read_sidecar(filepath, sig, usecols)
+    if df is not None:
+        df = _apply_dtype(df, dtype)
+    elif usecols is None or sig[3] or (HAS_ARROW and sig not in _sidecar_rejected):
+        # 首次接触该文件版本：全量解析一次 (回放尚未压实的增量补丁) 并固化列式副本，为后续所有列投影请求铺路
+        df = replay_changelog(filepath, _parse_file(filepath))
+        if not write_sidecar(filepath, df, sig):
+            _sidecar_rejected.add(sig)
+        _cache_put(full_key, df)
+        return _apply_dtype(_cow_view(_project(df, usecols)), dtype)
+    else:
+        df = _project(_parse_file(filepath, usecols, dtype), usecols)
+
+    _cache_put(key, df)
+    return _cow_view(df)
 
+
+@phase('parse')
+def read_columns(filepath):
+    """
+    【轻量探针：仅读取表头】
+    优先从列式副本的 schema 获取列名，否则仅解析首行，不加载任何数据行。
+    """
+    sig = file_signature(filepath)
+    with _df_cache_lock:
+        entry = _df_cache.get(sig + (None, None))
+        if entry is not None:
+            return entry[0].columns.tolist()
+    if HAS_ARROW and os.path.exists(sidecar_path(filepath)):
+        try:
+            schema = feather.read_table(sidecar_path(filepath), columns=[], memory_map=True).schema
+            if (schema.metadata or {}).get(b'source_signature') == version_stamp(sig).encode():
+                return list(schema.names)
+        except Exception:
+            pass
+    ext = filepath.rsplit('.', 1)[1].lower()
     if ext == 'csv':
+        return pd.read_csv(filepath, nrows=0, encoding=csv_encoding(filepath)).columns.tolist()
+    if ext == 'parquet':
+        return list(pa_parquet.read_schema(filepath).names)
+    return pd.read_excel(filepath, nrows=0, engine='openpyxl' if ext == 'xlsx' else 'xlrd').columns.tolist()
+
+
+# 字节序标记 (BOM) 与对应编码，UTF-32 须先于 UTF-16 判断 (二者 BOM 前缀重叠)
+_BOMS = [(codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'),
+         (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')]
+
+
+def sniff_encoding(sample, final=True):
+    """
+    【编码嗅探：基于字节样本】
+    依次判定 BOM、UTF-8 合法性，否则按 GB18030 (GBK 的超集) 处理。
+
+    :param sample: 文件开头的字节样本
+    :param final: 样本是否为完整文件；为 False 时容忍末尾被截断的多字节字符
+    :return: 可直接传给解析器的编码名
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=final)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def csv_encoding(filepath, block_size=1 << 20):
+    """
+    确定 CSV 编码：首块嗅探 BOM，随后逐块增量校验 UTF-8 合法性 (仅做字节解码，不做表格解析)，
+    遇到首个非法字节即判定为 GB18030。结果按文件版本缓存，
+    解析器因此无需 "先按 UTF-8 解析、失败后整表重解析" 的试错流程。
+    """
+    cached = get_derived(filepath, ('encoding',))
+    if cached is not None:
+        return cached
+    with open(filepath, 'rb') as f:
+        head = f.read(block_size)
+        encoding = sniff_encoding(head, final=False)
+        if encoding == 'utf-8':
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            try:
+                decoder.decode(head)
+                for block in iter(lambda: f.read(block_size), b''):
+                    decoder.decode(block)
+                decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                encoding = 'gb18030'
+    put_derived(filepath, ('encoding',), encoding)
+    return encoding
+
+
+def iter_csv_chunks(filepath, usecols=None, dtype=None, chunksize=STREAM_CHUNK_ROWS, text_columns=None,
+                    raw_text=False):
+    """
+    【流式读取引擎：分块迭代 CSV】
+    以固定行数逐块产出 DataFrame，内存峰值仅与块大小相关，适用于超出工作进程内存的大文件。
+
+    :param text_columns: 按原始文本读取的列，避免各数据块独立推断出不一致的类型
+    :param raw_text: 为真时全部列按原始文本读取且不识别缺失值 (空单元格为空串)，写回时逐字节保持原样
+    """
+    # 分块读取只面向磁盘上的源文件，先把未压实的增量补丁合并回去；
+    # 压实会改写源文件，须与 /api/data/patch 持有同一把文件锁，避免并发补丁在改写期间丢失
+    if os.path.exists(changelog_path(filepath)):
+        with FileLock(cache_path(filepath, '.lock')):
+            compact_changelog(filepath)
+    # 与整表解析 (Arrow 引擎) 一样精确解析浮点数，流式与整表两条路径的计算结果逐位一致
+    kwargs = {'encoding': csv_encoding(filepath), 'chunksize': chunksize, 'float_precision': 'round_trip'}
+    if usecols is not None:
+        wanted = set(usecols)
+        kwargs['usecols'] = lambda c: c in wanted
+    if raw_text:
+        kwargs.update(dtype=str, keep_default_na=False)
+    elif text_columns:
+        kwargs['dtype'] = dict.fromkeys(text_columns, str)
+    with pd.read_csv(filepath, **kwargs) as reader:
+        for chunk in reader:
+            yield _apply_dtype(chunk, dtype)
+
+
+def get_derived(filepath, key, builder=None):
+    """
+    读取按文件版本缓存的派生结果；未命中且提供 builder 时即时构建并写入缓存。
+
+    :param key: 派生结果的可哈希标识，例如 ('colstats', 列名)
+    :param builder: 无参构建函数；为 None 时未命中直接返回 None
+    """
+    full_key = file_signature(filepath) + (key,)
+    with _df_cache_lock:
+        if full_key in _derived_cache:
+            _derived_cache.move_to_end(full_key)
+            return _derived_cache[full_key][0]
+    if builder is None:
+        return None
+    value = builder()
+    put_derived(filepath, key, value)
+    return value
+
+
+def estimate_bytes(value):
+    """估算派生结果的内存占用 (字节)：数组按缓冲区大小、pandas 对象按深度统计，容器逐元素累加"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(sys.getsizeof(v) for v in value.ravel())
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def put_derived(filepath, key, value):
+    """写入派生结果缓存，超出条目上限或字节预算时淘汰最久未使用的结果 (单条超出预算时不入缓存)"""
+    global _derived_cache_bytes
+    full_key = file_signature(filepath) + (key,)
+    size = estimate_bytes(value)
+    with _df_cache_lock:
+        for old in [k for k in _derived_cache if k[0] == full_key[0] and k[1:4] != full_key[1:4]]:
+            _derived_cache_bytes -= _derived_cache.pop(old)[1]
+        if full_key in _derived_cache:
+            _derived_cache_bytes -= _derived_cache.pop(full_key)[1]
+        if size > DERIVED_CACHE_MAX_BYTES:
+            return
+        _derived_cache[full_key] = (value, size)
+        _derived_cache_bytes += size
+        while len(_derived_cache) > DERIVED_CACHE_ENTRIES or _derived_cache_bytes > DERIVED_CACHE_MAX_BYTES:
+            _, (_, evicted_size) = _derived_cache.popitem(last=False)
+            _derived_cache_bytes -= evicted_size
+            _df_cache_stats["derived_evictions"] += 1
+
+
+def prime_df_cache(filepath, df):
+    """
+    以调用方已持有的最新数据帧直接预热缓存 (如增量补丁应用后)，
+    后续读取无需重新解析文件；同时刷新列式副本。
+    """
+    sig = file_signature(filepath)
+    write_sidecar(filepath, df, sig)
+    _cache_put(sig + (None, None), df)
+
+
+# ==========================================
+# 增量补丁：单元格 / 插入行 / 删除行 操作与追加式变更日志
+# ==========================================
+def _coerce_value(df, col, value):
+    """按目标列类型收敛补丁值：空串视为缺失值 (返回 None)，数值列优先按数值解析，无法解析时保留原值"""
+    if value == "" or value is None:
+        return None
+    if pd.api.types.is_numeric_dtype(df[col]):
+        converted = pd.to_numeric(pd.Series([value]), errors='coerce').iloc[0]
+        return value if pd.isna(converted) else converted
+    return value
+
+
+def _cell_series(column, value):
+    """构造单元素列用于插入行：缺失值按列类型给出对应的空值 (数值列为 NaN，整数列与重新解析 CSV 一样升格为浮点)"""
+    if value is not None:
+        return pd.Series([value])
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return pd.Series([None], dtype='float64')
+    if pd.api.types.is_string_dtype(column):
+        return pd.Series([None], dtype=column.dtype)
+    return pd.Series([None], dtype=object)
+
+
+def _set_cell(df, row, col, value):
+    """写入单个单元格：空串视为缺失值，数值列优先按数值写入，类型冲突时整列升格为 object"""
+    value = _coerce_value(df, col, value)
+    try:
+        df.iloc[row, df.columns.get_loc(col)] = value if value is not None else pd.NA
+    except (TypeError, ValueError):
+        df[col] = df[col].astype(object)
+        df.iloc[row, df.columns.get_loc(col)] = value
+
+
+def apply_patch_ops(df, ops):
+    """
+    按顺序将补丁操作应用到数据帧 (行号均为应用该操作时的位置序号)：
+      {"op": "set", "row": i, "column": c, "value": v}
+      {"op": "insert", "row": i 或 None (追加到末尾), "values": {列名: 值}}
+      {"op": "delete", "row": i}
+    任何一条操作非法都会抛出 ValueError，调用方应在持久化前完成校验。
+    """
+    df = df.copy()
+    for op in ops:
+        kind, row = op.get('op'), op.get('row')
+        if kind == 'set':
+            if op.get('column') not in df.columns:
+                raise ValueError(f"补丁列不存在: {op.get('column')}")
+            if not isinstance(row, int) or not 0 <= row < len(df):
+                raise ValueError(f"补丁行号越界: {row}")
+            _set_cell(df, row, op['column'], op.get('value'))
+        elif kind == 'insert':
+            row = len(df) if row is None else row
+            if not isinstance(row, int) or not 0 <= row <= len(df):
+                raise ValueError(f"插入位置越界: {row}")
+            # 与 set 操作一致地逐列收敛类型，避免数值列因插入原始字符串而整列退化为 object
+            values = {c: _coerce_value(df, c, v) for c, v in (op.get('values') or {}).items() if c in df.columns}
+            new_row = pd.DataFrame({c: _cell_series(df[c], values.get(c)) for c in df.columns})
+            df = pd.concat([df.iloc[:row], new_row, df.iloc[row:]], ignore_index=True)
+        elif kind == 'delete':
+            if not isinstance(row, int) or not 0 <= row < len(df):
+                raise ValueError(f"删除行号越界: {row}")
+            df = df.drop(index=df.index[row]).reset_index(drop=True)
+        else:
+            raise ValueError(f"不支持的补丁操作: {kind}")
+    return df
+
+
+def replay_changelog(filepath, df):
+    """在源文件解析结果之上按序回放尚未压实的变更日志"""
+    path = changelog_path(filepath)
+    if not os.path.exists(path):
+        return df
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                df = apply_patch_ops(df, json.loads(line))
+    return df
+
+
+def append_changelog(filepath, ops):
+    """追加一批补丁到变更日志，返回日志当前累计批次数"""
+    path = changelog_path(filepath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(ops, ensure_ascii=False) + "\n")
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+
+def compact_changelog(filepath, df=None):
+    """
+    【变更日志压实】：将已回放的最新数据整体写回源 CSV 并清空日志，
+    随后以该数据帧预热缓存，压实本身不会触发额外的重新解析。
+    """
+    path = changelog_path(filepath)
+    if not os.path.exists(path):
+        return
+    if df is None:
+        df = read_df(filepath)
+    tmp = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_csv(tmp, index=False, encoding='utf-8-sig')
+    os.replace(tmp, filepath)
+    os.remove(path)
+    prime_df_cache(filepath, df)
+
+
+def invalidate_df_cache(filepath=None):
+    """
+    【缓存一致性维护】
+    文件被保存、清洗覆写或整体回收后调用，主动释放对应的缓存帧。
+
+    :param filepath: 需失效的文件路径；为 None 时清空全部缓存
+    """
+    global _df_cache_bytes, _derived_cache_bytes
+    with _df_cache_lock:
+        if filepath is None:
+            _df_cache.clear()
+            _df_cache_bytes = 0
+            _sidecar_rejected.clear()
+            _derived_cache.clear()
+            _derived_cache_bytes = 0
+            return
+        path = os.path.abspath(filepath)
+        for key in [k for k in _df_cache if k[0] == path]:
+            _df_cache_bytes -= _df_cache.pop(key)[1]
+        for key in [k for k in _derived_cache if k[0] == path]:
+            _derived_cache_bytes -= _derived_cache.pop(key)[1]
+        _sidecar_rejected.difference_update([k for k in _sidecar_rejected if k[0] == path])
+    # 同步回收磁盘上的列式副本、数据画像等全部派生文件；
+    # 写锁文件除外：其他线程 / 进程可能正阻塞在该文件的 flock 上，删除后新来者会锁住另一个 inode
+    lock_file = cache_path(filepath, '.lock')
+    for path in glob.glob(glob.escape(cache_path(filepath, '')) + '.*'):
+        if path == lock_file:
+            continue
         try:
-            # 优先尝试国际标准的 UTF-8 编码进行解析
-            return pd.read_csv(filepath, encoding='utf-8')
-        except UnicodeDecodeError:
-            # 【容错降级机制】：若触发解码异常，自动回退至中文 Windows 环境常见的 GBK 编码进行二次解析
-            return pd.read_csv(filepath, encoding='gbk')
+            os.remove(path)
+        except (FileNotFoundError, IsADirectoryError):
+            pass
+
+
+def get_df_cache_stats():
+    """导出缓存命中 / 未命中 / 淘汰计数及当前内存占用，供运维探针查询"""
+    with _df_cache_lock:
+        return dict(_df_cache_stats, entries=len(_df_cache), bytes=_df_cache_bytes,
+                    max_bytes=DF_CACHE_MAX_BYTES, derived_entries=len(_derived_cache),
+                    derived_bytes=_derived_cache_bytes, derived_max_bytes=DERIVED_CACHE_MAX_BYTES)
+
+
+
+# ==========================================
+# 响应编码：列式 JSON / Arrow IPC 与传输压缩
+# ==========================================
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+def negotiate_format():
+    """
+    【内容协商】：解析客户端期望的表格编码格式。
+    优先读取 format 参数 (records / columnar / arrow)，其次识别 Accept 头中的 Arrow 流类型；
+    未安装 pyarrow 时 arrow 自动降级为 columnar。
+    """
+    fmt = request.args.get('format') or (request.get_json(silent=True) or {}).get('format')
+    if not fmt:
+        fmt = 'arrow' if ARROW_STREAM_MIMETYPE in request.accept_mimetypes.values() else 'records'
+    if fmt == 'arrow' and not HAS_ARROW:
+        fmt = 'columnar'
+    return fmt if fmt in ('records', 'columnar', 'arrow') else 'records'
+
+
+def column_arrays(df):
+    """列式 JSON：每列一个平行数组 (与列名清单一一对应)，列名不再随每一行重复"""
+    return [df[c].tolist() for c in df.columns]
+
+
+@phase('serialize')
+def arrow_response(df, meta=None):
+    """
+    Arrow IPC 流式响应：表格以二进制列式格式下发，其余元信息以 JSON 写入 schema 元数据 (键 meta)。
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # 混合类型列无法映射为单一 Arrow 类型，降级为文本
+        table = pa.Table.from_pandas(df.astype(str), preserve_index=False)
+    if meta:
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {},
+                                                   meta=json.dumps(meta, ensure_ascii=False, default=str)))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM_MIMETYPE)
+
+
+@phase('serialize')
+def compress_response(response):
+    """
+    【传输优化：大响应体压缩】
+    作为 after_request 钩子挂载，按 Accept-Encoding 对超过 COMPRESS_MIN_BYTES 的 JSON / Arrow 响应进行
+    brotli (已安装时) 或 gzip 压缩。
+    """
+    if (response.direct_passthrough or response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in ('application/json', ARROW_STREAM_MIMETYPE)):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if HAS_BROTLI and 'br' in accepted:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accepted:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
     else:
-        # 根据 Excel 文件的后缀版本，智能路由至底层的开放解析引擎 (openpyxl / xlrd)
-        return pd.read_excel(filepath, engine='openpyxl' if ext == 'xlsx' else 'xlrd')
\ No newline at end of file
+        return response
+    response.headers['Content-Length'] = str(len(response.get_data()))
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,89 @@
+# wsgi.py
+"""
+【生产部署入口：多进程 WSGI 服务】
+开发环境的 app.run(debug=True) 为单进程开发服务器，无法承载多位分析员并发访问。
+本入口优先使用 gunicorn (Linux/macOS，多进程 + 多线程)，未安装时回退至 waitress (跨平台，单进程多线程)。
+
+跨进程共享：解析结果以内存映射的 Feather 副本、数据画像与模型以文件形式落在 uploads/.cache/ 下，
+任务进度与分块上传会话同样以状态文件落盘，因此任意工作进程都能复用其他进程的计算结果。
+
+后台任务进程池：每个 Web 工作进程在首次提交任务时惰性创建自己的进程池 (spawn 子进程)。
+本模块导入时按 Web 工作进程数均分 JOB_WORKERS，使整机任务进程总数不超过 JOB_WORKERS，
+而不是 Web 工作进程数 × JOB_WORKERS。
+
+用法 (在 backend 目录下执行):
+    python wsgi.py                                        # 按 config.py 中的 SERVE_* 配置启动
+    SERVE_WORKERS=4 gunicorn -w 4 --threads 4 wsgi:app    # 或直接交给 gunicorn 命令行 (-w 须与 SERVE_WORKERS 一致)
+"""
+import os
+import logging
+from config import SERVE_HOST, SERVE_PORT, SERVE_WORKERS, SERVE_THREADS, SERVE_TIMEOUT, JOB_WORKERS
+from app import app
+from services.service_jobs import set_web_processes, pool_size
+
+logger = logging.getLogger(__name__)
+
+# 【可选依赖：WSGI 服务器】
+try:
+    from gunicorn.app.base import BaseApplication
+    HAS_GUNICORN = True
+except ImportError:
+    HAS_GUNICORN = False
+
+try:
+    import waitress
+    HAS_WAITRESS = True
+except ImportError:
+    HAS_WAITRESS = False
+
+
+# gunicorn 以 SERVE_WORKERS 个进程运行，waitress 为单进程；任务进程池按此均分整机预算
+set_web_processes(SERVE_WORKERS if HAS_GUNICORN else 1)
+
+
+if HAS_GUNICORN:
+    class GunicornServer(BaseApplication):
+        """以编程方式装载 gunicorn，配置项与命令行参数一一对应"""
+
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def serve():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+    bind = f"{SERVE_HOST}:{SERVE_PORT}"
+    processes = SERVE_WORKERS if HAS_GUNICORN else 1
+    if JOB_WORKERS < processes:
+        # 预算不足以均分时每个 Web 进程仍保留 1 个任务进程，总数超出预算
+        logger.warning("JOB_WORKERS=%d 小于 Web 工作进程数 %d，任务进程总数将达到 %d",
+                       JOB_WORKERS, processes, processes * pool_size())
+    logger.info("任务进程池: 每个 Web 进程 %d 个，合计至多 %d 个 (CPU 核数 %s)",
+                pool_size(), processes * pool_size(), os.cpu_count())
+    if HAS_GUNICORN:
+        logger.info("gunicorn %s workers=%d threads=%d", bind, SERVE_WORKERS, SERVE_THREADS)
+        GunicornServer(app, {
+            'bind': bind,
+            'workers': SERVE_WORKERS,
+            'threads': SERVE_THREADS,
+            'worker_class': 'gthread',
+            # 重计算接口 (清洗、训练) 耗时较长，放宽工作进程超时
+            'timeout': SERVE_TIMEOUT,
+        }).run()
+    elif HAS_WAITRESS:
+        logger.info("waitress %s threads=%d", bind, SERVE_THREADS * SERVE_WORKERS)
+        waitress.serve(app, host=SERVE_HOST, port=SERVE_PORT, threads=SERVE_THREADS * SERVE_WORKERS)
+    else:
+        raise SystemExit("未安装 gunicorn 或 waitress，请先执行 pip install gunicorn (Windows 下为 waitress)")
+
+
+if __name__ == '__main__':
+    serve()
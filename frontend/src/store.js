@@ -17,7 +17,7 @@ export const store = reactive({
     dialog: { show: false, title: '', message: '', type: 'alert', onConfirm: null },
     showManualModal: false, manualGrid: [],
     showAiSummary: false, aiSummaryText: [], showRadar: false, radarIdCol: '',
-    radarOptions: [], selectedRadarTarget: '', radarResult: null,
+    radarOptions: [], radarOptionQuery: '', selectedRadarTarget: '', radarResult: null,
     mlTargetVar: '', mlFeatureVars: [], mlResult: null, showML: false, predictData: null,
     isMasked: false, preMaskedFile: '',
     showLogs: false, logs: [],
@@ -1,6 +1,9 @@
 import axios from 'axios'
 import * as echarts from 'echarts'
 
+// 关联分析散点图的点数预算：超出后由服务端分层抽样或聚合为网格密度
+const SCATTER_POINT_BUDGET = 4000;
+
 /**
  * 【算法调度控制层：异步任务分发与 ECharts 实例管线】
  * 封装了与 Python 算法微服务交互的 Axios 网络请求层，以及复杂图表的 DOM 挂载生命周期逻辑。
@@ -36,7 +39,8 @@ export function setupAnalysis(store, actions) {
             if (store.selectedVars.length < 2) return actions.showDialog({ title: '提示', message: '构建协方差矩阵至少需要勾选 2 个维度变量！' });
             actions.addLog("正在执行高级关联深度运算...");
             try {
-                const res = await axios.post('http://127.0.0.1:5000/api/analyze/advanced', { filename: store.currentDataFile, columns: store.selectedVars });
+                // 散点点数预算由前端按画布规模声明，超出部分由服务端抽样或聚合为网格密度
+                const res = await axios.post('http://127.0.0.1:5000/api/analyze/advanced', { filename: store.currentDataFile, columns: store.selectedVars, max_points: SCATTER_POINT_BUDGET });
                 if (res.data.status === 'success') {
                     store.advancedResult = res.data.data; store.showAdvanced = true; actions.addLog("关联映射计算完成，正准备渲染层！", "success");
 
@@ -55,9 +59,16 @@ export function setupAnalysis(store, actions) {
                         const scatDom = document.getElementById('scatter-container');
                         if (scatDom && res.data.data.scatter_data.length > 0) {
                             let chart = echarts.getInstanceByDom(scatDom) || echarts.init(scatDom); chart.clear();
+                            const reduction = res.data.data.scatter_reduction || { method: 'none' };
+                            const subtitle = reduction.method === 'none' ? '' : `${reduction.original_points} 个点对经 ${reduction.method} 削减为 ${reduction.returned_points} 个`;
+                            // 密度聚合模式下每个点为 [x, y, 点数]，以颜色映射网格内的点密度
+                            const density = reduction.method === 'density';
+                            const maxCount = density ? Math.max(...res.data.data.scatter_data.map(p => p[2])) : 1;
                             chart.setOption({
-                                title: { text: `离散特征散点图`, left: 'center' }, xAxis: { name: res.data.data.scatter_vars[0], type: 'value', scale: true }, yAxis: { name: res.data.data.scatter_vars[1], type: 'value', scale: true },
-                                tooltip: { trigger: 'item' }, series: [{ symbolSize: 12, data: res.data.data.scatter_data, type: 'scatter', itemStyle: { color: '#ee6666' } }]
+                                title: { text: `离散特征散点图`, subtext: subtitle, left: 'center' }, xAxis: { name: res.data.data.scatter_vars[0], type: 'value', scale: true }, yAxis: { name: res.data.data.scatter_vars[1], type: 'value', scale: true },
+                                tooltip: { trigger: 'item', formatter: density ? (p) => `(${p.value[0].toFixed(2)}, ${p.value[1].toFixed(2)}) 附近 ${p.value[2]} 个点` : undefined },
+                                visualMap: density ? { show: false, dimension: 2, min: 1, max: maxCount, inRange: { color: ['#fcd5d5', '#ee6666', '#a50026'] } } : undefined,
+                                series: [{ symbolSize: density ? 6 : 12, large: !density, data: res.data.data.scatter_data, type: 'scatter', itemStyle: { color: '#ee6666' } }]
                             });
                         }
                     }, 300);
@@ -47,7 +47,7 @@ export function setupBase(store, actions) {
             store.showPreview = false; store.showStats = false; store.showCharts = false;
             store.showAdvanced = false; store.showTTest = false; store.showVisControl = false;
             store.showAiSummary = false; store.aiSummaryText = []; store.showRadar = false;
-            store.radarIdCol = ''; store.radarOptions = []; store.selectedRadarTarget = '';
+            store.radarIdCol = ''; store.radarOptions = []; store.radarOptionQuery = ''; store.selectedRadarTarget = '';
             store.radarResult = null; store.isMasked = false; store.mlTargetVar = '';
             store.mlFeatureVars = []; store.mlResult = null; store.showML = false;
             store.showCleanReportModal = false;
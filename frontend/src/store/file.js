@@ -1,5 +1,8 @@
 import axios from 'axios'
 
+// 超过该体积的文件改走分块续传通道 (8MB)
+const CHUNKED_UPLOAD_BYTES = 8 * 1024 * 1024;
+
 export function setupFile(store, actions) {
     return {
         // 【事件代理机制】：拖拽上传事件拦截与分发
@@ -12,26 +15,74 @@ export function setupFile(store, actions) {
             if (e.target.files.length > 0) actions.uploadFile(e.target.files[0]);
         },
 
+        // 数据挂载与特征字典注册
+        mountFileInfo(info) {
+            store.fileInfo = info;
+            store.uploadedFileName = info.original_filename;
+            store.currentDataFile = info.filename;
+            store.selectedVars = [...info.numeric_columns];
+
+            if (info.binary_columns.length > 0) {
+                store.selectedGroupVar = info.binary_columns[0];
+            }
+        },
+
+        // 【I/O 引擎】：大文件分块续传，首块到达即挂载字段结构，全量入库由后端后台完成
+        async uploadChunked(file) {
+            const base = 'http://127.0.0.1:5000/api/upload';
+            const init = (await axios.post(`${base}/init`, { filename: file.name, size: file.size })).data.data;
+            const uploadId = init.upload_id;
+            let offset = 0;
+            let mounted = false;
+
+            while (offset < file.size) {
+                const chunk = file.slice(offset, offset + init.chunk_size);
+                let res;
+                try {
+                    res = await axios.put(`${base}/chunk/${uploadId}?offset=${offset}`, chunk,
+                        { headers: { 'Content-Type': 'application/octet-stream' } });
+                } catch (err) {
+                    // 断点不一致时按服务端记录的偏移续传，其余异常交由外层处理
+                    if (err.response?.status !== 409) throw err;
+                    offset = err.response.data.received;
+                    continue;
+                }
+                const data = res.data.data;
+                offset = data.received;
+                actions.addLog(`已上传 ${Math.round(offset / file.size * 100)}%`);
+                if (data.schema && !mounted) {
+                    actions.mountFileInfo({ ...data.schema, row_count: null });
+                    mounted = true;
+                    actions.addLog(`已识别 ${data.schema.columns.length} 个字段，正在后台接收剩余数据...`);
+                }
+            }
+
+            let status = (await axios.post(`${base}/complete/${uploadId}`)).data.data;
+            while (status.state === 'ingesting') {
+                await new Promise(resolve => setTimeout(resolve, 800));
+                status = (await axios.get(`${base}/status/${uploadId}`)).data.data;
+            }
+            if (status.state === 'error') throw new Error(status.message);
+            return status.data;
+        },
+
         // 【I/O 引擎】：Multipart 异步文件流传输与挂载
         async uploadFile(file) {
             actions.resetSystemState();
             actions.addLog(`开始读取文件: ${file.name}...`);
 
-            const formData = new FormData();
-            formData.append('file', file);
-
             try {
-                const res = await axios.post('http://127.0.0.1:5000/api/upload', formData);
-                if (res.data.status === 'success') {
-                    // 数据挂载与特征字典注册
-                    store.fileInfo = res.data.data;
-                    store.uploadedFileName = res.data.data.original_filename;
-                    store.currentDataFile = res.data.data.filename;
-                    store.selectedVars = [...res.data.data.numeric_columns];
-
-                    if (res.data.data.binary_columns.length > 0) {
-                        store.selectedGroupVar = res.data.data.binary_columns[0];
-                    }
+                let info;
+                if (file.size > CHUNKED_UPLOAD_BYTES) {
+                    info = await actions.uploadChunked(file);
+                } else {
+                    const formData = new FormData();
+                    formData.append('file', file);
+                    const res = await axios.post('http://127.0.0.1:5000/api/upload', formData);
+                    if (res.data.status === 'success') info = res.data.data;
+                }
+                if (info) {
+                    actions.mountFileInfo(info);
                     store.showUploadModal = true;
                     actions.addLog(`文件读取完成！识别出 ${store.fileInfo.row_count} 行数据，${store.fileInfo.numeric_columns.length} 个分析变量。`, "success");
                 }
@@ -1,11 +1,33 @@
 import axios from 'axios'
 import * as echarts from 'echarts'
 
+// 推理折线下发的点数：服务端对整个测试序列做 LTTB 保形降采样
+const PREDICT_SERIES_POINTS = 200;
+
 /**
  * 【智能决策推理层：基于置信度惩罚的专家级特征评估模型】
  */
 export function setupIntel(store, actions) {
     return {
+        // 【异步任务轮询】：训练类接口仅返回任务句柄，周期性拉取 /api/jobs/<id> 直至任务落定
+        async resolveJob(res) {
+            const jobId = res.data?.data?.job_id;
+            if (!jobId) return res;
+            let lastMessage = '';
+            while (true) {
+                await new Promise(resolve => setTimeout(resolve, 800));
+                const job = (await axios.get(`http://127.0.0.1:5000/api/jobs/${jobId}`)).data.data;
+                // 增量训练节点实时播报：先行展示早期模型的 R² 表现
+                if (job.message && job.message !== lastMessage) {
+                    const stage = job.stages?.[job.stages.length - 1];
+                    actions.addLog(stage ? `${job.message}，阶段 R²=${stage.r2}` : job.message);
+                    lastMessage = job.message;
+                }
+                if (job.state === 'done') return { data: { status: 'success', data: job.result } };
+                if (job.state === 'error' || job.state === 'cancelled') throw { response: { data: { message: job.message || '后台任务已被取消' } } };
+            }
+        },
+
         // 宏观 AI 数据结构推演
         async runAiSummary() {
             if (store.showAiSummary) { store.showAiSummary = false; return; }
@@ -16,12 +38,13 @@ export function setupIntel(store, actions) {
             } catch (err) { actions.showDialog({ title: '❌ 神经网络分析熔断', message: err.response?.data?.message }); }
         },
 
-        // 身份级特征列探测拉取
-        async fetchRadarOptions() {
+        // 身份级特征列探测拉取 (高基数列由服务端索引完成子串检索，仅下发首页候选值)
+        async fetchRadarOptions(query = '') {
             if (!store.radarIdCol) return;
+            store.radarOptionQuery = query;
             try {
-                const res = await axios.post('http://127.0.0.1:5000/api/get_options', { filename: store.currentDataFile, column: store.radarIdCol });
-                if (res.data.status === 'success') { store.radarOptions = res.data.data; store.selectedRadarTarget = ''; }
+                const res = await axios.post('http://127.0.0.1:5000/api/get_options', { filename: store.currentDataFile, column: store.radarIdCol, query, limit: 200 });
+                if (res.data.status === 'success' && store.radarOptionQuery === query) { store.radarOptions = res.data.data; if (!query) store.selectedRadarTarget = ''; }
             } catch(err) {}
         },
 
@@ -57,7 +80,7 @@ export function setupIntel(store, actions) {
             if (!store.mlTargetVar || store.mlFeatureVars.length === 0) return actions.showDialog({ title: '配置缺失预警', message: '必须手动指定目标被测标量 Y 轴与影响特征组 X 轴！' });
             actions.addLog("激活机器学习算法引擎，构建随机森林模型边界中...");
             try {
-                const res = await axios.post('http://127.0.0.1:5000/api/predict', { filename: store.currentDataFile, target_col: store.mlTargetVar, feature_cols: store.mlFeatureVars });
+                const res = await actions.resolveJob(await axios.post('http://127.0.0.1:5000/api/predict', { filename: store.currentDataFile, target_col: store.mlTargetVar, feature_cols: store.mlFeatureVars }));
                 if (res.data.status === 'success') {
                     store.mlResult = res.data.data; store.showML = true; actions.addLog(`模型收敛参数训练完毕！`, "success");
 
@@ -74,7 +97,7 @@ export function setupIntel(store, actions) {
                         if (impDom) {
                             let chart = echarts.getInstanceByDom(impDom) || echarts.init(impDom);
                             chart.setOption({
-                                title: { text: '特征列重要性 (Gini Importance 权重分解)', left: 'center' },
+                                title: { text: store.mlResult.importance_method === 'permutation' ? '特征列重要性 (Permutation Importance 置换扰动分解)' : '特征列重要性 (Gini Importance 权重分解)', left: 'center' },
                                 tooltip: { ...glassTooltip, formatter: '{b} <br/> 算法贡献度占比: <b>{c}%</b>' },
                                 xAxis: { type: 'category', data: store.mlResult.features },
                                 yAxis: { type: 'value' },
@@ -101,7 +124,7 @@ export function setupIntel(store, actions) {
         async runNewPrediction() {
             actions.addLog("启动未知盲区数据流的推演预测...");
             try {
-                const res = await axios.post('http://127.0.0.1:5000/api/predict_new', { filename: store.currentDataFile, target_col: store.mlTargetVar, feature_cols: store.mlFeatureVars });
+                const res = await actions.resolveJob(await axios.post('http://127.0.0.1:5000/api/predict_new', { filename: store.currentDataFile, target_col: store.mlTargetVar, feature_cols: store.mlFeatureVars, max_points: PREDICT_SERIES_POINTS }));
                 if (res.data.status === 'success') {
 
                     // ====== 🚀 启发式特征规则引擎：运用动态规则分支针对模型表现作拟人化诊断 ======